@@ -15,10 +15,284 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 
+import sys
+from typing import Callable, Optional
+
+from MTGDeckConverter.argument_parser import Namespace, parse_args
+from MTGDeckConverter.cache import ConversionCache
+from MTGDeckConverter.card_db.db import CardDatabase, IngestionProfile, INGESTION_PROFILES, PopulationStatistics
+from MTGDeckConverter.card_db.maintenance import maintain_database, MaintenanceReport
+from MTGDeckConverter.card_db.refresh import refresh_database
+import MTGDeckConverter.conversion
+from MTGDeckConverter.corpus_index import CorpusIndex
+from MTGDeckConverter.deck_diff import diff_decks
+from MTGDeckConverter.fingerprint import DeckFingerprinter, FingerprintGroups
+import MTGDeckConverter.formats
+import MTGDeckConverter.input_parser.xmage
+import MTGDeckConverter.logger
+import MTGDeckConverter.memory_accounting
+from MTGDeckConverter.watcher import DirectoryWatcher
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+
 def main():
-    # program logic here
-    print("TODO: the application")
-    pass
+    args = parse_args()
+    MTGDeckConverter.logger.configure_root_logger(args)
+    command = _COMMANDS[args.command]
+    if args.memory_report is None and args.memory_budget is None:
+        sys.exit(command(args))
+    sys.exit(_run_with_memory_accounting(command, args))
+
+
+def _run_with_memory_accounting(command: Callable[[Namespace], int], args: Namespace) -> int:
+    accountant = MTGDeckConverter.memory_accounting.start(
+        None if args.memory_budget is None else args.memory_budget * 2**20)
+    try:
+        result = command(args)
+    except MTGDeckConverter.memory_accounting.MemoryBudgetExceededError as e:
+        logger.error(f"Aborted the {args.command} command: {e}")
+        result = 1
+    report = accountant.get_report()
+    MTGDeckConverter.memory_accounting.stop()
+    report["command"] = args.command
+    for name, statistics in report["stages"].items():
+        logger.info(
+            f"Memory of stage {name}: peak {statistics['peak_bytes'] / 2**20:.1f} MiB, "
+            f"retained {statistics['retained_bytes'] / 2**20:.1f} MiB in {statistics['count']} runs."
+        )
+    logger.info(
+        f"Traced memory peak: {report['peak_bytes'] / 2**20:.1f} MiB, "
+        f"retained: {report['retained_bytes'] / 2**20:.1f} MiB."
+    )
+    if args.memory_report is not None:
+        accountant.write(report, args.memory_report)
+    return result
+
+
+def _convert(args: Namespace) -> int:
+    card_db = _open_card_database(args)
+    cache = _open_cache(args, card_db)
+    report = MTGDeckConverter.conversion.ResolutionReport()
+    try:
+        MTGDeckConverter.conversion.create_output_dir(args.output_dir)
+    except OSError as e:
+        logger.error(f"Creating the output directory failed: {e}")
+        return 1
+    for input_path in args.input_files:
+        try:
+            output_paths = MTGDeckConverter.conversion.get_output_paths(
+                input_path, args.output_formats, args.output_dir)
+            MTGDeckConverter.conversion.convert_deck_file_to_formats(
+                card_db, input_path, output_paths, args.input_format, cache)
+        except (OSError, ValueError) as e:
+            logger.error(f"Converting {input_path} failed: {e}")
+            report.add_failure(input_path, e)
+    if args.error_report is not None:
+        report.write(args.error_report)
+    return 1 if report.decks else 0
+
+
+def _watch(args: Namespace) -> int:
+    card_db = _open_card_database(args)
+    watcher = DirectoryWatcher(
+        card_db,
+        args.watch_dir, args.output_formats, args.output_dir, args.input_format,
+        args.pattern, args.poll_interval, args.debounce, _open_cache(args, card_db)
+    )
+    watcher.run()
+    return 0
+
+
+def _stream(args: Namespace) -> int:
+    card_db = _open_card_database(args)
+    # Deck files are UTF-8 encoded, independent of the locale. Keep line endings, as required by the CSV parser.
+    sys.stdin.reconfigure(encoding="utf-8", newline="")
+    sys.stdout.reconfigure(encoding="utf-8")
+    try:
+        MTGDeckConverter.conversion.convert_deck_stream(
+            card_db, sys.stdin, sys.stdout, args.output_format, args.input_format)
+    except (OSError, ValueError) as e:
+        logger.error(f"Converting the deck from the standard input failed: {e}")
+        return 1
+    return 0
+
+
+def _diff(args: Namespace) -> int:
+    try:
+        old_deck = MTGDeckConverter.formats.parse_deck(args.old_deck, args.input_format)
+        new_deck = MTGDeckConverter.formats.parse_deck(args.new_deck, args.input_format)
+        deck_diff = diff_decks(old_deck, new_deck)
+        if not args.no_resolve and not deck_diff.is_empty():
+            deck_diff = deck_diff.resolve(_open_card_database(args))
+        if args.patch is None:
+            for line in deck_diff.format_lines():
+                print(line)
+            return 0
+        patch_format = args.patch_format or MTGDeckConverter.formats.detect_input_format(args.patch)
+        target_deck = MTGDeckConverter.formats.parse_deck(args.patch, patch_format)
+        if patch_format == "xmage" and old_deck.commanders:
+            # The converted old deck stores the commanders as the sideboard.
+            MTGDeckConverter.input_parser.xmage.restore_commanders(target_deck)
+        deck_diff.apply(target_deck)
+        output_path = args.patch if args.patch_output is None else args.patch_output
+        logger.info(f"Writing the patched deck to {output_path}")
+        MTGDeckConverter.formats.write_deck(target_deck, output_path, patch_format)
+    except (OSError, ValueError) as e:
+        logger.error(f"Comparing the decks failed: {e}")
+        return 1
+    return 0
+
+
+def _fingerprint(args: Namespace) -> int:
+    paths = args.deck_dir.rglob(args.pattern) if args.recursive else args.deck_dir.glob(args.pattern)
+    groups = FingerprintGroups()
+    groups.add_deck_files(
+        DeckFingerprinter(_open_card_database(args)), (path for path in paths if path.is_file()), args.input_format)
+    for fingerprint, input_paths in groups.duplicates().items():
+        print(fingerprint)
+        for input_path in input_paths:
+            print(f"  {input_path}")
+    logger.info(
+        f"Found {len(groups.groups)} distinct decks in {sum(map(len, groups.groups.values()))} deck files. "
+        f"{len(groups.failures)} files could not be read."
+    )
+    if args.report is not None:
+        groups.write(args.report)
+    return 1 if groups.failures else 0
+
+
+def _index(args: Namespace) -> int:
+    index = CorpusIndex(args.index_file, _open_card_database(args))
+    try:
+        if args.index_command == "update":
+            statistics = index.update_directory(args.deck_dir, args.pattern, args.recursive, args.input_format)
+            return 1 if statistics.failed else 0
+        elif args.index_command == "contains":
+            for path in index.find_decks_containing(args.card_names, args.boards):
+                print(path)
+        else:
+            for english_name, deck_count in index.find_co_occurring_cards(args.card_names[0], args.top, args.boards):
+                print(f"{deck_count} {english_name}")
+    except ValueError as e:
+        logger.error(f"Querying the corpus index failed: {e}")
+        return 1
+    return 0
+
+
+def _populate(args: Namespace) -> int:
+    card_db = MTGDeckConverter.conversion.open_card_database(args.database, populate=False)
+    statistics = card_db.populate_database(args.data_file, _get_ingestion_profile(args), _get_bulk_data_type(args))
+    if statistics is None:
+        return 1
+    _log_population_statistics(statistics)
+    return 0
+
+
+def _refresh(args: Namespace) -> int:
+    try:
+        statistics = refresh_database(
+            args.database, args.data_file, _get_ingestion_profile(args), _get_bulk_data_type(args),
+            args.min_row_count_ratio
+        )
+    except (OSError, ValueError) as e:
+        logger.error(f"Refreshing the card database failed: {e}")
+        return 1
+    _log_population_statistics(statistics)
+    return 0
+
+
+def _get_ingestion_profile(args: Namespace) -> IngestionProfile:
+    profile = INGESTION_PROFILES[args.profile]
+    return IngestionProfile(
+        paper_only=profile.paper_only or args.paper_only,
+        exclude_tokens=profile.exclude_tokens or args.exclude_tokens,
+        exclude_art_cards=profile.exclude_art_cards or args.exclude_art_cards,
+        exclude_oversized=profile.exclude_oversized or args.exclude_oversized,
+        languages=frozenset(language.lower() for language in args.languages),
+    )
+
+
+def _get_bulk_data_type(args: Namespace) -> str:
+    return "all_cards" if args.all_languages else "default_cards"
+
+
+def _log_population_statistics(statistics: PopulationStatistics):
+    excluded_cards = statistics.total_cards - statistics.ingested_cards
+    logger.info(
+        f"Excluded {excluded_cards} of {statistics.total_cards} cards "
+        f"({excluded_cards / max(statistics.total_cards, 1):.1%}). "
+        f"Population took {statistics.elapsed_seconds:.1f} seconds, "
+        f"the database size is {statistics.database_size / 2**20:.1f} MiB."
+    )
+
+
+def _snapshot(args: Namespace) -> int:
+    card_db = _open_card_database(args)
+    try:
+        card_db.create_snapshot(args.snapshot_path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Creating the database snapshot failed: {e}")
+        return 1
+    return 0
+
+
+def _maintain(args: Namespace) -> int:
+    card_db = _open_card_database(args)
+    try:
+        report = maintain_database(card_db, args.page_size, args.vacuum_into, args.benchmark_sample_size)
+    except (OSError, ValueError) as e:
+        logger.error(f"Maintaining the card database failed: {e}")
+        return 1
+    _log_maintenance_report(report)
+    return 0
+
+
+def _log_maintenance_report(report: MaintenanceReport):
+    logger.info(
+        f"Database size before: {report.database_size_before / 2**20:.1f} MiB, "
+        f"after: {report.database_size_after / 2**20:.1f} MiB, page size: {report.page_size} bytes."
+    )
+    for object_size in report.object_sizes:
+        logger.info(
+            f"{object_size.type.capitalize()} {object_size.name}: "
+            f"{'~' if object_size.estimated else ''}{object_size.size / 2**10:.0f} KiB"
+        )
+    for lookup, latency_after in report.lookup_latency_after.items():
+        latency_before = report.lookup_latency_before[lookup]
+        logger.info(
+            f"Lookup {lookup}: {latency_before:.1f} µs before, {latency_after:.1f} µs after "
+            f"({latency_after / latency_before - 1:+.0%})"
+        )
+
+
+def _open_card_database(args: Namespace) -> CardDatabase:
+    return MTGDeckConverter.conversion.open_card_database(args.database, args.immutable_database)
+
+
+def _open_cache(args: Namespace, card_db: CardDatabase) -> Optional[ConversionCache]:
+    if args.cache_dir is None:
+        return None
+    if card_db.get_data_version() is None:
+        logger.warning(
+            "The card database has no data version, so conversion results are not cached. "
+            "Run the refresh command to load the card data again, which assigns a data version.")
+        return None
+    return ConversionCache(args.cache_dir, args.cache_size * 2**20)
+
+
+_COMMANDS = {
+    "convert": _convert,
+    "watch": _watch,
+    "stream": _stream,
+    "diff": _diff,
+    "fingerprint": _fingerprint,
+    "index": _index,
+    "populate": _populate,
+    "refresh": _refresh,
+    "snapshot": _snapshot,
+    "maintain": _maintain,
+}
 
 
 if __name__ == "__main__": 
@@ -0,0 +1,247 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Statistics over large collections of decks.
+
+Decks are encoded as NumPy arrays of Printing_IDs and quantities. All card attributes are looked up in columnar
+arrays exported from the card database and indexed by Printing_ID, so that the aggregates are computed without
+Python level loops over individual cards.
+
+This module requires NumPy, which is an optional dependency. Install it using the "analytics" extra.
+"""
+
+from pathlib import Path
+import typing
+
+import numpy
+
+from MTGDeckConverter.card_db.db import CardDatabase, ENGLISH
+import MTGDeckConverter.logger
+from MTGDeckConverter.model import Card, Deck
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+__all__ = [
+    "BOARD_NAMES",
+    "CardDataArrays",
+    "EncodedDeck",
+    "DeckCorpus",
+]
+
+# Board names, as returned by Deck.boards(). The position in this tuple is used as the integer board code.
+BOARD_NAMES = ("main", "side", "maybe", "acquire")
+_BOARD_CODES = {name: code for code, name in enumerate(BOARD_NAMES)}
+
+
+class CardDataArrays:
+    """
+    Columnar export of the printings in the card database. Like Printings_View, it contains one printing per set and
+    collector number, preferring the English printing. The printing attribute arrays are indexed by Printing_ID,
+    the card attribute arrays by Card_ID, the set and rarity arrays by Set_ID and Rarity_ID.
+    IDs not present in the database map to index 0 of the respective lookup arrays.
+    """
+
+    def __init__(self, card_db: CardDatabase):
+        logger.info("Exporting the card database into columnar arrays.")
+        printings = card_db.db.execute(
+            "SELECT Printing_ID, Card_ID, Set_ID, Rarity_ID, Collector_Number, Abbreviation "
+            "FROM Printing "
+            "INNER JOIN Card_Set USING (Set_ID) "
+            "WHERE Language = ? OR NOT EXISTS ("
+            "  SELECT * FROM Printing AS Preferred "
+            "  WHERE Preferred.Set_ID = Printing.Set_ID AND Preferred.Collector_Number = Printing.Collector_Number "
+            "  AND (Preferred.Language = ? OR Preferred.Printing_ID < Printing.Printing_ID)"
+            ")", (ENGLISH, ENGLISH)
+        ).fetchall()
+        cards = card_db.db.execute("SELECT Card_ID, English_Name, Card_Type FROM Card").fetchall()
+        sets = card_db.db.execute("SELECT Set_ID, Abbreviation FROM Card_Set").fetchall()
+        rarities = card_db.db.execute("SELECT Rarity_ID, Name FROM Rarity").fetchall()
+
+        printing_count = max((row["Printing_ID"] for row in printings), default=0) + 1
+        self.card_id = numpy.zeros(printing_count, dtype=numpy.int64)
+        self.set_id = numpy.zeros(printing_count, dtype=numpy.int64)
+        self.rarity_id = numpy.zeros(printing_count, dtype=numpy.int64)
+        printing_ids = numpy.fromiter((row["Printing_ID"] for row in printings), numpy.int64, len(printings))
+        self.card_id[printing_ids] = [row["Card_ID"] for row in printings]
+        self.set_id[printing_ids] = [row["Set_ID"] for row in printings]
+        self.rarity_id[printing_ids] = [row["Rarity_ID"] for row in printings]
+        # Used to encode decks: (set abbreviation, collector number) -> Printing_ID
+        self._printing_ids: typing.Dict[typing.Tuple[str, str], int] = {
+            (row["Abbreviation"], str(row["Collector_Number"]).lower()): row["Printing_ID"] for row in printings
+        }
+
+        card_count = max((row["Card_ID"] for row in cards), default=0) + 1
+        self.card_names = numpy.full(card_count, "", dtype=object)
+        self.card_type_code = numpy.zeros(card_count, dtype=numpy.int64)
+        # Card types are categorical. Each distinct type is assigned an integer code.
+        self.card_types: typing.List[str] = sorted({row["Card_Type"] for row in cards})
+        type_codes = {card_type: code for code, card_type in enumerate(self.card_types)}
+        for row in cards:
+            self.card_names[row["Card_ID"]] = row["English_Name"]
+            self.card_type_code[row["Card_ID"]] = type_codes[row["Card_Type"]]
+
+        self.set_abbreviations = numpy.full(max((row["Set_ID"] for row in sets), default=0) + 1, "", dtype=object)
+        for row in sets:
+            self.set_abbreviations[row["Set_ID"]] = row["Abbreviation"]
+        self.rarity_names = numpy.full(max((row["Rarity_ID"] for row in rarities), default=0) + 1, "", dtype=object)
+        for row in rarities:
+            self.rarity_names[row["Rarity_ID"]] = row["Name"]
+        logger.info(f"Exported {len(printings)} printings of {len(cards)} cards in {len(sets)} sets.")
+
+    def get_printing_id(self, card: Card) -> typing.Optional[int]:
+        """Returns the Printing_ID of the given resolved card, or None, if the printing is unknown."""
+        if not card.set_abbreviation or card.collector_number is None:
+            return None
+        return self._printing_ids.get((card.set_abbreviation.lower(), str(card.collector_number).lower()))
+
+
+class EncodedDeck(typing.NamedTuple):
+    """A deck, encoded as parallel arrays. Identical printings on the same board are merged."""
+    printing_ids: numpy.ndarray
+    quantities: numpy.ndarray
+    boards: numpy.ndarray
+
+    @staticmethod
+    def from_deck(deck: Deck, card_data: CardDataArrays) -> "EncodedDeck":
+        """
+        Encodes the given deck. The deck has to be resolved using Deck.fill_missing_information() beforehand.
+        Cards with unknown printings are skipped.
+        """
+        counts: typing.Dict[typing.Tuple[int, int], int] = {}
+        skipped = 0
+        for board, cards in deck.boards().items():
+            board_code = _BOARD_CODES[board]
+            for card in cards:
+                printing_id = card_data.get_printing_id(card)
+                if printing_id is None:
+                    skipped += 1
+                else:
+                    key = printing_id, board_code
+                    counts[key] = counts.get(key, 0) + 1
+        if skipped:
+            logger.warning(f"Skipped {skipped} cards with unknown printings while encoding deck {deck.name}")
+        keys = numpy.array(list(counts.keys()), dtype=numpy.int64).reshape(-1, 2)
+        return EncodedDeck(
+            printing_ids=keys[:, 0],
+            quantities=numpy.fromiter(counts.values(), numpy.int64, len(counts)),
+            boards=keys[:, 1].astype(numpy.int8),
+        )
+
+
+class DeckCorpus:
+    """
+    A collection of encoded decks, stored as concatenated arrays. Row i of the arrays describes one printing
+    in deck deck_index[i].
+    """
+
+    def __init__(self, card_data: CardDataArrays):
+        self.card_data = card_data
+        self.deck_count = 0
+        self._parts: typing.List[typing.Tuple[numpy.ndarray, EncodedDeck]] = []
+        self._deck_index = numpy.zeros(0, dtype=numpy.int64)
+        self._printing_ids = numpy.zeros(0, dtype=numpy.int64)
+        self._quantities = numpy.zeros(0, dtype=numpy.int64)
+        self._boards = numpy.zeros(0, dtype=numpy.int8)
+
+    def add_deck(self, deck: Deck) -> int:
+        """Adds a resolved deck to the corpus and returns the index of the added deck."""
+        return self.add_encoded_deck(EncodedDeck.from_deck(deck, self.card_data))
+
+    def add_encoded_deck(self, encoded_deck: EncodedDeck) -> int:
+        deck_index = self.deck_count
+        self._parts.append((numpy.full(len(encoded_deck.printing_ids), deck_index, dtype=numpy.int64), encoded_deck))
+        self.deck_count += 1
+        return deck_index
+
+    def _consolidate(self):
+        """Concatenates decks added since the last call. Done lazily, so that adding decks stays cheap."""
+        if self._parts:
+            self._deck_index = numpy.concatenate([self._deck_index] + [index for index, _ in self._parts])
+            self._printing_ids = numpy.concatenate(
+                [self._printing_ids] + [deck.printing_ids for _, deck in self._parts])
+            self._quantities = numpy.concatenate([self._quantities] + [deck.quantities for _, deck in self._parts])
+            self._boards = numpy.concatenate([self._boards] + [deck.boards for _, deck in self._parts])
+            self._parts.clear()
+
+    def _select(self, boards: typing.Iterable[str]) -> typing.Tuple[numpy.ndarray, numpy.ndarray]:
+        """Returns the Printing_IDs and quantities of all rows on the given boards."""
+        self._consolidate()
+        mask = numpy.isin(self._boards, [_BOARD_CODES[board] for board in boards])
+        return self._printing_ids[mask], self._quantities[mask]
+
+    def card_type_distribution(self, boards: typing.Iterable[str] = ("main",)) -> typing.Dict[str, int]:
+        """Returns the total number of cards per card type."""
+        printing_ids, quantities = self._select(boards)
+        type_codes = self.card_data.card_type_code[self.card_data.card_id[printing_ids]]
+        totals = numpy.bincount(type_codes, weights=quantities, minlength=len(self.card_data.card_types))
+        return {
+            card_type: int(total) for card_type, total in zip(self.card_data.card_types, totals) if total
+        }
+
+    def rarity_mix(self, boards: typing.Iterable[str] = ("main",)) -> typing.Dict[str, int]:
+        """Returns the total number of cards per rarity."""
+        printing_ids, quantities = self._select(boards)
+        totals = numpy.bincount(
+            self.card_data.rarity_id[printing_ids], weights=quantities, minlength=len(self.card_data.rarity_names))
+        return {
+            self.card_data.rarity_names[rarity_id]: int(totals[rarity_id]) for rarity_id in numpy.flatnonzero(totals)
+        }
+
+    def most_played_cards_per_set(
+            self, top: int = 10,
+            boards: typing.Iterable[str] = ("main",)) -> typing.Dict[str, typing.List[typing.Tuple[str, int]]]:
+        """
+        Returns the top most played cards of each set, by the total number of copies across all decks.
+        Each set maps to a list of (English name, number of copies) tuples, sorted by descending number of copies.
+        """
+        printing_ids, quantities = self._select(boards)
+        card_id_count = len(self.card_data.card_names)
+        # Combine set and card into a single integer key, so that the grouping is a single numpy.unique() call.
+        keys = self.card_data.set_id[printing_ids] * card_id_count + self.card_data.card_id[printing_ids]
+        unique_keys, inverse = numpy.unique(keys, return_inverse=True)
+        totals = numpy.bincount(inverse.ravel(), weights=quantities).astype(numpy.int64)
+        set_ids, card_ids = numpy.divmod(unique_keys, card_id_count)
+        order = numpy.lexsort((-totals, set_ids))
+        set_ids, card_ids, totals = set_ids[order], card_ids[order], totals[order]
+        set_starts = numpy.flatnonzero(numpy.r_[True, set_ids[1:] != set_ids[:-1]])
+        set_ends = numpy.r_[set_starts[1:], len(set_ids)]
+        return {
+            self.card_data.set_abbreviations[set_ids[start]]: list(zip(
+                self.card_data.card_names[card_ids[start:min(end, start + top)]].tolist(),
+                totals[start:min(end, start + top)].tolist()
+            ))
+            for start, end in zip(set_starts, set_ends)
+        }
+
+    def save(self, corpus_path: Path):
+        """Stores the encoded decks in a NumPy .npz archive."""
+        self._consolidate()
+        numpy.savez_compressed(
+            str(corpus_path), deck_index=self._deck_index, printing_ids=self._printing_ids,
+            quantities=self._quantities, boards=self._boards
+        )
+
+    @staticmethod
+    def load(corpus_path: Path, card_data: CardDataArrays) -> "DeckCorpus":
+        """Loads a corpus stored using save(). The card data has to be exported from the same card database."""
+        corpus = DeckCorpus(card_data)
+        with numpy.load(str(corpus_path)) as stored:
+            corpus._deck_index = stored["deck_index"]
+            corpus._printing_ids = stored["printing_ids"]
+            corpus._quantities = stored["quantities"]
+            corpus._boards = stored["boards"]
+        corpus.deck_count = int(corpus._deck_index.max()) + 1 if len(corpus._deck_index) else 0
+        return corpus
@@ -35,6 +35,65 @@ class Namespace(NamedTuple):
 
     verbose: bool
     cutelog_integration: bool
+    database: Path
+    immutable_database: bool
+    memory_report: Optional[Path]
+    memory_budget: Optional[int]
+    # The selected sub-command
+    command: str
+    # Options shared by the "convert", "watch", "stream", "diff", "fingerprint" and "index" commands
+    input_format: str
+    # Options shared by the "convert" and "watch" commands
+    output_formats: List[str]
+    output_dir: Optional[Path]
+    cache_dir: Optional[Path]
+    cache_size: int
+    # Options of the "convert" command
+    input_files: List[Path]
+    error_report: Optional[Path]
+    # Options of the "stream" command
+    output_format: str
+    # Options of the "diff" command
+    old_deck: Path
+    new_deck: Path
+    no_resolve: bool
+    patch: Optional[Path]
+    patch_output: Optional[Path]
+    patch_format: Optional[str]
+    # Options shared by the "fingerprint" and "index" commands
+    deck_dir: Path
+    recursive: bool
+    # Options of the "fingerprint" command
+    report: Optional[Path]
+    # Options of the "index" command
+    index_file: Path
+    index_command: str
+    card_names: List[str]
+    boards: Optional[List[str]]
+    top: int
+    # Options shared by the "populate" and "refresh" commands
+    data_file: Optional[Path]
+    profile: str
+    paper_only: bool
+    exclude_tokens: bool
+    exclude_art_cards: bool
+    exclude_oversized: bool
+    all_languages: bool
+    languages: List[str]
+    # Options of the "refresh" command
+    min_row_count_ratio: float
+    # Options of the "snapshot" command
+    snapshot_path: Path
+    # Options of the "maintain" command
+    page_size: Optional[int]
+    vacuum_into: Optional[Path]
+    benchmark_sample_size: int
+    # Options of the "watch" command
+    watch_dir: Path
+    # Options shared by the "watch", "fingerprint" and "index" commands
+    pattern: str
+    poll_interval: float
+    debounce: float
 
 
 def _generate_argument_parser() -> ArgumentParser:
@@ -59,7 +118,7 @@ def _generate_argument_parser() -> ArgumentParser:
     parser.add_argument(
         "-V", "--verbose",
         action="store_true",
-        help="Increase output verbosity. Also show debug messages on the standard output."
+        help="Increase output verbosity. Also show debug messages on the standard error output."
     )
     parser.add_argument(
         "--cutelog-integration",
@@ -67,10 +126,414 @@ def _generate_argument_parser() -> ArgumentParser:
         help="Connect to a running cutelog instance with default settings to display the full program log. "
              "See https://github.com/busimus/cutelog"
     )
+    parser.add_argument(
+        "--database",
+        type=Path, default=MTGDeckConverter.constants.DEFAULT_DATABASE_PATH,
+        help="Location of the card database. It is created and populated, if it does not exist. "
+             f"Defaults to {MTGDeckConverter.constants.DEFAULT_DATABASE_PATH}"
+    )
+    parser.add_argument(
+        "--immutable-database",
+        action="store_true",
+        help="Open the card database as a read-only snapshot, as created by the snapshot command. "
+             "The database file is never written and has to be fully populated."
+    )
+    parser.add_argument(
+        "--memory-report",
+        metavar="REPORT_FILE", type=Path,
+        help="Trace the memory allocations and write a JSON report to this file. The report lists the peak and "
+             "retained memory of each stage of converting decks and populating the card database, and the top "
+             "allocation sites. Tracing slows down the program considerably."
+    )
+    parser.add_argument(
+        "--memory-budget",
+        metavar="MIB", type=int,
+        help="Trace the memory allocations and abort the command with a memory report, if the traced memory exceeds "
+             "this many MiB. Only memory allocated by Python is traced, so the process uses somewhat more memory."
+    )
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    commands.required = True
+    formats = _get_format_choices()
+    conversion_options = _generate_conversion_options_parser(formats)
+    _add_convert_command(commands, conversion_options)
+    _add_watch_command(commands, conversion_options)
+    _add_stream_command(commands, formats)
+    _add_diff_command(commands, formats)
+    _add_fingerprint_command(commands, formats)
+    _add_index_command(commands, formats)
+    ingestion_options = _generate_ingestion_options_parser()
+    _add_populate_command(commands, ingestion_options)
+    _add_refresh_command(commands, ingestion_options)
+    _add_snapshot_command(commands)
+    _add_maintain_command(commands)
+
+    return parser
+
+
+class _FormatChoices(NamedTuple):
+    # Known input format names, starting with the pseudo format requesting the automatic format detection
+    input_formats: List[str]
+    output_formats: List[str]
 
+
+def _get_format_choices() -> _FormatChoices:
+    """Returns the names of all known input and output formats, used as choices of the format options."""
+    # Imported here, because the format registry uses the logger module, which depends on this module.
+    import MTGDeckConverter.formats
+    return _FormatChoices(
+        [MTGDeckConverter.formats.AUTO_DETECT, *MTGDeckConverter.formats.input_formats()],
+        list(MTGDeckConverter.formats.output_formats())
+    )
+
+
+def _add_input_format_option(parser: ArgumentParser, formats: _FormatChoices, help_text: str):
+    """Adds the input format option. It defaults to the automatic format detection."""
+    parser.add_argument(
+        "-i", "--input-format",
+        choices=formats.input_formats, default=formats.input_formats[0],
+        help=help_text
+    )
+
+
+def _generate_conversion_options_parser(formats: _FormatChoices) -> ArgumentParser:
+    """Generates a parent parser containing the options shared by all commands that convert decks."""
+    parser = ArgumentParser(add_help=False)
+    _add_input_format_option(
+        parser, formats,
+        "Format of the input files. "
+        "By default, the format is detected for each file individually by inspecting the file content."
+    )
+    parser.add_argument(
+        "-o", "--output-format",
+        dest="output_formats", action="append", choices=formats.output_formats,
+        help=f"Format of the written deck files. Can be given multiple times to write each deck in multiple formats. "
+             f"Each deck is only parsed once for all formats. Defaults to {formats.output_formats[0]}."
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        help="Write the converted decks into this directory. It is created, if it does not exist. "
+             "Defaults to the directory containing each input file."
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Cache conversion results in this directory. Unchanged deck files are not converted again, "
+             "as long as the program version and the card data stay the same. By default, nothing is cached."
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int, default=100,
+        help="Maximum size of the conversion cache in MiB. "
+             "When exceeded, the least recently used entries are removed. Defaults to 100."
+    )
     return parser
 
 
+def _add_convert_command(commands, conversion_options: ArgumentParser):
+    convert = commands.add_parser(
+        "convert", parents=[conversion_options], help="Convert deck files into another format.")
+    convert.add_argument(
+        "input_files", metavar="INPUT_FILE", type=Path, nargs="+",
+        help="Deck files to convert. The input files may use different formats."
+    )
+    convert.add_argument(
+        "--error-report",
+        metavar="REPORT_FILE", type=Path,
+        help="Write a JSON report listing all decks that failed to convert to this file. "
+             "For each deck, the report lists every card that could not be identified, together with the reason."
+    )
+
+
+def _add_watch_command(commands, conversion_options: ArgumentParser):
+    watch = commands.add_parser(
+        "watch", parents=[conversion_options],
+        help="Watch a directory and convert deck files, whenever they are created or changed. "
+             "Runs until interrupted.")
+    watch.add_argument(
+        "watch_dir", metavar="DIRECTORY", type=Path,
+        help="The directory to watch."
+    )
+    watch.add_argument(
+        "--pattern",
+        default="*",
+        help="Only convert files with names matching this shell-style pattern, like \"*.csv\". "
+             "Defaults to all files."
+    )
+    watch.add_argument(
+        "--poll-interval",
+        type=float, default=1.0,
+        help="Seconds between two scans of the watched directory. Defaults to 1."
+    )
+    watch.add_argument(
+        "--debounce",
+        type=float, default=2.0,
+        help="Seconds a file has to stay unchanged before it is converted. "
+             "Multiple writes in quick succession only cause a single conversion. Defaults to 2."
+    )
+
+
+def _add_stream_command(commands, formats: _FormatChoices):
+    stream = commands.add_parser(
+        "stream",
+        help="Read a deck from the standard input and write the converted deck to the standard output, "
+             "for use in shell pipelines.")
+    _add_input_format_option(
+        stream, formats,
+        "Format of the input deck. By default, the format is detected by inspecting the start of the input."
+    )
+    stream.add_argument(
+        "-o", "--output-format",
+        choices=formats.output_formats, default=formats.output_formats[0],
+        help=f"Format of the written deck. Defaults to {formats.output_formats[0]}."
+    )
+
+
+def _add_diff_command(commands, formats: _FormatChoices):
+    diff = commands.add_parser(
+        "diff",
+        help="Show the cards added and removed between two versions of a deck, "
+             "or apply the changes to a previously converted deck file.")
+    diff.add_argument(
+        "old_deck", metavar="OLD_DECK", type=Path,
+        help="The old deck version."
+    )
+    diff.add_argument(
+        "new_deck", metavar="NEW_DECK", type=Path,
+        help="The new deck version."
+    )
+    _add_input_format_option(
+        diff, formats,
+        "Format of OLD_DECK and NEW_DECK. By default, the format is detected by inspecting the file content."
+    )
+    diff.add_argument(
+        "--no-resolve",
+        action="store_true",
+        help="Compare the cards as given in the deck files. By default, the changed cards are identified using the "
+             "card database, so that different notations of the same printing compare equal."
+    )
+    diff.add_argument(
+        "--patch",
+        metavar="CONVERTED_OLD_DECK", type=Path,
+        help="Apply the changes to this file, which contains a converted version of OLD_DECK. "
+             "This updates the converted deck, without converting NEW_DECK completely."
+    )
+    diff.add_argument(
+        "--patch-output",
+        metavar="OUTPUT_FILE", type=Path,
+        help="Write the patched deck to this file, instead of overwriting the file given by --patch."
+    )
+    diff.add_argument(
+        "--patch-format",
+        choices=formats.output_formats,
+        help="Format of the file given by --patch. By default, the format is detected by inspecting the file content."
+    )
+
+
+def _add_fingerprint_command(commands, formats: _FormatChoices):
+    fingerprint = commands.add_parser(
+        "fingerprint",
+        help="Find identical decks in a directory. Decks are identical, if they contain the same printings "
+             "in the same quantities, regardless of the line order, split quantities or the set codes used. "
+             "Prints the groups of identical deck files.")
+    fingerprint.add_argument(
+        "deck_dir", metavar="DIRECTORY", type=Path,
+        help="The directory containing the deck files."
+    )
+    _add_input_format_option(
+        fingerprint, formats,
+        "Format of the deck files. By default, the format is detected for each file individually."
+    )
+    fingerprint.add_argument(
+        "--pattern",
+        default="*",
+        help="Only read files with names matching this shell-style pattern, like \"*.csv\". Defaults to all files."
+    )
+    fingerprint.add_argument(
+        "-r", "--recursive",
+        action="store_true",
+        help="Also read deck files in subdirectories."
+    )
+    fingerprint.add_argument(
+        "--report",
+        metavar="REPORT_FILE", type=Path,
+        help="Write a JSON report with the fingerprints of all deck files and all failures to this file."
+    )
+
+
+def _add_index_command(commands, formats: _FormatChoices):
+    index = commands.add_parser(
+        "index",
+        help="Maintain and query an index over a corpus of deck files. "
+             "The index answers which decks contain a card, without reading the deck files again.")
+    index.add_argument(
+        "--index-file",
+        type=Path, default=MTGDeckConverter.constants.DEFAULT_CORPUS_INDEX_PATH,
+        help=f"Location of the corpus index. Defaults to {MTGDeckConverter.constants.DEFAULT_CORPUS_INDEX_PATH}"
+    )
+    index_commands = index.add_subparsers(dest="index_command", metavar="INDEX_COMMAND")
+    index_commands.required = True
+    update = index_commands.add_parser(
+        "update",
+        help="Add new and changed deck files in a directory to the index and remove deleted files. "
+             "Unchanged files are not read again.")
+    update.add_argument(
+        "deck_dir", metavar="DIRECTORY", type=Path,
+        help="The directory containing the deck files."
+    )
+    _add_input_format_option(
+        update, formats,
+        "Format of the deck files. By default, the format is detected for each file individually."
+    )
+    update.add_argument(
+        "--pattern",
+        default="*",
+        help="Only index files with names matching this shell-style pattern, like \"*.csv\". Defaults to all files."
+    )
+    update.add_argument(
+        "-r", "--recursive",
+        action="store_true",
+        help="Also index deck files in subdirectories."
+    )
+    board_choices = ["main", "side", "maybe", "acquire", "commanders"]
+    contains = index_commands.add_parser(
+        "contains", help="List the indexed decks containing all given cards.")
+    contains.add_argument(
+        "card_names", metavar="CARD_NAME", nargs="+",
+        help="English card name."
+    )
+    contains.add_argument(
+        "--board",
+        dest="boards", action="append", choices=board_choices,
+        help="Only consider cards on this board. Can be given multiple times. Defaults to all boards."
+    )
+    co_occurring = index_commands.add_parser(
+        "co-occurring", help="List the cards most often played in the same decks as the given card.")
+    co_occurring.add_argument(
+        "card_names", metavar="CARD_NAME", nargs=1,
+        help="English card name."
+    )
+    co_occurring.add_argument(
+        "--board",
+        dest="boards", action="append", choices=board_choices,
+        help="Only consider cards on this board. Can be given multiple times. Defaults to all boards."
+    )
+    co_occurring.add_argument(
+        "--top",
+        type=int, default=20,
+        help="Number of listed cards. Defaults to 20."
+    )
+
+
+def _generate_ingestion_options_parser() -> ArgumentParser:
+    """Generates a parent parser containing the options shared by all commands that load the card data."""
+    # Imported here, because the card database uses the logger module, which depends on this module.
+    from MTGDeckConverter.card_db.db import INGESTION_PROFILES
+    populate = ArgumentParser(add_help=False)
+    populate.add_argument(
+        "--data-file",
+        type=Path,
+        help="Read the card data from this Scryfall bulk data file, instead of downloading it."
+    )
+    populate.add_argument(
+        "--profile",
+        choices=list(INGESTION_PROFILES), default="full",
+        help="Ingestion profile. \"full\" stores all cards, \"slim\" enables all filters below. Defaults to full."
+    )
+    populate.add_argument(
+        "--paper-only",
+        action="store_true",
+        help="Skip digital-only printings."
+    )
+    populate.add_argument(
+        "--exclude-tokens",
+        action="store_true",
+        help="Skip tokens and emblems."
+    )
+    populate.add_argument(
+        "--exclude-art-cards",
+        action="store_true",
+        help="Skip art series cards."
+    )
+    populate.add_argument(
+        "--exclude-oversized",
+        action="store_true",
+        help="Skip oversized cards."
+    )
+    populate.add_argument(
+        "--all-languages",
+        action="store_true",
+        help="Download the Scryfall card data containing the printings in all languages, instead of only English "
+             "printings. This allows identifying cards by their printed, non-English names. "
+             "The download is several GB large."
+    )
+    populate.add_argument(
+        "--language",
+        action="append", default=[], dest="languages", metavar="LANGUAGE",
+        help="Only store printings in this language, given as a Scryfall language code, like en, de or ja. "
+             "Can be given multiple times. By default, all languages present in the card data are stored."
+    )
+    return populate
+
+
+def _add_populate_command(commands, ingestion_options: ArgumentParser):
+    commands.add_parser(
+        "populate", parents=[ingestion_options],
+        help="Populate an empty card database with the Scryfall card data. "
+             "Filters can be used to skip cards not needed for paper deck conversions, "
+             "which reduces the database size and the population time.")
+
+
+def _add_refresh_command(commands, ingestion_options: ArgumentParser):
+    refresh = commands.add_parser(
+        "refresh", parents=[ingestion_options],
+        help="Replace the card data with the current Scryfall card data, without interrupting running conversions. "
+             "The new card data is loaded into a separate file, which replaces the card database after it passed "
+             "all validations. Running watch commands switch to the new card data automatically.")
+    refresh.add_argument(
+        "--min-row-ratio",
+        dest="min_row_count_ratio", type=float, default=0.5,
+        help="Reject the new card data, if it contains less than this fraction of the cards, sets or printings in "
+             "the current database. Protects against incomplete downloads. Use 0 to disable. Defaults to 0.5."
+    )
+
+
+def _add_snapshot_command(commands):
+    snapshot = commands.add_parser(
+        "snapshot",
+        help="Write a compacted, integrity checked, read-only copy of the card database. "
+             "The snapshot can be shipped to other hosts and used with --immutable-database.")
+    snapshot.add_argument(
+        "snapshot_path", metavar="SNAPSHOT_FILE", type=Path,
+        help="Location of the written snapshot. The file must not exist."
+    )
+
+
+def _add_maintain_command(commands):
+    maintain = commands.add_parser(
+        "maintain",
+        help="Gather query planner statistics for the card database and report the space used by each table and "
+             "index. Optionally rebuild the database with another page size or write a compacted copy. "
+             "Reports the card lookup latency before and after.")
+    maintain.add_argument(
+        "--page-size",
+        type=int,
+        help="Rebuild the database using this page size in bytes, a power of two between 512 and 65536. "
+             "No other program may use the database during the rebuild."
+    )
+    maintain.add_argument(
+        "--vacuum-into",
+        metavar="TARGET_FILE", type=Path,
+        help="Write a compacted copy of the card database to this file. The file must not exist."
+    )
+    maintain.add_argument(
+        "--benchmark-size",
+        dest="benchmark_sample_size", type=int, default=200,
+        help="Number of randomly chosen printings looked up to measure the lookup latency. "
+             "Use 0 to skip the measurement. Defaults to 200."
+    )
+
+
 def parse_args() -> Namespace:
     """
     Generates the argument parser and use it to parse the command line arguments.
@@ -78,5 +541,10 @@ def parse_args() -> Namespace:
     :return: Parsed command line arguments
     """
     args: Namespace = _generate_argument_parser().parse_args()
+    if getattr(args, "output_formats", ()) is None:
+        args.output_formats = [_get_format_choices().output_formats[0]]
+    elif getattr(args, "output_formats", None):
+        # Remove duplicates, keeping the order
+        args.output_formats = list(dict.fromkeys(args.output_formats))
 
     return args
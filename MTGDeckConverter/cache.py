@@ -0,0 +1,112 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Persistent, content addressed cache for conversion results.
+
+A cached result is identified by the hash of the input file content, the input and output format, the program
+version and the data version of the card database. Changing any of these results in a different key, so stale entries
+are never returned. They are removed by the size-bounded eviction instead, which deletes the least recently used
+entries first.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+import tempfile
+import typing
+
+import MTGDeckConverter.constants
+import MTGDeckConverter.logger
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+__all__ = [
+    "ConversionCache",
+]
+
+
+class ConversionCache:
+
+    DEFAULT_MAX_SIZE = 100 * 2**20  # 100 MiB
+    _ENTRY_SUFFIX = ".cached"
+
+    def __init__(self, cache_dir: Path, max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.current_size = sum(entry.stat().st_size for entry in self._entries())
+        logger.info(
+            f"Opened conversion cache at {cache_dir}, using {self.current_size} of {max_size} bytes."
+        )
+
+    @staticmethod
+    def get_key(input_data: bytes, input_format: str, output_format: str, data_version: str) -> str:
+        key = hashlib.sha256(input_data)
+        for part in (input_format, output_format, MTGDeckConverter.constants.VERSION, data_version):
+            # Separate the parts, so that different combinations can not produce the same byte sequence.
+            key.update(b"\0")
+            key.update(part.encode("utf-8"))
+        return key.hexdigest()
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        entry = self._entry_path(key)
+        try:
+            result = entry.read_bytes()
+        except FileNotFoundError:
+            logger.debug(f"Cache miss for key {key}")
+            return None
+        # Mark the entry as recently used for the eviction.
+        os.utime(entry)
+        logger.debug(f"Cache hit for key {key}")
+        return result
+
+    def put(self, key: str, data: bytes):
+        entry = self._entry_path(key)
+        # Write into a temporary file first, so that concurrent readers never see partially written entries.
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=str(self.cache_dir), suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as temporary_file:
+            temporary_file.write(data)
+        try:
+            self.current_size -= entry.stat().st_size
+        except FileNotFoundError:
+            pass
+        os.replace(temporary_path, str(entry))
+        self.current_size += len(data)
+        logger.debug(f"Stored {len(data)} bytes for key {key}")
+        if self.current_size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        """Deletes the least recently used entries, until the cache size is within the configured maximum size."""
+        entries = sorted(
+            ((entry.stat(), entry) for entry in self._entries()),
+            key=lambda stat_and_entry: stat_and_entry[0].st_mtime
+        )
+        self.current_size = sum(stat.st_size for stat, _ in entries)
+        evicted = 0
+        for stat, entry in entries:
+            if self.current_size <= self.max_size:
+                break
+            entry.unlink()
+            self.current_size -= stat.st_size
+            evicted += 1
+        logger.info(f"Evicted {evicted} cache entries. Cache size is now {self.current_size} bytes.")
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / (key + self._ENTRY_SUFFIX)
+
+    def _entries(self) -> typing.Iterator[Path]:
+        return self.cache_dir.glob("*" + self._ENTRY_SUFFIX)
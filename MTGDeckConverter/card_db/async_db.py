@@ -0,0 +1,171 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+asyncio interface to the card database.
+
+The sqlite3 module is synchronous, so all queries are executed in a dedicated, bounded thread pool. Each pool thread
+borrows one of the database connections owned by the facade, so connections are never shared between concurrently
+running queries. Concurrent identical lookups are coalesced into a single query.
+"""
+
+import asyncio
+import concurrent.futures
+from pathlib import Path
+import queue
+import typing
+
+from MTGDeckConverter.card_db.db import CardDatabase
+import MTGDeckConverter.logger
+from MTGDeckConverter.model import Deck, UnresolvedCard
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+__all__ = [
+    "AsyncCardDatabase",
+]
+
+T = typing.TypeVar("T")
+
+
+class AsyncCardDatabase:
+    """
+    Provides the lookup methods of CardDatabase as coroutines. Create and use an instance from within a running event
+    loop. Await close() when it is no longer needed.
+    """
+
+    # CardDatabase methods available as lookups. Methods writing or closing the database are not exposed.
+    LOOKUP_METHODS = frozenset({
+        "get_card_set_and_number_for_name",
+        "get_collector_number_for_card_in_set",
+        "get_card_set_for_card_with_collector_number",
+        "get_english_name_for_card_in_card_set",
+        "is_set_abbreviation_known",
+        "resolve_set_abbreviation",
+        "get_data_version",
+    })
+
+    def __init__(self, database_path: typing.Union[str, Path], max_workers: int = 4, immutable: bool = False):
+        logger.info(f"Opening {max_workers} database connections for asynchronous lookups.")
+        self._connections: "queue.SimpleQueue[CardDatabase]" = queue.SimpleQueue()
+        self._all_connections = [
+            CardDatabase(database_path, immutable=immutable, check_same_thread=False) for _ in range(max_workers)
+        ]
+        for connection in self._all_connections:
+            # Commit the transaction possibly opened during the schema creation, so that it does not block others.
+            connection.db.commit()
+            self._connections.put(connection)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="AsyncCardDatabase")
+        # Lookups currently running, keyed by method name and arguments
+        self._in_flight: typing.Dict[typing.Tuple, asyncio.Future] = {}
+
+    async def close(self):
+        """
+        Waits for running lookups to finish and closes all database connections. The waiting is done in another
+        thread, so that the event loop keeps running meanwhile.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self._close)
+
+    def _close(self):
+        self._executor.shutdown(wait=True)
+        for connection in self._all_connections:
+            connection.close()
+        self._all_connections.clear()
+
+    def _run_with_connection(self, function: typing.Callable[[CardDatabase], T]) -> T:
+        """Executed in a pool thread. Borrows a connection for the duration of the function call."""
+        connection = self._connections.get()
+        try:
+            connection.reopen_if_replaced()
+            return function(connection)
+        finally:
+            self._connections.put(connection)
+
+    async def run(self, function: typing.Callable[[CardDatabase], T]) -> T:
+        """Calls function with a CardDatabase instance in the thread pool and returns the result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run_with_connection, function)
+
+    async def _lookup(self, method_name: str, *args):
+        """Runs the named CardDatabase method. Identical concurrent lookups share a single query."""
+        key = (method_name, *args)
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._executor, self._run_with_connection,
+                lambda card_db: getattr(card_db, method_name)(*args)
+            )
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield the shared future, so that a cancelled caller does not cancel the lookup for the others.
+        return await asyncio.shield(future)
+
+    async def get_card_set_and_number_for_name(self, english_name: str) -> typing.Tuple[str, str]:
+        return await self._lookup("get_card_set_and_number_for_name", english_name)
+
+    async def get_collector_number_for_card_in_set(self, english_name: str, set_abbreviation: str) -> str:
+        return await self._lookup("get_collector_number_for_card_in_set", english_name, set_abbreviation)
+
+    async def get_card_set_for_card_with_collector_number(self, english_name: str, collector_number: str) -> str:
+        return await self._lookup("get_card_set_for_card_with_collector_number", english_name, collector_number)
+
+    async def get_english_name_for_card_in_card_set(self, set_abbreviation: str, collector_number: str) -> str:
+        return await self._lookup("get_english_name_for_card_in_card_set", set_abbreviation, collector_number)
+
+    async def is_set_abbreviation_known(self, set_abbreviation: str) -> bool:
+        return await self._lookup("is_set_abbreviation_known", set_abbreviation)
+
+    async def resolve_set_abbreviation(self, set_abbreviation: str) -> typing.Optional[str]:
+        return await self._lookup("resolve_set_abbreviation", set_abbreviation)
+
+    async def get_data_version(self) -> typing.Optional[str]:
+        return await self._lookup("get_data_version")
+
+    async def batch_lookup(
+            self, method_name: str,
+            arguments: typing.Iterable[typing.Tuple]) -> typing.List[typing.Union[typing.Any, ValueError]]:
+        """
+        Runs the named lookup method once for each argument tuple, using a single executor hop.
+        Returns the results in the order of the arguments. Lookups that fail with a ValueError, because the card
+        is not found, return the exception in place of the result.
+        :raises ValueError: If method_name is not one of the LOOKUP_METHODS
+        """
+        if method_name not in self.LOOKUP_METHODS:
+            error_msg = f'Unknown lookup method "{method_name}". Known lookup methods: ' \
+                        f'{", ".join(sorted(self.LOOKUP_METHODS))}'
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        arguments = list(arguments)
+
+        def lookup_all(card_db: CardDatabase):
+            method = getattr(card_db, method_name)
+            results = []
+            for args in arguments:
+                try:
+                    results.append(method(*args))
+                except ValueError as e:
+                    results.append(e)
+            return results
+
+        return await self.run(lookup_all)
+
+    async def fill_missing_information(self, deck: Deck) -> typing.List[UnresolvedCard]:
+        """
+        Resolves all cards in the deck in a single executor hop, as done by Deck.fill_missing_information().
+        Returns all cards that could not be identified.
+        """
+        return await self.run(lambda card_db: deck.fill_missing_information(card_db, collect_errors=True))
@@ -17,13 +17,18 @@ import atexit
 import datetime
 from http import HTTPStatus
 import importlib.resources
+import io
+import json
 import sqlite3
-from typing import NamedTuple, Union, List, Tuple
+import time
+from typing import NamedTuple, Union, List, Tuple, Optional, Dict, FrozenSet, Iterable, Iterator, TextIO
+import uuid
 from pathlib import Path
 
 import requests
 
 from MTGDeckConverter.logger import get_logger
+import MTGDeckConverter.memory_accounting as memory_accounting
 
 logger = get_logger(__name__)
 
@@ -33,6 +38,76 @@ class CompatibleSchemaVersions(NamedTuple):
     exclusive_max: int
 
 
+# Keys used in the Database_Metadata table
+DATA_VERSION_KEY = "data_version"
+POPULATED_AT_KEY = "populated_at"
+INGESTION_PROFILE_KEY = "ingestion_profile"
+
+# Scryfall language code of English printings
+ENGLISH = "en"
+
+# Scryfall bulk data files. "default_cards" contains every printing in English, or in the printed language for cards
+# not printed in English. "all_cards" contains every printing in every language.
+SCRYFALL_BULK_DATA_URLS = {
+    "default_cards": "https://archive.scryfall.com/json/scryfall-default-cards.json",
+    "all_cards": "https://archive.scryfall.com/json/scryfall-all-cards.json",
+}
+
+
+class IngestionProfile(NamedTuple):
+    """
+    Filters applied to the card data while populating the database. Excluded cards are not stored,
+    which reduces the database size and the population time.
+    """
+    # Skip printings that do not exist as physical cards, like cards only available on Magic Online or Arena.
+    paper_only: bool = False
+    # Skip tokens and emblems.
+    exclude_tokens: bool = False
+    # Skip art series cards.
+    exclude_art_cards: bool = False
+    # Skip oversized cards, like the oversized commanders or planes.
+    exclude_oversized: bool = False
+    # Only store printings in these languages, given as Scryfall language codes. Empty to store all languages.
+    languages: FrozenSet[str] = frozenset()
+
+    def get_exclusion_reason(self, card: dict) -> Optional[str]:
+        """Returns the name of the filter excluding the given Scryfall card object, or None, if it is included."""
+        if self.languages and card.get("lang", ENGLISH) not in self.languages:
+            return "languages"
+        if self.paper_only and (card.get("digital", False) or "paper" not in card.get("games", ("paper",))):
+            return "paper_only"
+        if self.exclude_tokens and (card.get("layout") in _TOKEN_LAYOUTS or card.get("set_type") == "token"):
+            return "exclude_tokens"
+        if self.exclude_art_cards and card.get("layout") == "art_series":
+            return "exclude_art_cards"
+        if self.exclude_oversized and card.get("oversized", False):
+            return "exclude_oversized"
+        return None
+
+    def describe(self) -> str:
+        filters = [name for name, enabled in self._asdict().items() if enabled is True]
+        if self.languages:
+            filters.append("languages=" + "+".join(sorted(self.languages)))
+        return ",".join(filters) or "full"
+
+
+_TOKEN_LAYOUTS = {"token", "double_faced_token", "emblem"}
+
+INGESTION_PROFILES = {
+    "full": IngestionProfile(),
+    "slim": IngestionProfile(paper_only=True, exclude_tokens=True, exclude_art_cards=True, exclude_oversized=True),
+}
+
+
+class PopulationStatistics(NamedTuple):
+    total_cards: int
+    ingested_cards: int
+    # Number of excluded cards per ingestion profile filter
+    excluded_cards: Dict[str, int]
+    elapsed_seconds: float
+    database_size: int
+
+
 class CardDatabase:
 
     """
@@ -42,27 +117,83 @@ class CardDatabase:
     It is used to fill in missing, but required information bits. For example the collector number,
     in case an output writer (e.g. XMage) requires data
     that is not present in the parsed input (e.g. tappedout.com CSV exports).
+    When new sets are released, update the card data using refresh.refresh_database().
     """
-    # TODO: Implement updating the present data when new sets are released.
-    #       Either implement an update function or simply drop the content
-    #       and re-download everything.
 
-    COMPATIBLE_SCHEMA_VERSIONS = CompatibleSchemaVersions(4, 5)
+    COMPATIBLE_SCHEMA_VERSIONS = CompatibleSchemaVersions(7, 8)
+    # Memory map size used for immutable database snapshots. SQLite caps this at its compile-time maximum.
+    SNAPSHOT_MMAP_SIZE = 2**30
+    # Number of printings inserted at once while populating the database
+    POPULATION_BATCH_SIZE = 10000
 
-    def __init__(self, database_path: Union[str, Path], do_validate_schema: bool = True):
-        logger.info(f"About to open database: {database_path}, validating schema: {do_validate_schema}")
-        if isinstance(database_path, Path):
-            database_path = str(database_path)
-        self.db = sqlite3.connect(database=database_path)
+    def __init__(
+            self, database_path: Union[str, Path], do_validate_schema: bool = True, immutable: bool = False,
+            check_same_thread: bool = True):
+        """
+        :param database_path: Location of the database file
+        :param do_validate_schema: Check, if the database schema version is supported by this program version.
+        :param immutable: Open a read-only database snapshot, as created by create_snapshot(). The database is never
+            written and the file must not be changed while opened. Schema creation is skipped.
+        :param check_same_thread: Passed to sqlite3.connect(). If False, the instance may be used by other threads than
+            the one creating it, as long as only one thread uses it at a time.
+        """
+        logger.info(
+            f"About to open database: {database_path}, validating schema: {do_validate_schema}, immutable: {immutable}"
+        )
+        self.database_path = Path(database_path)
+        self.immutable = immutable
+        self._check_same_thread = check_same_thread
+        self._connect()
         atexit.register(self._close_db)
-        self.db.row_factory = sqlite3.Row
-        self._create_schema_if_not_present()
+        # Maps lower case set codes to Scryfall set abbreviations, or None for unknown codes. Loaded on first use.
+        self._set_abbreviations: Optional[Dict[str, Optional[str]]] = None
+        if not immutable:
+            self._create_schema_if_not_present()
         if do_validate_schema:
             self._validate_schema_version()
             logger.info("Opened database in checked mode and schema version checks passed.")
         else:
             logger.info("Opened database in unchecked mode. No schema version checks were performed.")
 
+    def _connect(self):
+        # Identify the opened file before connecting. If the file is replaced in between, the next call of
+        # reopen_if_replaced() reopens it again, which is harmless.
+        self._file_id = self._get_file_id()
+        if self.immutable:
+            database_uri = self.database_path.resolve().as_uri() + "?mode=ro&immutable=1"
+            self.db = sqlite3.connect(database=database_uri, uri=True, check_same_thread=self._check_same_thread)
+            self.db.execute(f"PRAGMA mmap_size = {self.SNAPSHOT_MMAP_SIZE}")
+        else:
+            self.db = sqlite3.connect(database=str(self.database_path), check_same_thread=self._check_same_thread)
+        if self._file_id is None:
+            # A new database file was created by connecting to it.
+            self._file_id = self._get_file_id()
+        self.db.row_factory = sqlite3.Row
+
+    def _get_file_id(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.database_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def reopen_if_replaced(self) -> bool:
+        """
+        Checks, if the database file was replaced by another file, for example by refresh_database(), and reopens
+        the database in that case. Long-running users should call this regularly, to use refreshed card data
+        without restarting. Returns True, if the database was reopened.
+        """
+        file_id = self._get_file_id()
+        if file_id is None or file_id == self._file_id:
+            return False
+        logger.info(f"The database file {self.database_path} was replaced. Reopening it.")
+        self._close_db()
+        self._connect()
+        self._validate_schema_version()
+        self._set_abbreviations = None
+        logger.info(f"Reopened the database. The data version is now {self.get_data_version()}")
+        return True
+
     def _validate_schema_version(self):
         current_db_schema_version = self.get_current_schema_version()
         if current_db_schema_version < self.COMPATIBLE_SCHEMA_VERSIONS.inclusive_min:
@@ -93,6 +224,11 @@ class CardDatabase:
     def get_current_schema_version(self) -> int:
         return self.db.execute("PRAGMA user_version").fetchall()[0][0]
 
+    def close(self):
+        """Closes the database connection. Otherwise, it is closed when the program exits."""
+        atexit.unregister(self._close_db)
+        self._close_db()
+
     def _close_db(self):
         if self.db is None:
             error_msg = "Invalid state: close_db() called twice!"
@@ -110,58 +246,175 @@ class CardDatabase:
             "FROM Printing)").fetchone()[0]
         return bool(result)
 
-    def populate_database(self, path_to_data: Path = None):
+    def populate_database(
+            self, path_to_data: Path = None,
+            profile: IngestionProfile = IngestionProfile(),
+            bulk_data_type: str = "default_cards") -> Optional[PopulationStatistics]:
+        """
+        Populates the empty database with the Scryfall card data. Cards excluded by the given ingestion profile are
+        skipped. Returns statistics about the population process, or None, if the database already contained data.
+
+        The card data is read as a stream and inserted in batches, so that the memory usage does not depend on the
+        size of the card data. This allows ingesting the "all_cards" bulk data file, which contains the printings in
+        all languages.
+        :param path_to_data: Read the card data from this bulk data file, instead of downloading it.
+        :param bulk_data_type: The bulk data file to download, a key of SCRYFALL_BULK_DATA_URLS.
+        """
+        if self.immutable:
+            error_msg = "Can not populate a database opened in immutable mode."
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
         if self.is_database_populated():
             logger.warning("The database already contains data. Skipping the population process.")
-            return
-        card_data_list = _request_scryfall_card_data(path_to_data)
+            return None
+        start_time = time.perf_counter()
+        logger.info(f"Populating the database using ingestion profile {profile.describe()}")
+        total_cards = 0
+        excluded_cards: Dict[str, int] = {}
         self.db.rollback()
         cursor = self.db.cursor()
         cursor.execute("BEGIN TRANSACTION")
+        # The IDs of all cards and sets are kept in memory, which avoids a lookup for each inserted printing.
+        card_ids: Dict[str, int] = dict(cursor.execute("SELECT Scryfall_Oracle_ID, Card_ID FROM Card").fetchall())
+        set_ids: Dict[str, int] = dict(cursor.execute("SELECT Abbreviation, Set_ID FROM Card_Set").fetchall())
+        rarity_ids: Dict[str, int] = {
+            name.lower(): rarity_id for rarity_id, name in cursor.execute("SELECT Rarity_ID, Name FROM Rarity")
+        }
+        printings: List[tuple] = []
         try:
-            for card in card_data_list:
-                oracle_id = card["oracle_id"]
-                set_abbr = card["set"]
-                if not bool(cursor.execute(
-                        "SELECT EXISTS( "
-                        "SELECT * "
-                        "FROM Card "
-                        "WHERE Scryfall_Oracle_ID = ?)", (oracle_id,)).fetchone()[0]):
-                    # TODO: This may not work and may require further normalization.
-                    card_type = card["type_line"].split(" — ")[0]
-                    cursor.execute("INSERT INTO Card (English_Name, Card_Type, Scryfall_Oracle_ID) "
-                                   "VALUES (?, ?, ?)", (card["name"], card_type, oracle_id))
-                if not bool(cursor.execute(
-                        "SELECT EXISTS( "
-                        "SELECT * "
-                        "FROM Card_Set "
-                        "WHERE Abbreviation = ?)", (set_abbr,)).fetchone()[0]):
-                    release_date = datetime.date.fromisoformat(card["released_at"])
-                    cursor.execute("INSERT INTO Card_Set (English_Name, Abbreviation, Release_date) "
-                                   "VALUES (?, ?, ?)", (card["set_name"], set_abbr, release_date))
-
-                rarity = "Land" \
-                    if card["name"] in ("Plains", "Island", "Swamp", "Mountain", "Forest") \
-                    else card["rarity"].title()
-                # Do the table ID lookups by the unique set abbreviation and oracle id
-
-                # This query joins unconnected relations and filters for the single tuple that contains the required
-                # unique IDs
-                cursor.execute(
-                    "INSERT INTO Printing (Card_ID, Set_ID, Rarity_ID, Collector_Number, Scryfall_Card_ID) "
-                    "SELECT Card_ID, Set_ID, Rarity.Rarity_ID, ?, ? "
-                    "FROM Rarity "
-                    "INNER JOIN Card_Set "
-                    "INNER JOIN Card "
-                    "WHERE Card_Set.Abbreviation = ? "
-                    "AND Card.Scryfall_Oracle_ID = ? "
-                    "AND Rarity.Name = ?",
-                    (card["collector_number"], card["id"], set_abbr, oracle_id, rarity))
+            # Downloading and decoding the card data runs as nested stages, while the loop waits for the next card.
+            with memory_accounting.stage(memory_accounting.INSERT):
+                for card in _request_scryfall_card_data(path_to_data, bulk_data_type):
+                    total_cards += 1
+                    exclusion_reason = profile.get_exclusion_reason(card) or _get_missing_data_reason(card)
+                    if exclusion_reason is not None:
+                        excluded_cards[exclusion_reason] = excluded_cards.get(exclusion_reason, 0) + 1
+                        continue
+                    oracle_id = _get_card_field(card, "oracle_id")
+                    set_abbr = card["set"]
+                    card_id = card_ids.get(oracle_id)
+                    if card_id is None:
+                        # TODO: This may not work and may require further normalization.
+                        card_type = _get_card_field(card, "type_line").split(" — ")[0]
+                        card_id = card_ids[oracle_id] = cursor.execute(
+                            "INSERT INTO Card (English_Name, Card_Type, Scryfall_Oracle_ID) "
+                            "VALUES (?, ?, ?)", (card["name"], card_type, oracle_id)).lastrowid
+                    set_id = set_ids.get(set_abbr)
+                    if set_id is None:
+                        release_date = datetime.date.fromisoformat(card["released_at"])
+                        set_id = set_ids[set_abbr] = cursor.execute(
+                            "INSERT INTO Card_Set (English_Name, Abbreviation, Release_date, Is_Paper_Set) "
+                            "VALUES (?, ?, ?, ?)",
+                            (card["set_name"], set_abbr, release_date, not card.get("digital", False))).lastrowid
+
+                    rarity = "Land" \
+                        if card["name"] in ("Plains", "Island", "Swamp", "Mountain", "Forest") \
+                        else card["rarity"]
+                    language = card.get("lang", ENGLISH)
+                    printed_name = None if language == ENGLISH else _get_printed_name(card)
+                    printings.append((
+                        card_id, set_id, rarity_ids[rarity.lower()], card["collector_number"], language, printed_name,
+                        card["id"]
+                    ))
+                    if len(printings) >= self.POPULATION_BATCH_SIZE:
+                        self._insert_printings(cursor, printings)
+                self._insert_printings(cursor, printings)
+            self._stamp_data_version(cursor)
+            cursor.execute(
+                "INSERT OR REPLACE INTO Database_Metadata (Key, Value) VALUES (?, ?)",
+                (INGESTION_PROFILE_KEY, profile.describe()))
         except Exception as e:
             self.db.rollback()
             raise e
         else:
             self.db.commit()
+            self._set_abbreviations = None
+        statistics = PopulationStatistics(
+            total_cards=total_cards,
+            ingested_cards=total_cards - sum(excluded_cards.values()),
+            excluded_cards=excluded_cards,
+            elapsed_seconds=time.perf_counter() - start_time,
+            database_size=self.get_database_size(),
+        )
+        logger.info(
+            f"Ingested {statistics.ingested_cards} of {total_cards} cards in {statistics.elapsed_seconds:.1f} seconds. "
+            f"Excluded by filter: {excluded_cards}. Database size: {statistics.database_size} bytes."
+        )
+        return statistics
+
+    @staticmethod
+    def _insert_printings(cursor: sqlite3.Cursor, printings: List[tuple]):
+        """Inserts the given printings and clears the list."""
+        cursor.executemany(
+            "INSERT INTO Printing "
+            "(Card_ID, Set_ID, Rarity_ID, Collector_Number, Language, Printed_Name, Scryfall_Card_ID) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", printings)
+        logger.debug(f"Inserted {len(printings)} printings.")
+        printings.clear()
+
+    def get_database_size(self) -> int:
+        """Returns the size of the database content in bytes, including content still in the write-ahead log."""
+        page_count = self.db.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self.db.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def _stamp_data_version(self, cursor: sqlite3.Cursor):
+        """
+        Assigns a new, unique data version to the database content. Everything derived from the card data, like cached
+        conversion results, has to be invalidated when the data version changes.
+        """
+        data_version = uuid.uuid4().hex
+        logger.info(f"Stamping the card data with data version {data_version}")
+        cursor.executemany(
+            "INSERT OR REPLACE INTO Database_Metadata (Key, Value) VALUES (?, ?)",
+            ((DATA_VERSION_KEY, data_version), (POPULATED_AT_KEY, datetime.datetime.now().isoformat()))
+        )
+
+    def get_metadata(self, key: str) -> Optional[str]:
+        result = self.db.execute(
+            "SELECT Value "
+            "FROM Database_Metadata "
+            "WHERE Key = ?", (key,)).fetchone()
+        return None if result is None else result["Value"]
+
+    def get_data_version(self) -> Optional[str]:
+        """Returns the version of the stored card data. Returns None, if the database is not populated."""
+        return self.get_metadata(DATA_VERSION_KEY)
+
+    def create_snapshot(self, snapshot_path: Path):
+        """
+        Writes a compacted, read-only copy of this database to snapshot_path, to be opened in immutable mode.
+        The snapshot is vacuumed, contains query planner statistics and passed an integrity check.
+        :raises FileExistsError: If snapshot_path already exists
+        :raises ValueError: If the database is not populated or the snapshot fails the integrity check
+        """
+        if not self.is_database_populated():
+            error_msg = "Can not create a snapshot of an empty database."
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        if snapshot_path.exists():
+            error_msg = f"Snapshot target {snapshot_path} already exists."
+            logger.error(error_msg)
+            raise FileExistsError(error_msg)
+        logger.info(f"Writing a database snapshot to {snapshot_path}")
+        # VACUUM can not run inside a transaction.
+        self.db.rollback()
+        self.db.execute("VACUUM INTO ?", (str(snapshot_path),))
+        snapshot = sqlite3.connect(str(snapshot_path), isolation_level=None)
+        try:
+            # Immutable databases can not use a write-ahead log, because it is never read.
+            snapshot.execute("PRAGMA journal_mode = DELETE")
+            snapshot.execute("ANALYZE")
+            snapshot.execute("VACUUM")
+            integrity_check_result = snapshot.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            snapshot.close()
+        if integrity_check_result != [("ok",)]:
+            snapshot_path.unlink()
+            error_msg = f"The database snapshot failed the integrity check: {integrity_check_result}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        logger.info(f"Created database snapshot {snapshot_path} with size {snapshot_path.stat().st_size} bytes.")
 
     def get_card_set_and_number_for_name(self, english_name: str) -> Tuple[str, str]:
         found_cards = self.db.execute(
@@ -218,6 +471,95 @@ class CardDatabase:
                 f'Set "{set_abbreviation}" does not have a card with collector’s number "{collector_number}".'
             )
 
+    def get_scryfall_id_for_printing(self, set_abbreviation: str, collector_number: str) -> str:
+        """
+        Returns the Scryfall card ID of the printing with the given set and collector number. Prefers the English
+        printing, if the card was also printed in other languages.
+        Unlike the internal Printing_ID, the Scryfall ID stays the same when the database is populated again.
+        """
+        found_cards = self.db.execute(
+            "SELECT Scryfall_Card_ID "
+            "FROM Printing "
+            "INNER JOIN Card_Set USING (Set_ID) "
+            "WHERE Abbreviation = ? "
+            "AND Collector_Number = ? "
+            "ORDER BY Language = ? DESC, Printing_ID "
+            "LIMIT 1",
+            (set_abbreviation.lower(), str(collector_number).lower(), ENGLISH)
+        ).fetchall()
+        if found_cards:
+            return found_cards[0]["Scryfall_Card_ID"]
+        else:
+            raise ValueError(
+                f'Set "{set_abbreviation}" does not have a card with collector’s number "{collector_number}".'
+            )
+
+    def get_printing_and_card_id(self, set_abbreviation: str, collector_number: str) -> Tuple[int, int]:
+        """
+        Returns the internal Printing_ID and Card_ID of the printing with the given set and collector number.
+        Prefers the English printing, if the card was also printed in other languages.
+        These IDs change, when the database is populated again, as indicated by a changed data version.
+        """
+        found_cards = self.db.execute(
+            "SELECT Printing_ID, Card_ID "
+            "FROM Printing "
+            "INNER JOIN Card_Set USING (Set_ID) "
+            "WHERE Abbreviation = ? "
+            "AND Collector_Number = ? "
+            "ORDER BY Language = ? DESC, Printing_ID "
+            "LIMIT 1",
+            (set_abbreviation.lower(), str(collector_number).lower(), ENGLISH)
+        ).fetchall()
+        if found_cards:
+            return found_cards[0]["Printing_ID"], found_cards[0]["Card_ID"]
+        else:
+            raise ValueError(
+                f'Set "{set_abbreviation}" does not have a card with collector’s number "{collector_number}".'
+            )
+
+    def get_card_ids_for_name(self, english_name: str) -> List[int]:
+        """
+        Returns the internal Card_IDs of all cards with the given English name. Most names belong to a single card,
+        but some silver bordered cards share their name.
+        """
+        found_cards = self.db.execute(
+            "SELECT Card_ID "
+            "FROM Card "
+            "WHERE English_Name = ?",
+            (english_name,)
+        ).fetchall()
+        if found_cards:
+            return [row["Card_ID"] for row in found_cards]
+        else:
+            raise ValueError(f'Card with name "{english_name}" not found')
+
+    def get_card_names(self, card_ids: Iterable[int]) -> Dict[int, str]:
+        """Returns the English names of the cards with the given internal Card_IDs."""
+        card_ids = list(card_ids)
+        return dict(self.db.execute(
+            f"SELECT Card_ID, English_Name "
+            f"FROM Card "
+            f"WHERE Card_ID IN ({', '.join('?' * len(card_ids))})",
+            card_ids
+        ).fetchall())
+
+    def get_english_name_for_printed_name(self, printed_name: str, language: str) -> str:
+        """
+        Returns the English name of the card printed with the given name in the given language.
+        The language is a Scryfall language code. Requires a database populated with the printings in that language.
+        """
+        found_cards = self.db.execute(
+            "SELECT English_Name "
+            "FROM Localized_Printings_View "
+            "WHERE Printed_Name = ? "
+            "AND Language = ?",
+            (printed_name, language.lower())
+        ).fetchall()
+        if found_cards:
+            return found_cards[0]["English_Name"]
+        else:
+            raise ValueError(f'Card with printed name "{printed_name}" not found in language "{language}".')
+
     def is_set_abbreviation_known(self, set_abbreviation: str) -> bool:
         """
         Check, if the set abbreviation is known.
@@ -233,12 +575,68 @@ class CardDatabase:
         ).fetchone()[0])
         return is_known
 
-
-def _request_scryfall_card_data(path_to_data: Path = None) -> List[dict]:
+    def resolve_set_abbreviation(self, set_abbreviation: str) -> Optional[str]:
+        """
+        Returns the Scryfall set abbreviation for the given set code. The code may be an alias used by another source,
+        as listed in the Set_Abbreviation_Alias table. Returns None, if the set is unknown.
+        The aliases are loaded once. All other codes are looked up at most once, including unknown codes.
+        """
+        if self._set_abbreviations is None:
+            self._set_abbreviations = self._load_set_abbreviation_aliases()
+        code = set_abbreviation.lower()
+        try:
+            return self._set_abbreviations[code]
+        except KeyError:
+            result = code if self.is_set_abbreviation_known(code) else None
+            if result is None:
+                logger.info(f'Unknown set abbreviation "{set_abbreviation}".')
+            self._set_abbreviations[code] = result
+            return result
+
+    def _load_set_abbreviation_aliases(self) -> Dict[str, Optional[str]]:
+        # Only use aliases pointing to sets present in the database.
+        aliases = dict(self.db.execute(
+            "SELECT Alias, Abbreviation "
+            "FROM Set_Abbreviation_Alias "
+            "INNER JOIN Card_Set USING (Abbreviation)"
+        ).fetchall())
+        logger.debug(f"Loaded {len(aliases)} set abbreviation aliases.")
+        return aliases
+
+
+def _get_missing_data_reason(card: dict) -> Optional[str]:
+    """Returns a reason to skip the given Scryfall card object, if it lacks required data, or None otherwise."""
+    if _get_card_field(card, "oracle_id") is None:
+        # Some reversible cards only have Oracle IDs on their faces, and they differ per face.
+        return "missing_oracle_id"
+    return None
+
+
+def _get_card_field(card: dict, key: str):
+    """Returns the field of the Scryfall card object. Falls back to the first face, for multi-faced cards."""
+    try:
+        return card[key]
+    except KeyError:
+        faces = card.get("card_faces")
+        return faces[0].get(key) if faces else None
+
+
+def _get_printed_name(card: dict) -> Optional[str]:
+    """Returns the name printed on a non-English card, like Scryfall formats names of multi-faced cards."""
+    if "printed_name" in card:
+        return card["printed_name"]
+    face_names = [face.get("printed_name") for face in card.get("card_faces", ())]
+    return " // ".join(face_names) if face_names and all(face_names) else None
+
+
+def _request_scryfall_card_data(path_to_data: Path = None, bulk_data_type: str = "default_cards") -> Iterator[dict]:
     """
     Use the Scryfall API bulk data end point to download the card data.
     See the API documentation: https://scryfall.com/docs/api/bulk-data
-    The returned list contains > 50000 card entries (as of December 2019).
+    The "default_cards" data contains > 50000 card entries (as of December 2019), the "all_cards" data contains
+    several hundred thousand entries.
+
+    The card data is streamed and decoded incrementally, so only a small part of the data is held in memory.
 
     If path_to_data is given, the file content will be used as a substitute.
     This is factored out into a static function used by the CardDatabase class to aid testing.
@@ -246,16 +644,60 @@ def _request_scryfall_card_data(path_to_data: Path = None) -> List[dict]:
 
     """
     if path_to_data is None:
-        logger.info("About to request card data from the Scryfall bulk data API.")
-        card_data_request = requests.get("https://archive.scryfall.com/json/scryfall-default-cards.json")
-        if card_data_request.status_code != HTTPStatus.OK:
-            error_msg = f"Request to download the card data failed with status code {card_data_request.status_code}"
-            logger.error(error_msg)
-            raise RuntimeError(error_msg)
-        card_data_list: List[dict] = card_data_request.json()
+        logger.info(f"About to request the {bulk_data_type} card data from the Scryfall bulk data API.")
+        with requests.get(SCRYFALL_BULK_DATA_URLS[bulk_data_type], stream=True) as card_data_request:
+            if card_data_request.status_code != HTTPStatus.OK:
+                error_msg = f"Request to download the card data failed with status code " \
+                            f"{card_data_request.status_code}"
+                logger.error(error_msg)
+                raise RuntimeError(error_msg)
+            # Let urllib3 undo a transfer compression
+            card_data_request.raw.decode_content = True
+            yield from _iter_json_array(io.TextIOWrapper(card_data_request.raw, encoding="utf-8"))
         logger.info("Requested the card data from the Scryfall bulk data API end point.")
     else:
         logger.info(f'Path to a Scryfall API data dump given. Loading data from "{path_to_data}".')
-        import json
-        card_data_list = json.loads(path_to_data.read_text())
-    return card_data_list
+        with path_to_data.open("r", encoding="utf-8") as card_data_file:
+            yield from _iter_json_array(card_data_file)
+
+
+def _iter_json_array(stream: TextIO, chunk_size: int = 2**20) -> Iterator[dict]:
+    """
+    Decodes the JSON array read from the given text stream and yields its elements one by one.
+    The stream is read in chunks, so that the whole array never has to be held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with memory_accounting.stage(memory_accounting.DOWNLOAD):
+        chunk = stream.read(chunk_size)
+        buffer = chunk.lstrip("\ufeff \t\r\n")
+        # The leading white space may span more than one chunk
+        while chunk and not buffer:
+            chunk = stream.read(chunk_size)
+            buffer = chunk.lstrip("\ufeff \t\r\n")
+    if not buffer.startswith("["):
+        error_msg = "The card data is not a JSON array."
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    position = 1
+    end_of_stream = False
+    while True:
+        # Skip white space and the separators between the array elements
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            with memory_accounting.stage(memory_accounting.DECODE):
+                element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The element is incomplete, so read more data. Fail, if the stream is already exhausted.
+            if end_of_stream:
+                raise
+            with memory_accounting.stage(memory_accounting.DOWNLOAD):
+                chunk = stream.read(chunk_size)
+            end_of_stream = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+        else:
+            yield element
+            position = end
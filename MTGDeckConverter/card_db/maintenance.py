@@ -0,0 +1,235 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Maintenance of a populated card database.
+
+Populating the database does not gather query planner statistics, so the planner has to guess the join order of the
+lookup views. Reloading the card data also leaves free pages behind. The functions in this module gather the
+statistics, report the space used by each table and index, rebuild the database with another page size and write
+compacted copies. A micro-benchmark over the lookups used during conversions shows the effect.
+"""
+
+from pathlib import Path
+import random
+import sqlite3
+import time
+from typing import NamedTuple, List, Optional, Dict, Callable
+
+from .db import CardDatabase
+
+from MTGDeckConverter.logger import get_logger
+
+logger = get_logger(__name__)
+
+__all__ = [
+    "ObjectSize",
+    "MaintenanceReport",
+    "VALID_PAGE_SIZES",
+    "get_object_sizes",
+    "analyze",
+    "rebuild_with_page_size",
+    "vacuum_into",
+    "benchmark_lookups",
+    "maintain_database",
+]
+
+VALID_PAGE_SIZES = tuple(2**exponent for exponent in range(9, 17))
+# Estimated per-row storage overhead in bytes, used when the dbstat virtual table is not available:
+# Cell pointer, payload size, rowid and record header
+_ESTIMATED_ROW_OVERHEAD = 6
+
+# Lookups performed while filling in missing card information, see model.Card. Each takes a sampled
+# (English name, set abbreviation, collector number) row.
+_BENCHMARKED_LOOKUPS: Dict[str, Callable[[CardDatabase, sqlite3.Row], object]] = {
+    "set_and_number_for_name": lambda card_db, row: card_db.get_card_set_and_number_for_name(row[0]),
+    "number_for_name_in_set": lambda card_db, row: card_db.get_collector_number_for_card_in_set(row[0], row[1]),
+    "set_for_name_and_number": lambda card_db, row: card_db.get_card_set_for_card_with_collector_number(
+        row[0], row[2]),
+    "name_for_printing": lambda card_db, row: card_db.get_english_name_for_card_in_card_set(row[1], row[2]),
+}
+
+
+class ObjectSize(NamedTuple):
+    name: str
+    # "table" or "index"
+    type: str
+    size: int
+    # True, if the size was estimated from the stored data, because the dbstat virtual table is not available.
+    estimated: bool
+
+
+class MaintenanceReport(NamedTuple):
+    page_size: int
+    database_size_before: int
+    database_size_after: int
+    object_sizes: List[ObjectSize]
+    # Mean lookup latency in microseconds, keyed by lookup. Empty, if the benchmark was skipped.
+    lookup_latency_before: Dict[str, float]
+    lookup_latency_after: Dict[str, float]
+
+
+def get_object_sizes(card_db: CardDatabase) -> List[ObjectSize]:
+    """
+    Returns the space used by each table and index, sorted by descending size. The sizes are taken from the dbstat
+    virtual table. If SQLite was compiled without it, the sizes are estimated from the length of the stored values.
+    """
+    objects = card_db.db.execute(
+        "SELECT name, type, tbl_name, sql FROM sqlite_master WHERE type IN ('table', 'index') ORDER BY name"
+    ).fetchall()
+    try:
+        page_sizes = dict(card_db.db.execute("SELECT name, sum(pgsize) FROM dbstat GROUP BY name").fetchall())
+    except sqlite3.OperationalError:
+        logger.info("The dbstat virtual table is not available. Estimating the table and index sizes.")
+        sizes = [
+            ObjectSize(row["name"], row["type"], _estimate_size(card_db, row), True) for row in objects
+        ]
+    else:
+        sizes = [ObjectSize(row["name"], row["type"], page_sizes.get(row["name"], 0), False) for row in objects]
+    sizes.sort(key=lambda object_size: object_size.size, reverse=True)
+    return sizes
+
+
+def _estimate_size(card_db: CardDatabase, sqlite_master_row: sqlite3.Row) -> int:
+    """Estimates the size of a table or index by summing up the length of all stored values."""
+    if sqlite_master_row["type"] == "table":
+        columns = [row["name"] for row in card_db.db.execute(f'PRAGMA table_info("{sqlite_master_row["name"]}")')]
+    else:
+        # Rowid (-1) and expression (-2) columns are not read. They are covered by the row overhead.
+        columns = [
+            row["name"] for row in card_db.db.execute(f'PRAGMA index_xinfo("{sqlite_master_row["name"]}")')
+            if row["cid"] >= 0
+        ]
+    value_lengths = " + ".join(f'ifnull(length(CAST("{column}" AS BLOB)), 0)' for column in columns) or "0"
+    # Partial indexes are estimated as if they covered the whole table.
+    row = card_db.db.execute(
+        f'SELECT count(*), total({value_lengths}) FROM "{sqlite_master_row["tbl_name"]}"'
+    ).fetchone()
+    row_count, value_size = row[0], int(row[1])
+    return value_size + row_count * (_ESTIMATED_ROW_OVERHEAD + len(columns))
+
+
+def analyze(card_db: CardDatabase):
+    """Gathers the query planner statistics in sqlite_stat1 and lets SQLite apply other recommended optimizations."""
+    logger.info("Gathering query planner statistics.")
+    card_db.db.execute("ANALYZE")
+    card_db.db.execute("PRAGMA optimize")
+    card_db.db.commit()
+
+
+def rebuild_with_page_size(card_db: CardDatabase, page_size: int):
+    """
+    Rebuilds the database in place, using the given page size. The page size of a database using the write-ahead log
+    can not change, so the database is temporarily switched to the rollback journal. This requires, that no other
+    connection uses the database.
+    :raises ValueError: If page_size is not a power of two between 512 and 65536.
+    """
+    if page_size not in VALID_PAGE_SIZES:
+        error_msg = f"Invalid page size {page_size}. Valid page sizes are: {', '.join(map(str, VALID_PAGE_SIZES))}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    logger.info(f"Rebuilding the database with page size {page_size}.")
+    # Neither VACUUM nor changing the journal mode can run inside a transaction.
+    card_db.db.rollback()
+    journal_mode = card_db.db.execute("PRAGMA journal_mode").fetchone()[0]
+    if journal_mode == "wal":
+        card_db.db.execute("PRAGMA journal_mode = DELETE")
+    card_db.db.execute(f"PRAGMA page_size = {page_size}")
+    card_db.db.execute("VACUUM")
+    if journal_mode == "wal":
+        card_db.db.execute("PRAGMA journal_mode = WAL")
+    new_page_size = card_db.db.execute("PRAGMA page_size").fetchone()[0]
+    if new_page_size != page_size:
+        error_msg = f"Unable to change the page size. The database still uses page size {new_page_size}."
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+
+def vacuum_into(card_db: CardDatabase, target_path: Path):
+    """
+    Writes a compacted copy of the database to target_path. Unlike a snapshot, the copy keeps the journal mode and
+    can be used as a regular, writable card database.
+    :raises FileExistsError: If target_path already exists
+    """
+    if target_path.exists():
+        error_msg = f"Target {target_path} of the compacted copy already exists."
+        logger.error(error_msg)
+        raise FileExistsError(error_msg)
+    logger.info(f"Writing a compacted copy of the database to {target_path}")
+    card_db.db.rollback()
+    card_db.db.execute("VACUUM INTO ?", (str(target_path),))
+    logger.info(f"Wrote the compacted copy with size {target_path.stat().st_size} bytes.")
+
+
+def benchmark_lookups(card_db: CardDatabase, sample_size: int = 200, seed: int = 0) -> Dict[str, float]:
+    """
+    Measures the mean latency of the card lookups used during conversions, in microseconds. Each lookup runs once for
+    sample_size randomly chosen English printings. The sample only depends on the seed and the database content,
+    so that runs before and after a maintenance operation are comparable.
+    """
+    printing_ids = [row[0] for row in card_db.db.execute("SELECT Printing_ID FROM Printing WHERE Language = 'en'")]
+    sample_ids = random.Random(seed).sample(printing_ids, min(sample_size, len(printing_ids)))
+    if not sample_ids:
+        return {}
+    # Collector numbers are mostly stored as integers, but deck parsers provide them as text.
+    samples = card_db.db.execute(
+        f"SELECT Card.English_Name, Card_Set.Abbreviation, CAST(Printing.Collector_Number AS TEXT) "
+        f"FROM Printing "
+        f"INNER JOIN Card USING (Card_ID) "
+        f"INNER JOIN Card_Set USING (Set_ID) "
+        f"WHERE Printing_ID IN ({', '.join('?' * len(sample_ids))})",
+        sample_ids
+    ).fetchall()
+    latencies = {}
+    for name, lookup in _BENCHMARKED_LOOKUPS.items():
+        # The first run loads the required pages into the page cache, so that only the query execution is measured.
+        for row in samples:
+            lookup(card_db, row)
+        start = time.perf_counter()
+        for row in samples:
+            lookup(card_db, row)
+        latencies[name] = (time.perf_counter() - start) / len(samples) * 10**6
+    return latencies
+
+
+def maintain_database(
+        card_db: CardDatabase, page_size: Optional[int] = None, target_path: Optional[Path] = None,
+        benchmark_sample_size: int = 200) -> MaintenanceReport:
+    """
+    Runs all maintenance operations: Optionally rebuilds the database with the given page size, gathers the query
+    planner statistics and optionally writes a compacted copy to target_path. The lookup latency is measured before
+    and after, unless benchmark_sample_size is 0.
+    :raises ValueError: If the database is not populated or the page size is invalid
+    """
+    if card_db.immutable:
+        error_msg = "Can not maintain an immutable database."
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    if not card_db.is_database_populated():
+        error_msg = "Can not maintain an empty database."
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    database_size_before = card_db.get_database_size()
+    latency_before = benchmark_lookups(card_db, benchmark_sample_size) if benchmark_sample_size else {}
+    if page_size is not None:
+        rebuild_with_page_size(card_db, page_size)
+    analyze(card_db)
+    latency_after = benchmark_lookups(card_db, benchmark_sample_size) if benchmark_sample_size else {}
+    if target_path is not None:
+        vacuum_into(card_db, target_path)
+    return MaintenanceReport(
+        card_db.db.execute("PRAGMA page_size").fetchone()[0], database_size_before, card_db.get_database_size(),
+        get_object_sizes(card_db), latency_before, latency_after
+    )
@@ -0,0 +1,169 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Refreshes the card database without interrupting running conversions.
+
+The new card data is loaded into a new database file next to the live database. After it passed all validations, it
+atomically replaces the live database file. Running programs keep reading the previous file until they reopen the
+database, see CardDatabase.reopen_if_replaced().
+
+The refreshed database uses a rollback journal instead of the write-ahead log. The -wal and -shm files of a database
+are found by file name, so after a file replacement, they would be shared between the old and the new file.
+The first refresh of a database still using the write-ahead log should therefore be done while no other program
+uses the database.
+"""
+
+import os
+from pathlib import Path
+import sqlite3
+import stat
+import tempfile
+import typing
+
+from .db import CardDatabase, IngestionProfile, PopulationStatistics
+
+from MTGDeckConverter.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Tables that must not be empty in a populated database
+_POPULATED_TABLES = ("Card", "Card_Set", "Printing")
+
+
+def refresh_database(
+        database_path: Path, path_to_data: Path = None,
+        profile: IngestionProfile = IngestionProfile(),
+        bulk_data_type: str = "default_cards",
+        min_row_count_ratio: float = 0.5) -> PopulationStatistics:
+    """
+    Builds a new card database in a sibling file of database_path, validates it and atomically replaces the database
+    at database_path with it.
+    :param path_to_data: Read the card data from this bulk data file, instead of downloading it.
+    :param min_row_count_ratio: The new database is rejected, if a table has fewer rows than this fraction of the rows
+        in the live database. This guards against replacing the data with a truncated download. Use 0 to disable.
+    :raises ValueError: If the new database fails a validation. The live database is left untouched.
+    """
+    database_path.parent.mkdir(parents=True, exist_ok=True)
+    file_descriptor, new_database_name = tempfile.mkstemp(
+        dir=str(database_path.parent), prefix=database_path.name + ".", suffix=".refresh")
+    os.close(file_descriptor)
+    new_database_path = Path(new_database_name)
+    logger.info(f"Refreshing the card database {database_path}, building the new database in {new_database_path}")
+    try:
+        new_database = CardDatabase(new_database_path)
+        try:
+            statistics = new_database.populate_database(path_to_data, profile, bulk_data_type)
+        finally:
+            new_database.close()
+        _validate_new_database(new_database_path, database_path, min_row_count_ratio)
+        _copy_file_mode(database_path, new_database_path)
+        _checkpoint_live_database(database_path)
+        os.replace(str(new_database_path), str(database_path))
+    except BaseException:
+        _remove_database_files(new_database_path)
+        raise
+    logger.info(f"Replaced the card database {database_path} with the refreshed card data.")
+    return statistics
+
+
+def _validate_new_database(new_database_path: Path, live_database_path: Path, min_row_count_ratio: float):
+    """Checks the new database and switches it to the rollback journal. Raises ValueError, if a check fails."""
+    new_database = sqlite3.connect(str(new_database_path), isolation_level=None)
+    try:
+        schema_version = new_database.execute("PRAGMA user_version").fetchone()[0]
+        compatible_versions = CardDatabase.COMPATIBLE_SCHEMA_VERSIONS
+        if not compatible_versions.inclusive_min <= schema_version < compatible_versions.exclusive_max:
+            _fail(f"The new database has the incompatible schema version {schema_version}.")
+        integrity_check_result = new_database.execute("PRAGMA integrity_check").fetchall()
+        if integrity_check_result != [("ok",)]:
+            _fail(f"The new database failed the integrity check: {integrity_check_result}")
+        foreign_key_violations = new_database.execute("PRAGMA foreign_key_check").fetchall()
+        if foreign_key_violations:
+            _fail(f"The new database contains {len(foreign_key_violations)} foreign key violations.")
+        new_row_counts = _get_row_counts(new_database)
+        live_row_counts = _get_live_row_counts(live_database_path)
+        logger.info(f"Row counts of the new database: {new_row_counts}, of the live database: {live_row_counts}")
+        for table, row_count in new_row_counts.items():
+            if not row_count:
+                _fail(f"Table {table} of the new database is empty.")
+            if row_count < live_row_counts.get(table, 0) * min_row_count_ratio:
+                _fail(
+                    f"Table {table} of the new database has {row_count} rows, "
+                    f"less than {min_row_count_ratio:.0%} of the {live_row_counts[table]} rows in the live database."
+                )
+        new_database.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        new_database.close()
+
+
+def _get_row_counts(database: sqlite3.Connection) -> typing.Dict[str, int]:
+    return {
+        table: database.execute(f"SELECT count(*) FROM {table}").fetchone()[0] for table in _POPULATED_TABLES
+    }
+
+
+def _get_live_row_counts(live_database_path: Path) -> typing.Dict[str, int]:
+    if not live_database_path.exists():
+        return {}
+    live_database = sqlite3.connect(live_database_path.resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        return _get_row_counts(live_database)
+    except sqlite3.Error as e:
+        logger.warning(f"Unable to count the rows in the live database: {e}")
+        return {}
+    finally:
+        live_database.close()
+
+
+def _copy_file_mode(live_database_path: Path, new_database_path: Path):
+    """Applies the permissions of the live database, because temporary files are only readable by the owner."""
+    try:
+        mode = stat.S_IMODE(live_database_path.stat().st_mode)
+    except FileNotFoundError:
+        # Use the permissions of a regularly created file
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    os.chmod(str(new_database_path), mode)
+
+
+def _checkpoint_live_database(live_database_path: Path):
+    """
+    Moves the content of the write-ahead log of the live database into the database file and truncates the log,
+    so that the log can not be applied to the replacing database file.
+    """
+    if not Path(str(live_database_path) + "-wal").exists():
+        return
+    live_database = sqlite3.connect(str(live_database_path), isolation_level=None)
+    try:
+        busy, _, _ = live_database.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    finally:
+        live_database.close()
+    if busy:
+        _fail("Unable to checkpoint the write-ahead log of the live database, because it is in use.")
+
+
+def _remove_database_files(database_path: Path):
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        try:
+            os.remove(str(database_path) + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def _fail(error_msg: str):
+    logger.error(error_msg)
+    raise ValueError(error_msg)
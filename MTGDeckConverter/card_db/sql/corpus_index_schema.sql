@@ -0,0 +1,52 @@
+-- Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+-- This program is free software: you can redistribute it and/or modify
+-- it under the terms of the GNU General Public License as published by
+-- the Free Software Foundation, either version 3 of the License, or
+-- (at your option) any later version.
+
+-- This program is distributed in the hope that it will be useful,
+-- but WITHOUT ANY WARRANTY; without even the implied warranty of
+-- MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+-- GNU General Public License for more details.
+
+-- You should have received a copy of the GNU General Public License
+-- along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+-- Schema of the deck corpus index. The index is stored in a separate database file, because it is built from the
+-- deck files and references the card database only by the internal Card and Printing IDs.
+
+PRAGMA user_version(1);  -- 0.000.001
+PRAGMA journal_mode('wal');
+PRAGMA foreign_keys(1);
+
+
+CREATE TABLE Indexed_Deck (
+  Deck_ID INTEGER PRIMARY KEY NOT NULL,
+  Path TEXT NOT NULL UNIQUE,  -- Absolute path of the deck file
+  Deck_Name TEXT NOT NULL,
+  -- Used to detect changed files. The file content is only hashed, if the size or modification time changed.
+  File_Size INTEGER NOT NULL,
+  Modification_Time_NS INTEGER NOT NULL,
+  Content_Hash TEXT NOT NULL,
+  Unresolved_Card_Count INTEGER NOT NULL  -- Number of cards that could not be identified and are not indexed.
+);
+
+CREATE TABLE Deck_Card (
+  -- The printings contained in each deck. Card_ID and Printing_ID refer to the card database.
+  Deck_ID INTEGER NOT NULL REFERENCES Indexed_Deck(Deck_ID) ON DELETE CASCADE,
+  Board TEXT NOT NULL,  -- "main", "side", "maybe", "acquire" or the "commanders" pseudo board
+  Printing_ID INTEGER NOT NULL,
+  Card_ID INTEGER NOT NULL,
+  Quantity INTEGER NOT NULL CHECK (Quantity > 0),
+  PRIMARY KEY (Deck_ID, Board, Printing_ID)
+) WITHOUT ROWID;
+CREATE INDEX DeckCardCard ON Deck_Card(Card_ID, Board, Deck_ID);
+CREATE INDEX DeckCardPrinting ON Deck_Card(Printing_ID, Board, Deck_ID);
+
+CREATE TABLE Corpus_Metadata (
+  -- Key-value store. Contains the data version of the card database used to build the index.
+  Key TEXT PRIMARY KEY NOT NULL,
+  Value TEXT NOT NULL
+) WITHOUT ROWID;
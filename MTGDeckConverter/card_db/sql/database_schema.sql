@@ -14,7 +14,7 @@
 -- along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 
-PRAGMA user_version(4);  -- 0.000.004
+PRAGMA user_version(7);  -- 0.000.007
 PRAGMA journal_mode('wal');
 pragma foreign_keys(1);
 
@@ -70,6 +70,9 @@ CREATE TABLE Printing (
    Set_ID INTEGER NOT NULL REFERENCES Card_Set(Set_ID),
    Collector_Number INTEGER NOT NULL,  -- This MAY actually be a string, like '86a'. But it is an int most of the time.
    Rarity_ID INTEGER NOT NULL REFERENCES Rarity(Rarity_ID),
+   -- The Scryfall language code, like 'en' or 'de'. Each language of a printing is stored as a separate row.
+   Language TEXT NOT NULL DEFAULT 'en' CHECK (Language = lower(Language)),
+   Printed_Name TEXT,  -- The name printed on non-English cards. NULL for English printings.
    Scryfall_Card_ID UUID_TEXT NOT NULL UNIQUE CONSTRAINT 'UUID format' -- UUID_TEXT gives a TEXT type affinity.
    CHECK (
     -- Matches a hyphened UUID. Make sure that no duplicates caused by different formatting are possible.
@@ -80,12 +83,90 @@ CREATE TABLE Printing (
    '[a-f0-9][a-f0-9][a-f0-9][a-f0-9]-' ||
    '[a-f0-9][a-f0-9][a-f0-9][a-f0-9][a-f0-9][a-f0-9][a-f0-9][a-f0-9][a-f0-9][a-f0-9][a-f0-9][a-f0-9]')
 );
+-- Includes the set, so that lookups by name and set use this index even without query planner statistics.
+CREATE INDEX PrintingCardSet ON Printing(Card_ID, Set_ID);
+-- Language is the last column, because lookups only use it to prefer the English printing among those sharing a
+-- set and collector number.
+CREATE INDEX PrintingSetNumberLanguage ON Printing(Set_ID, Collector_Number, Language);
+CREATE INDEX PrintingPrintedName ON Printing(Printed_Name, Language) WHERE Printed_Name IS NOT NULL;
 
 CREATE VIEW Printings_View AS
+  -- One printing per set and collector number: The English printing or, if the card was not printed in English,
+  -- the printing in another stored language. Use Localized_Printings_View to access all printed languages.
   SELECT Card.English_Name AS English_Name, Card_Set.English_Name AS Set_Name,
   Card_Set.Abbreviation AS Abbreviation, Card.Card_Type AS Card_Type, Printing.Collector_Number AS Collector_Number, Rarity.Name AS Rarity
   FROM Printing
   INNER JOIN Card_Set USING (Set_ID)
   INNER JOIN Card USING (Card_ID)
   INNER JOIN Rarity USING (Rarity_ID)
+  WHERE Printing.Language = 'en' OR NOT EXISTS (
+    -- Skips the printings in other languages, if there is an English one or one stored before
+    SELECT * FROM Printing AS Preferred
+    WHERE Preferred.Set_ID = Printing.Set_ID AND Preferred.Collector_Number = Printing.Collector_Number
+    AND (Preferred.Language = 'en' OR Preferred.Printing_ID < Printing.Printing_ID)
+  )
+;
+
+CREATE VIEW Localized_Printings_View AS
+  -- Printings in all languages. Printed_Name is NULL for English printings.
+  SELECT Printing.Language AS Language, Printing.Printed_Name AS Printed_Name,
+  Card.English_Name AS English_Name, Card_Set.Abbreviation AS Abbreviation,
+  Printing.Collector_Number AS Collector_Number
+  FROM Printing
+  INNER JOIN Card_Set USING (Set_ID)
+  INNER JOIN Card USING (Card_ID)
+;
+
+CREATE TABLE Database_Metadata (
+  -- Key-value store for information about the database content, like the version of the stored card data.
+  Key TEXT PRIMARY KEY NOT NULL,
+  Value TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE Set_Abbreviation_Alias (
+  -- Maps set codes used by other sources, like TappedOut, XMage or the Gatherer, to the Scryfall set code.
+  -- The alias is stored in lower case.
+  Alias TEXT PRIMARY KEY NOT NULL CHECK (Alias = lower(Alias)),
+  Abbreviation TEXT NOT NULL CHECK (Abbreviation = lower(Abbreviation))
+) WITHOUT ROWID;
+
+INSERT INTO Set_Abbreviation_Alias (Alias, Abbreviation) VALUES
+  -- Legacy two-letter Gatherer / Magic Online codes of early sets
+  ('1e', 'lea'),
+  ('2e', 'leb'),
+  ('2u', '2ed'),
+  ('3e', '3ed'),
+  ('4e', '4ed'),
+  ('5e', '5ed'),
+  ('6e', '6ed'),
+  ('7e', '7ed'),
+  ('an', 'arn'),
+  ('aq', 'atq'),
+  ('lg', 'leg'),
+  ('dk', 'drk'),
+  ('fe', 'fem'),
+  ('hm', 'hml'),
+  ('ia', 'ice'),
+  ('al', 'all'),
+  ('ch', 'chr'),
+  ('mi', 'mir'),
+  ('vi', 'vis'),
+  ('wl', 'wth'),
+  ('te', 'tmp'),
+  ('st', 'sth'),
+  ('ex', 'exo'),
+  ('uz', 'usg'),
+  ('gu', 'ulg'),
+  ('cg', 'uds'),
+  ('mm', 'mmq'),
+  ('ne', 'nem'),
+  ('pr', 'pcy'),
+  ('in', 'inv'),
+  ('ps', 'pls'),
+  ('ap', 'apc'),
+  ('od', 'ody'),
+  ('pt', 'por'),
+  ('p2', 'p02'),
+  ('pk', 'ptk'),
+  ('ug', 'ugl')
 ;
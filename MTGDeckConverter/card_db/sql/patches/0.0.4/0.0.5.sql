@@ -0,0 +1,31 @@
+-- Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+-- This program is free software: you can redistribute it and/or modify
+-- it under the terms of the GNU General Public License as published by
+-- the Free Software Foundation, either version 3 of the License, or
+-- (at your option) any later version.
+
+-- This program is distributed in the hope that it will be useful,
+-- but WITHOUT ANY WARRANTY; without even the implied warranty of
+-- MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+-- GNU General Public License for more details.
+
+-- You should have received a copy of the GNU General Public License
+-- along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+-- Adds the Database_Metadata table, used to store the version of the card data.
+
+CREATE TABLE Database_Metadata (
+  -- Key-value store for information about the database content, like the version of the stored card data.
+  Key TEXT PRIMARY KEY NOT NULL,
+  Value TEXT NOT NULL
+) WITHOUT ROWID;
+
+-- Already populated databases get a data version, so that conversion results based on them can be cached.
+-- It is a random, 32 digit hexadecimal number, like the data versions assigned when populating the database.
+INSERT INTO Database_Metadata (Key, Value)
+  SELECT 'data_version', lower(hex(randomblob(16)))
+  WHERE EXISTS (SELECT * FROM Printing);
+
+PRAGMA user_version(5);  -- 0.000.005
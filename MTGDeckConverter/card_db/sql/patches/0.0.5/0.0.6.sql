@@ -0,0 +1,67 @@
+-- Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+-- This program is free software: you can redistribute it and/or modify
+-- it under the terms of the GNU General Public License as published by
+-- the Free Software Foundation, either version 3 of the License, or
+-- (at your option) any later version.
+
+-- This program is distributed in the hope that it will be useful,
+-- but WITHOUT ANY WARRANTY; without even the implied warranty of
+-- MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+-- GNU General Public License for more details.
+
+-- You should have received a copy of the GNU General Public License
+-- along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+-- Adds the Set_Abbreviation_Alias table, mapping set codes used by other sources to Scryfall set codes.
+
+CREATE TABLE Set_Abbreviation_Alias (
+  -- Maps set codes used by other sources, like TappedOut, XMage or the Gatherer, to the Scryfall set code.
+  -- The alias is stored in lower case.
+  Alias TEXT PRIMARY KEY NOT NULL CHECK (Alias = lower(Alias)),
+  Abbreviation TEXT NOT NULL CHECK (Abbreviation = lower(Abbreviation))
+) WITHOUT ROWID;
+
+INSERT INTO Set_Abbreviation_Alias (Alias, Abbreviation) VALUES
+  -- Legacy two-letter Gatherer / Magic Online codes of early sets
+  ('1e', 'lea'),
+  ('2e', 'leb'),
+  ('2u', '2ed'),
+  ('3e', '3ed'),
+  ('4e', '4ed'),
+  ('5e', '5ed'),
+  ('6e', '6ed'),
+  ('7e', '7ed'),
+  ('an', 'arn'),
+  ('aq', 'atq'),
+  ('lg', 'leg'),
+  ('dk', 'drk'),
+  ('fe', 'fem'),
+  ('hm', 'hml'),
+  ('ia', 'ice'),
+  ('al', 'all'),
+  ('ch', 'chr'),
+  ('mi', 'mir'),
+  ('vi', 'vis'),
+  ('wl', 'wth'),
+  ('te', 'tmp'),
+  ('st', 'sth'),
+  ('ex', 'exo'),
+  ('uz', 'usg'),
+  ('gu', 'ulg'),
+  ('cg', 'uds'),
+  ('mm', 'mmq'),
+  ('ne', 'nem'),
+  ('pr', 'pcy'),
+  ('in', 'inv'),
+  ('ps', 'pls'),
+  ('ap', 'apc'),
+  ('od', 'ody'),
+  ('pt', 'por'),
+  ('p2', 'p02'),
+  ('pk', 'ptk'),
+  ('ug', 'ugl')
+;
+
+PRAGMA user_version(6);  -- 0.000.006
@@ -0,0 +1,60 @@
+-- Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+-- This program is free software: you can redistribute it and/or modify
+-- it under the terms of the GNU General Public License as published by
+-- the Free Software Foundation, either version 3 of the License, or
+-- (at your option) any later version.
+
+-- This program is distributed in the hope that it will be useful,
+-- but WITHOUT ANY WARRANTY; without even the implied warranty of
+-- MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+-- GNU General Public License for more details.
+
+-- You should have received a copy of the GNU General Public License
+-- along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+-- Stores the language of each printing, so that the printings of all languages can be stored.
+
+ALTER TABLE Printing ADD COLUMN
+   -- The Scryfall language code, like 'en' or 'de'. Each language of a printing is stored as a separate row.
+   Language TEXT NOT NULL DEFAULT 'en' CHECK (Language = lower(Language));
+ALTER TABLE Printing ADD COLUMN
+   Printed_Name TEXT;  -- The name printed on non-English cards. NULL for English printings.
+
+-- Includes the set, so that lookups by name and set use this index even without query planner statistics.
+CREATE INDEX PrintingCardSet ON Printing(Card_ID, Set_ID);
+-- Language is the last column, because lookups only use it to prefer the English printing among those sharing a
+-- set and collector number.
+CREATE INDEX PrintingSetNumberLanguage ON Printing(Set_ID, Collector_Number, Language);
+CREATE INDEX PrintingPrintedName ON Printing(Printed_Name, Language) WHERE Printed_Name IS NOT NULL;
+
+DROP VIEW Printings_View;
+CREATE VIEW Printings_View AS
+  -- One printing per set and collector number: The English printing or, if the card was not printed in English,
+  -- the printing in another stored language. Use Localized_Printings_View to access all printed languages.
+  SELECT Card.English_Name AS English_Name, Card_Set.English_Name AS Set_Name,
+  Card_Set.Abbreviation AS Abbreviation, Card.Card_Type AS Card_Type, Printing.Collector_Number AS Collector_Number, Rarity.Name AS Rarity
+  FROM Printing
+  INNER JOIN Card_Set USING (Set_ID)
+  INNER JOIN Card USING (Card_ID)
+  INNER JOIN Rarity USING (Rarity_ID)
+  WHERE Printing.Language = 'en' OR NOT EXISTS (
+    -- Skips the printings in other languages, if there is an English one or one stored before
+    SELECT * FROM Printing AS Preferred
+    WHERE Preferred.Set_ID = Printing.Set_ID AND Preferred.Collector_Number = Printing.Collector_Number
+    AND (Preferred.Language = 'en' OR Preferred.Printing_ID < Printing.Printing_ID)
+  )
+;
+
+CREATE VIEW Localized_Printings_View AS
+  -- Printings in all languages. Printed_Name is NULL for English printings.
+  SELECT Printing.Language AS Language, Printing.Printed_Name AS Printed_Name,
+  Card.English_Name AS English_Name, Card_Set.Abbreviation AS Abbreviation,
+  Printing.Collector_Number AS Collector_Number
+  FROM Printing
+  INNER JOIN Card_Set USING (Set_ID)
+  INNER JOIN Card USING (Card_ID)
+;
+
+PRAGMA user_version(7);  -- 0.000.007
@@ -30,7 +30,7 @@ logger = get_logger(__name__)
 _PATCH_SEMVER_SCHEMA = r"(([0-9]|[1-9][0-9]+)\.){2}([0-9]|[1-9][0-9]+)"
 _PATCH_FILE_SCHEMA = _PATCH_SEMVER_SCHEMA + r"\.sql"
 
-_PATCH_LIST_PATH = Path(__file__).resolve().absolute().joinpath("sql", "patches")
+_PATCH_LIST_PATH = Path(__file__).resolve().parent.joinpath("sql", "patches")
 
 
 def update_database_schema(db: CardDatabase):
@@ -13,9 +13,17 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import os
+from pathlib import Path
+
 __version__ = "0.0.1"
 
 
 PROGRAMNAME = "MTGDeckConverter"
 VERSION = __version__
 COPYRIGHT = "(C) 2019 Thomas Hess"
+
+# Per-user data directory, following the XDG Base Directory Specification.
+DATA_DIRECTORY = Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share") / PROGRAMNAME
+DEFAULT_DATABASE_PATH = DATA_DIRECTORY / "CardDatabase.sqlite3"
+DEFAULT_CORPUS_INDEX_PATH = DATA_DIRECTORY / "CorpusIndex.sqlite3"
@@ -0,0 +1,253 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Glue code that converts deck files between formats, using the format registry and the card database."""
+
+import concurrent.futures
+import io
+import json
+from pathlib import Path
+import typing
+
+from MTGDeckConverter.cache import ConversionCache
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.card_db.updater import update_database_schema
+import MTGDeckConverter.formats
+import MTGDeckConverter.logger
+import MTGDeckConverter.memory_accounting as memory_accounting
+from MTGDeckConverter.model import Deck, UnresolvedCard
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+__all__ = [
+    "open_card_database",
+    "get_output_path",
+    "create_output_dir",
+    "get_output_paths",
+    "convert_deck_file",
+    "convert_deck_file_to_formats",
+    "convert_deck_stream",
+    "write_deck_to_formats",
+    "UnresolvedCardsError",
+    "ResolutionReport",
+]
+
+
+class UnresolvedCardsError(ValueError):
+    """Raised, if a deck contains cards that can not be identified. Contains all unresolved cards of the deck."""
+    def __init__(self, input_path: typing.Union[Path, str], unresolved_cards: typing.List[UnresolvedCard]):
+        super(UnresolvedCardsError, self).__init__(
+            f"Unable to identify {len(unresolved_cards)} cards in deck {input_path}: "
+            + "; ".join(unresolved_card.reason for unresolved_card in unresolved_cards)
+        )
+        self.input_path = input_path
+        self.unresolved_cards = unresolved_cards
+
+
+class ResolutionReport:
+    """Collects the unresolved cards and other conversion failures of a batch of deck files."""
+
+    def __init__(self):
+        self.decks: typing.List[typing.Dict[str, typing.Any]] = []
+
+    def add_failure(self, input_path: Path, error: Exception):
+        entry = {"input_file": str(input_path), "error": str(error)}
+        if isinstance(error, UnresolvedCardsError):
+            entry["unresolved_cards"] = [unresolved_card.to_dict() for unresolved_card in error.unresolved_cards]
+        self.decks.append(entry)
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "failed_deck_count": len(self.decks),
+            "unresolved_card_count": sum(len(deck.get("unresolved_cards", ())) for deck in self.decks),
+            "decks": self.decks,
+        }
+
+    def write(self, report_path: Path):
+        logger.info(f"Writing the error report to {report_path}")
+        report_path.write_text(json.dumps(self.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def open_card_database(database_path: Path, immutable: bool = False, populate: bool = True) -> CardDatabase:
+    """
+    Opens the card database at the given location. The database schema is updated to the latest version and an empty
+    database is populated before it is returned, unless populate is False.
+    If immutable is True, the database has to be a snapshot created by CardDatabase.create_snapshot(). It is opened
+    read-only and used as-is.
+    """
+    if immutable:
+        return CardDatabase(database_path, immutable=True)
+    database_path.parent.mkdir(parents=True, exist_ok=True)
+    card_db = CardDatabase(database_path, do_validate_schema=False)
+    update_database_schema(card_db)
+    card_db.db.execute("PRAGMA foreign_keys (1)")
+    if populate and not card_db.is_database_populated():
+        logger.info("The card database is empty. Populating it before converting any decks.")
+        card_db.populate_database()
+    return card_db
+
+
+def get_output_path(input_path: Path, output_format: str, output_dir: typing.Optional[Path] = None) -> Path:
+    """
+    Returns the path the converted deck is written to. The output file has the same name as the input file, with
+    the file extension of the output format. It is placed in output_dir, if given, otherwise next to the input file.
+    """
+    file_extension = MTGDeckConverter.formats.output_formats()[output_format].file_extension
+    output_dir = input_path.parent if output_dir is None else output_dir
+    return output_dir / (input_path.stem + file_extension)
+
+
+def create_output_dir(output_dir: typing.Optional[Path]):
+    """Creates the given output directory, including missing parent directories. Does nothing, if output_dir is None."""
+    if output_dir is not None and not output_dir.is_dir():
+        logger.info(f"Creating the output directory {output_dir}")
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+
+def get_output_paths(
+        input_path: Path, output_formats: typing.Iterable[str],
+        output_dir: typing.Optional[Path] = None) -> typing.Dict[str, Path]:
+    """
+    Returns the output path for each of the given output formats, as determined by get_output_path().
+    Formats that would overwrite the input file are skipped.
+    :raises ValueError: If multiple output formats would write to the same file.
+    """
+    output_paths = {}
+    for output_format in output_formats:
+        output_path = get_output_path(input_path, output_format, output_dir)
+        if output_path.resolve() == input_path.resolve():
+            logger.warning(
+                f"Skipping {output_format} output for {input_path}, because it would overwrite the input file.")
+        elif output_path in output_paths.values():
+            error_msg = f"Multiple output formats would write to the same file {output_path}."
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        else:
+            output_paths[output_format] = output_path
+    return output_paths
+
+
+def convert_deck_file(
+        card_db: CardDatabase, input_path: Path, output_path: Path, output_format: str,
+        input_format: str = MTGDeckConverter.formats.AUTO_DETECT, cache: typing.Optional[ConversionCache] = None):
+    """
+    Converts the deck file at input_path and writes the result to output_path.
+    If a cache is given, a cached result for identical input data is used instead of converting the deck again.
+    :raises UnresolvedCardsError: If the deck contains cards that can not be identified.
+        The exception lists all of them.
+    """
+    convert_deck_file_to_formats(card_db, input_path, {output_format: output_path}, input_format, cache)
+
+
+def convert_deck_file_to_formats(
+        card_db: CardDatabase, input_path: Path, output_paths: typing.Mapping[str, Path],
+        input_format: str = MTGDeckConverter.formats.AUTO_DETECT, cache: typing.Optional[ConversionCache] = None,
+        input_data: typing.Optional[bytes] = None):
+    """
+    Converts the deck file at input_path into multiple formats. output_paths maps each output format to the path the
+    result is written to. The deck is parsed and resolved once and the resolved deck is passed to all writers,
+    which run concurrently.
+    If a cache is given, cached results for identical input data are used. The deck is only parsed, if at least one
+    output format is not cached.
+    If input_data is given, it is used as the content of the deck file, instead of reading the file. The cache key is
+    computed from the same data that is parsed, so that a file changing during the conversion never stores the result
+    of one content under the key of another.
+    :raises UnresolvedCardsError: If the deck contains cards that can not be identified.
+        The exception lists all of them.
+    """
+    pending_outputs = dict(output_paths)
+    data_version = card_db.get_data_version()
+    use_cache = cache is not None and data_version is not None
+    if cache is not None and data_version is None:
+        logger.debug("The card database has no data version. Not using the conversion cache.")
+    cache_keys: typing.Dict[str, str] = {}
+    if use_cache and input_data is None:
+        input_data = input_path.read_bytes()
+    if use_cache:
+        for output_format, output_path in output_paths.items():
+            key = ConversionCache.get_key(input_data, input_format, output_format, data_version)
+            cached_result = cache.get(key)
+            if cached_result is None:
+                cache_keys[output_format] = key
+            else:
+                logger.info(f"Using the cached conversion result for {input_path}, writing to {output_path}")
+                output_path.write_bytes(cached_result)
+                del pending_outputs[output_format]
+    if not pending_outputs:
+        return
+    logger.info(f"Converting deck {input_path} to formats {', '.join(pending_outputs)}")
+    with memory_accounting.stage(memory_accounting.PARSE):
+        deck = MTGDeckConverter.formats.parse_deck(
+            input_path if input_data is None else _get_text_stream(input_path, input_data), input_format)
+    with memory_accounting.stage(memory_accounting.RESOLVE):
+        unresolved_cards = deck.fill_missing_information(card_db, collect_errors=True)
+    if unresolved_cards:
+        raise UnresolvedCardsError(input_path, unresolved_cards)
+    with memory_accounting.stage(memory_accounting.WRITE):
+        write_deck_to_formats(deck, pending_outputs)
+    if use_cache:
+        for output_format, output_path in pending_outputs.items():
+            cache.put(cache_keys[output_format], output_path.read_bytes())
+
+
+def _get_text_stream(input_path: Path, input_data: bytes) -> io.StringIO:
+    """Returns the content of a deck file as a text stream, decoded like parsers read deck files."""
+    # Keep the line endings, as required by the CSV parser.
+    stream = io.StringIO(input_data.decode("utf-8"), newline="")
+    stream.name = str(input_path)
+    return stream
+
+
+def convert_deck_stream(
+        card_db: CardDatabase, input_stream: typing.Iterable[str], output_stream: typing.TextIO, output_format: str,
+        input_format: str = MTGDeckConverter.formats.AUTO_DETECT):
+    """
+    Converts the deck read from input_stream, an iterable of text lines like sys.stdin, and writes the result to
+    output_stream. Nothing is written to disk. The input is consumed line by line, so only the parsed deck is kept.
+    :raises UnresolvedCardsError: If the deck contains cards that can not be identified.
+        The exception lists all of them.
+    """
+    source_description = MTGDeckConverter.formats.describe_deck_source(input_stream)
+    logger.info(f"Converting deck from {source_description} to format {output_format}")
+    with memory_accounting.stage(memory_accounting.PARSE):
+        deck = MTGDeckConverter.formats.parse_deck(input_stream, input_format)
+    with memory_accounting.stage(memory_accounting.RESOLVE):
+        unresolved_cards = deck.fill_missing_information(card_db, collect_errors=True)
+    if unresolved_cards:
+        raise UnresolvedCardsError(source_description, unresolved_cards)
+    with memory_accounting.stage(memory_accounting.WRITE):
+        MTGDeckConverter.formats.write_deck(deck, output_stream, output_format)
+
+
+def write_deck_to_formats(deck: Deck, output_paths: typing.Mapping[str, Path]):
+    """
+    Writes the resolved deck in all given formats. output_paths maps each output format to the output path.
+    Multiple writers run concurrently. The writers only read the deck, so they share the same instance.
+    """
+    # Import the writer modules up front, instead of concurrently in the worker threads.
+    for output_format in output_paths:
+        MTGDeckConverter.formats.load_writer(output_format)
+    if len(output_paths) == 1:
+        (output_format, output_path), = output_paths.items()
+        MTGDeckConverter.formats.write_deck(deck, output_path, output_format)
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(output_paths)) as executor:
+        futures = [
+            executor.submit(MTGDeckConverter.formats.write_deck, deck, output_path, output_format)
+            for output_format, output_path in output_paths.items()
+        ]
+    for future in futures:
+        # Re-raises the first exception raised by any writer.
+        future.result()
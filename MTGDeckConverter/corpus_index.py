@@ -0,0 +1,282 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Inverted index over a corpus of deck files, answering questions like "which decks contain this card".
+
+Deck files are parsed using the format registry and resolved using the card database. The contained printings are
+stored in an SQLite database, indexed by card and by printing. The index is updated incrementally: only new or
+changed files are parsed again.
+
+The index references the card database by its internal Card and Printing IDs. These change when the card database
+is populated again, so the index is cleared whenever the data version of the card database changes.
+"""
+
+import atexit
+from collections import Counter
+import hashlib
+import importlib.resources
+import os
+from pathlib import Path
+import sqlite3
+import typing
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.deck_diff import COMMANDERS, count_printings, PrintingKey
+import MTGDeckConverter.formats
+import MTGDeckConverter.logger
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+__all__ = [
+    "IndexUpdateStatistics",
+    "CorpusIndex",
+]
+
+_DATA_VERSION_KEY = "card_data_version"
+
+
+class IndexUpdateStatistics(typing.NamedTuple):
+    added: int
+    changed: int
+    removed: int
+    unchanged: int
+    failed: int
+
+
+class CorpusIndex:
+
+    SCHEMA_VERSION = 1
+    # Number of indexed deck files per transaction during an update
+    COMMIT_INTERVAL = 500
+
+    def __init__(self, index_path: Path, card_db: CardDatabase):
+        logger.info(f"Opening the deck corpus index {index_path}")
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.card_db = card_db
+        self.db = sqlite3.connect(str(index_path))
+        atexit.register(self.db.close)
+        self.db.row_factory = sqlite3.Row
+        self._create_schema_if_not_present()
+        self.db.execute("PRAGMA foreign_keys (1)")
+        # (set abbreviation, collector number) -> (Printing_ID, Card_ID) or None for unknown printings
+        self._printing_ids: typing.Dict[typing.Tuple[str, str], typing.Optional[typing.Tuple[int, int]]] = {}
+        self._clear_if_card_data_changed()
+
+    def _create_schema_if_not_present(self):
+        schema_version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if schema_version == 0:
+            logger.info("Opened an empty corpus index, creating the database schema…")
+            from MTGDeckConverter.card_db import sql
+            self.db.executescript(importlib.resources.read_text(sql, "corpus_index_schema.sql"))
+            self.db.commit()
+        elif schema_version != self.SCHEMA_VERSION:
+            error_msg = f"Unsupported corpus index schema version {schema_version}. " \
+                        f"Expected {self.SCHEMA_VERSION}. Delete the index file to build a new index."
+            logger.error(error_msg)
+            raise ConnectionAbortedError(error_msg)
+
+    def _clear_if_card_data_changed(self):
+        data_version = self.card_db.get_data_version() or ""
+        stored_data_version = self.db.execute(
+            "SELECT Value FROM Corpus_Metadata WHERE Key = ?", (_DATA_VERSION_KEY,)).fetchone()
+        if stored_data_version is not None and stored_data_version["Value"] == data_version:
+            return
+        if stored_data_version is not None:
+            logger.warning(
+                "The card data changed since the decks were indexed. The index is cleared, all decks are indexed "
+                "again during the next update.")
+        with self.db:
+            self.db.execute("DELETE FROM Indexed_Deck")
+            self.db.execute(
+                "INSERT OR REPLACE INTO Corpus_Metadata (Key, Value) VALUES (?, ?)", (_DATA_VERSION_KEY, data_version))
+
+    def close(self):
+        atexit.unregister(self.db.close)
+        self.db.close()
+
+    def get_deck_count(self) -> int:
+        return self.db.execute("SELECT count(*) FROM Indexed_Deck").fetchone()[0]
+
+    def update_directory(
+            self, directory: Path, pattern: str = "*", recursive: bool = False,
+            input_format: str = MTGDeckConverter.formats.AUTO_DETECT) -> IndexUpdateStatistics:
+        """
+        Brings the index up to date with the deck files in the given directory. New and changed files are indexed,
+        entries of removed files are deleted. Files with unchanged size and modification time are not read.
+        """
+        directory = directory.resolve()
+        logger.info(f"Updating the corpus index with the deck files in {directory}")
+        paths = directory.rglob(pattern) if recursive else directory.glob(pattern)
+        known_files = {
+            row["Path"]: (row["File_Size"], row["Modification_Time_NS"])
+            for row in self.db.execute("SELECT Path, File_Size, Modification_Time_NS FROM Indexed_Deck")
+        }
+        seen_paths = set()
+        counts = Counter()
+        with self.db:
+            for path in paths:
+                if not path.is_file():
+                    continue
+                seen_paths.add(str(path))
+                stat = path.stat()
+                if known_files.get(str(path)) == (stat.st_size, stat.st_mtime_ns):
+                    counts["unchanged"] += 1
+                    continue
+                try:
+                    changed = self.add_deck_file(path, input_format)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Indexing {path} failed: {e}")
+                    # Do not keep outdated content of files that became unreadable.
+                    self.db.execute("DELETE FROM Indexed_Deck WHERE Path = ?", (str(path),))
+                    counts["failed"] += 1
+                    continue
+                counts["unchanged" if not changed else "changed" if str(path) in known_files else "added"] += 1
+                if sum(counts.values()) % self.COMMIT_INTERVAL == 0:
+                    self.db.commit()
+            removed_paths = [
+                path for path in known_files.keys() - seen_paths if _is_in_directory(path, directory, recursive)
+            ]
+            self.db.executemany("DELETE FROM Indexed_Deck WHERE Path = ?", ((path,) for path in removed_paths))
+        statistics = IndexUpdateStatistics(
+            counts["added"], counts["changed"], len(removed_paths), counts["unchanged"], counts["failed"])
+        logger.info(f"Updated the corpus index: {statistics}")
+        return statistics
+
+    def add_deck_file(self, path: Path, input_format: str = MTGDeckConverter.formats.AUTO_DETECT) -> bool:
+        """
+        Indexes the given deck file, replacing a previously indexed version. Cards that can not be identified are
+        counted, but not indexed. Returns False, if the file content did not change since it was indexed.
+        The caller has to commit the transaction.
+        """
+        path = path.resolve()
+        stat = path.stat()
+        content_hash = hashlib.sha256(path.read_bytes()).hexdigest()
+        indexed = self.db.execute("SELECT Content_Hash FROM Indexed_Deck WHERE Path = ?", (str(path),)).fetchone()
+        if indexed is not None and indexed["Content_Hash"] == content_hash:
+            self.db.execute(
+                "UPDATE Indexed_Deck SET File_Size = ?, Modification_Time_NS = ? WHERE Path = ?",
+                (stat.st_size, stat.st_mtime_ns, str(path)))
+            return False
+        deck = MTGDeckConverter.formats.parse_deck(path, input_format)
+        deck.fill_missing_information(self.card_db, collect_errors=True)
+        unresolved_card_count = 0
+        rows: typing.Dict[typing.Tuple[str, int], typing.List[int]] = {}
+        for board, counts in count_printings(deck).items():
+            for key, quantity in counts.items():
+                ids = self._get_printing_ids(key)
+                if ids is None:
+                    if board != COMMANDERS:
+                        # Commanders are also part of a regular board, so only count them once.
+                        unresolved_card_count += quantity
+                    continue
+                printing_id, card_id = ids
+                rows.setdefault((board, printing_id), [card_id, 0])[1] += quantity
+        self.db.execute("DELETE FROM Indexed_Deck WHERE Path = ?", (str(path),))
+        deck_id = self.db.execute(
+            "INSERT INTO Indexed_Deck "
+            "(Path, Deck_Name, File_Size, Modification_Time_NS, Content_Hash, Unresolved_Card_Count) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (str(path), deck.name, stat.st_size, stat.st_mtime_ns, content_hash, unresolved_card_count)
+        ).lastrowid
+        self.db.executemany(
+            "INSERT INTO Deck_Card (Deck_ID, Board, Printing_ID, Card_ID, Quantity) VALUES (?, ?, ?, ?, ?)",
+            ((deck_id, board, printing_id, card_id, quantity)
+             for (board, printing_id), (card_id, quantity) in rows.items())
+        )
+        logger.debug(f"Indexed {len(rows)} printings of deck {path}.")
+        return True
+
+    def _get_printing_ids(self, key: PrintingKey) -> typing.Optional[typing.Tuple[int, int]]:
+        if not key.set_abbreviation or not key.collector_number:
+            return None
+        printing = key.set_abbreviation, key.collector_number
+        try:
+            return self._printing_ids[printing]
+        except KeyError:
+            try:
+                result = self.card_db.get_printing_and_card_id(
+                    self.card_db.resolve_set_abbreviation(key.set_abbreviation) or key.set_abbreviation,
+                    key.collector_number)
+            except ValueError:
+                result = None
+            self._printing_ids[printing] = result
+            return result
+
+    def find_decks_containing(
+            self, english_names: typing.Iterable[str],
+            boards: typing.Optional[typing.Iterable[str]] = None) -> typing.List[Path]:
+        """
+        Returns the paths of all decks containing all given cards, in any printing.
+        If boards is given, only cards on these boards are considered, like ("main", "side", "commanders").
+        :raises ValueError: If a card name is unknown
+        """
+        board_filter, board_parameters = _get_board_filter(boards)
+        queries = []
+        parameters = []
+        for english_name in english_names:
+            card_ids = self.card_db.get_card_ids_for_name(english_name)
+            queries.append(
+                f"SELECT Deck_ID FROM Deck_Card "
+                f"WHERE Card_ID IN ({', '.join('?' * len(card_ids))}){board_filter}"
+            )
+            parameters += card_ids + board_parameters
+        if not queries:
+            return []
+        result = self.db.execute(
+            f"SELECT Path FROM Indexed_Deck WHERE Deck_ID IN ({' INTERSECT '.join(queries)}) ORDER BY Path",
+            parameters
+        ).fetchall()
+        return [Path(row["Path"]) for row in result]
+
+    def find_co_occurring_cards(
+            self, english_name: str, top: int = 20,
+            boards: typing.Optional[typing.Iterable[str]] = None) -> typing.List[typing.Tuple[str, int]]:
+        """
+        Returns the cards most often played together with the given card, as (English name, number of decks)
+        tuples, sorted by descending number of decks.
+        If boards is given, only cards on these boards are considered.
+        :raises ValueError: If the card name is unknown
+        """
+        card_ids = self.card_db.get_card_ids_for_name(english_name)
+        board_filter, board_parameters = _get_board_filter(boards)
+        id_placeholders = ", ".join("?" * len(card_ids))
+        result = self.db.execute(
+            f"SELECT Card_ID, count(DISTINCT Deck_ID) AS Deck_Count "
+            f"FROM Deck_Card "
+            f"WHERE Deck_ID IN ("
+            f"  SELECT Deck_ID FROM Deck_Card WHERE Card_ID IN ({id_placeholders}){board_filter}) "
+            f"AND Card_ID NOT IN ({id_placeholders}){board_filter} "
+            f"GROUP BY Card_ID "
+            f"ORDER BY Deck_Count DESC, Card_ID "
+            f"LIMIT ?",
+            card_ids + board_parameters + card_ids + board_parameters + [top]
+        ).fetchall()
+        names = self.card_db.get_card_names(row["Card_ID"] for row in result)
+        return [(names.get(row["Card_ID"], ""), row["Deck_Count"]) for row in result]
+
+
+def _get_board_filter(boards: typing.Optional[typing.Iterable[str]]) -> typing.Tuple[str, typing.List[str]]:
+    """Returns an SQL condition restricting Deck_Card rows to the given boards and the query parameters."""
+    if boards is None:
+        return "", []
+    boards = list(boards)
+    return f" AND Board IN ({', '.join('?' * len(boards))})", boards
+
+
+def _is_in_directory(path: str, directory: Path, recursive: bool) -> bool:
+    if recursive:
+        return path.startswith(str(directory) + os.sep)
+    return Path(path).parent == directory
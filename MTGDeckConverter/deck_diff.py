@@ -0,0 +1,217 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Computes the differences between two versions of a deck.
+
+Decks are reduced to counted multisets of printings per board, so computing the difference takes linear time.
+The commander designations are treated as an additional board named "commanders".
+Only the cards that actually changed have to be resolved using the card database. The difference can be applied to
+a previously converted deck, which avoids converting the whole new deck version again.
+"""
+
+from collections import Counter
+import dataclasses
+import typing
+
+from MTGDeckConverter.card_db.db import CardDatabase
+import MTGDeckConverter.logger
+from MTGDeckConverter.model import Card, Deck
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+__all__ = [
+    "COMMANDERS",
+    "PrintingKey",
+    "DeckDiff",
+    "count_printings",
+    "diff_decks",
+]
+
+# Pseudo board name used for the commander designations
+COMMANDERS = "commanders"
+
+
+class PrintingKey(typing.NamedTuple):
+    """Identifies a card printing. Set abbreviations and collector numbers are normalized to lower case strings."""
+    english_name: typing.Optional[str]
+    set_abbreviation: typing.Optional[str]
+    collector_number: typing.Optional[str]
+
+    @staticmethod
+    def from_card(card: Card) -> "PrintingKey":
+        return PrintingKey(
+            card.english_name or None,
+            card.set_abbreviation.lower() if card.set_abbreviation else None,
+            str(card.collector_number).lower() if card.collector_number not in (None, "") else None,
+        )
+
+    def to_card(self) -> Card:
+        return Card(self.english_name, self.set_abbreviation, self.collector_number)
+
+    def format(self) -> str:
+        return f"[{(self.set_abbreviation or '').upper()}:{self.collector_number or ''}] {self.english_name or ''}"
+
+
+# Board name -> counted printings
+BoardCounts = typing.Dict[str, typing.Counter[PrintingKey]]
+
+
+def count_printings(deck: Deck) -> BoardCounts:
+    """Reduces the deck to counted printings per board, including the commanders pseudo board."""
+    result = {board: Counter(map(PrintingKey.from_card, cards)) for board, cards in deck.boards().items()}
+    result[COMMANDERS] = Counter(map(PrintingKey.from_card, deck.commanders))
+    return result
+
+
+class DeckDiff(typing.NamedTuple):
+    """The cards added and removed per board, when going from an old to a new deck version."""
+    added: BoardCounts
+    removed: BoardCounts
+
+    def is_empty(self) -> bool:
+        return not any(self.added.values()) and not any(self.removed.values())
+
+    def format_lines(self) -> typing.List[str]:
+        """Returns the changes as human readable lines, like "+2 main [ELD:123] Card Name"."""
+        lines = []
+        for sign, changes in (("-", self.removed), ("+", self.added)):
+            for board, counts in changes.items():
+                lines += (f"{sign}{count} {board} {key.format()}" for key, count in counts.items())
+        return lines
+
+    def resolve(self, card_db: CardDatabase) -> "DeckDiff":
+        """
+        Returns a new DeckDiff, in which all changed cards are identified using the card database.
+        Only the changed cards are looked up. Changes that turn out to refer to the same printing cancel each other,
+        like a card that only had its set abbreviation added in the new deck version.
+        :raises ValueError: If a changed card can not be identified.
+        """
+        resolved_keys: typing.Dict[PrintingKey, PrintingKey] = {}
+        unresolved_cards = Deck()
+        cards = {}
+        for changes in (self.added, self.removed):
+            for counts in changes.values():
+                for key in counts:
+                    if key not in cards:
+                        cards[key] = key.to_card()
+                        unresolved_cards.add_to_main_deck(cards[key])
+        errors = unresolved_cards.fill_missing_information(card_db, collect_errors=True)
+        if errors:
+            error_msg = "Unable to identify changed cards: " + "; ".join(error.reason for error in errors)
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        for key, card in cards.items():
+            resolved_keys[key] = PrintingKey.from_card(card)
+        added, removed = {}, {}
+        for board in self.added.keys() | self.removed.keys():
+            new_counts = Counter()
+            for key, count in self.added.get(board, Counter()).items():
+                new_counts[resolved_keys[key]] += count
+            for key, count in self.removed.get(board, Counter()).items():
+                new_counts[resolved_keys[key]] -= count
+            added[board] = Counter({key: count for key, count in new_counts.items() if count > 0})
+            removed[board] = Counter({key: -count for key, count in new_counts.items() if count < 0})
+        return DeckDiff(added, removed)
+
+    def apply(self, deck: Deck):
+        """
+        Applies the changes to the given deck in place. The deck should contain the old deck version, for example
+        read from a previously converted deck file.
+        Commanders are tracked by object identity, while parsers add all copies of a deck list line as the same
+        object. So each added commander is split off as a separate card object from a copy present in the boards.
+        :raises ValueError: If the deck lacks a card to remove or a card to designate as a commander. The deck may
+            be partially changed in that case.
+        """
+        boards = deck.boards()
+        removed_commanders = self.removed.get(COMMANDERS)
+        if removed_commanders:
+            # The cards stay in their boards as regular copies.
+            deck.commanders[:] = _remove_cards(deck.commanders, removed_commanders, COMMANDERS)
+        commander_ids = {id(card) for card in deck.commanders}
+        for board, counts in self.removed.items():
+            if counts and board != COMMANDERS:
+                boards[board][:] = _remove_cards(boards[board], counts, board, commander_ids)
+        added_cards: typing.Dict[PrintingKey, Card] = {}
+        for board, counts in self.added.items():
+            if board == COMMANDERS:
+                continue
+            for key, count in counts.items():
+                card = added_cards.setdefault(key, key.to_card())
+                boards[board] += [card] * count
+        for key, count in self.added.get(COMMANDERS, Counter()).items():
+            for _ in range(count):
+                commander = _split_off_regular_copy(boards, key, commander_ids)
+                commander_ids.add(id(commander))
+                deck.commanders.append(commander)
+
+
+def _remove_cards(
+        cards: typing.List[Card], counts: typing.Counter[PrintingKey], board: str,
+        commander_ids: typing.AbstractSet[int] = frozenset()) -> typing.List[Card]:
+    """
+    Returns the cards without the given counted printings. Regular copies are removed before copies designated
+    as commanders.
+    :raises ValueError: If the cards contain fewer copies of a printing than given
+    """
+    available = Counter(map(PrintingKey.from_card, cards))
+    missing = +(counts - available)
+    if missing:
+        error_msg = f"Cards to remove from the {board} board are not present in the deck: " \
+                    f"{', '.join(f'{count} {key.format()}' for key, count in missing.items())}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    regular_counts = Counter(PrintingKey.from_card(card) for card in cards if id(card) not in commander_ids)
+    # Number of commander copies to remove per printing, once all regular copies are removed
+    remaining_commanders = +(counts - regular_counts)
+    remaining_regular = counts - remaining_commanders
+    result = []
+    for card in cards:
+        key = PrintingKey.from_card(card)
+        remaining = remaining_commanders if id(card) in commander_ids else remaining_regular
+        if remaining[key] > 0:
+            remaining[key] -= 1
+        else:
+            result.append(card)
+    return result
+
+
+def _split_off_regular_copy(
+        boards: typing.Dict[str, typing.List[Card]], key: PrintingKey, commander_ids: typing.AbstractSet[int]) -> Card:
+    """
+    Replaces a regular copy of the given printing in the boards with a separate card object and returns it.
+    :raises ValueError: If no board contains a regular copy of the printing
+    """
+    for cards in boards.values():
+        for index, card in enumerate(cards):
+            if id(card) not in commander_ids and PrintingKey.from_card(card) == key:
+                cards[index] = dataclasses.replace(card)
+                return cards[index]
+    error_msg = f"Unable to designate {key.format()} as a commander, because the deck does not contain the card."
+    logger.error(error_msg)
+    raise ValueError(error_msg)
+
+
+def diff_decks(old_deck: Deck, new_deck: Deck) -> DeckDiff:
+    """
+    Computes the cards added and removed per board, when going from old_deck to new_deck.
+    The cards are compared by the printing information present in the decks. Use DeckDiff.resolve() to compare
+    by the resolved printings, if the decks are not resolved.
+    """
+    old_counts = count_printings(old_deck)
+    new_counts = count_printings(new_deck)
+    added = {board: new_counts[board] - old_counts[board] for board in new_counts}
+    removed = {board: old_counts[board] - new_counts[board] for board in old_counts}
+    return DeckDiff(added, removed)
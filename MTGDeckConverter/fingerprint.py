@@ -0,0 +1,144 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Canonical deck fingerprints, used to find identical decks stored in different files.
+
+The fingerprint is a hash over the resolved deck content. Each card is replaced by the Scryfall ID of its printing,
+quantities of the same printing are merged and all boards, including the commanders, are sorted. So decks with
+reordered lines, split quantities or different set codes for the same printing get the same fingerprint.
+The card language, foiling and condition are not part of the fingerprint.
+"""
+
+from collections import Counter
+import hashlib
+import json
+from pathlib import Path
+import typing
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.conversion import UnresolvedCardsError
+from MTGDeckConverter.deck_diff import count_printings, PrintingKey
+import MTGDeckConverter.formats
+import MTGDeckConverter.logger
+from MTGDeckConverter.model import Deck
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+__all__ = [
+    "DeckFingerprinter",
+    "FingerprintGroups",
+]
+
+
+class DeckFingerprinter:
+    """
+    Computes canonical deck fingerprints. The Scryfall IDs of all looked up printings are kept,
+    so that each printing is only looked up once, when fingerprinting many decks.
+    """
+
+    def __init__(self, card_db: CardDatabase):
+        self.card_db = card_db
+        self._scryfall_ids: typing.Dict[PrintingKey, str] = {}
+
+    def get_canonical_lines(self, deck: Deck) -> typing.List[str]:
+        """
+        Returns the canonical form of the resolved deck, as sorted "<board> <quantity> <Scryfall ID>" lines.
+        :raises ValueError: If a printing is not found in the card database
+        """
+        lines = []
+        for board, counts in count_printings(deck).items():
+            merged_counts = Counter()
+            for key, count in counts.items():
+                merged_counts[self._get_scryfall_id(key)] += count
+            lines += (f"{board} {count} {scryfall_id}" for scryfall_id, count in merged_counts.items())
+        lines.sort()
+        return lines
+
+    def fingerprint(self, deck: Deck) -> str:
+        """
+        Returns the fingerprint of the resolved deck, as a hexadecimal SHA-256 hash.
+        :raises ValueError: If a printing is not found in the card database
+        """
+        canonical_form = "\n".join(self.get_canonical_lines(deck))
+        return hashlib.sha256(canonical_form.encode("utf-8")).hexdigest()
+
+    def fingerprint_deck_file(
+            self, input_path: Path, input_format: str = MTGDeckConverter.formats.AUTO_DETECT) -> str:
+        """
+        Parses and resolves the deck file and returns its fingerprint.
+        :raises UnresolvedCardsError: If the deck contains cards that can not be identified.
+        """
+        deck = MTGDeckConverter.formats.parse_deck(input_path, input_format)
+        unresolved_cards = deck.fill_missing_information(self.card_db, collect_errors=True)
+        if unresolved_cards:
+            raise UnresolvedCardsError(input_path, unresolved_cards)
+        return self.fingerprint(deck)
+
+    def _get_scryfall_id(self, key: PrintingKey) -> str:
+        try:
+            return self._scryfall_ids[key]
+        except KeyError:
+            result = self._scryfall_ids[key] = self.card_db.get_scryfall_id_for_printing(
+                self.card_db.resolve_set_abbreviation(key.set_abbreviation) or key.set_abbreviation,
+                key.collector_number
+            )
+            return result
+
+
+class FingerprintGroups:
+    """
+    Groups deck files by their fingerprint. Only the file paths are kept, so arbitrarily many decks can be added.
+    """
+
+    def __init__(self):
+        self.groups: typing.Dict[str, typing.List[Path]] = {}
+        self.failures: typing.Dict[Path, str] = {}
+
+    def add(self, input_path: Path, fingerprint: str):
+        self.groups.setdefault(fingerprint, []).append(input_path)
+
+    def add_failure(self, input_path: Path, error: Exception):
+        self.failures[input_path] = str(error)
+
+    def add_deck_files(
+            self, fingerprinter: DeckFingerprinter, input_paths: typing.Iterable[Path],
+            input_format: str = MTGDeckConverter.formats.AUTO_DETECT):
+        """
+        Fingerprints the given deck files one at a time. Each deck is discarded after its fingerprint is computed,
+        so input_paths may be a lazy iterator over arbitrarily many files.
+        """
+        for input_path in input_paths:
+            try:
+                self.add(input_path, fingerprinter.fingerprint_deck_file(input_path, input_format))
+            except (OSError, ValueError) as e:
+                logger.error(f"Fingerprinting {input_path} failed: {e}")
+                self.add_failure(input_path, e)
+
+    def duplicates(self) -> typing.Dict[str, typing.List[Path]]:
+        """Returns all groups containing more than one deck file."""
+        return {fingerprint: paths for fingerprint, paths in self.groups.items() if len(paths) > 1}
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "deck_count": sum(map(len, self.groups.values())),
+            "distinct_deck_count": len(self.groups),
+            "groups": {fingerprint: list(map(str, paths)) for fingerprint, paths in self.groups.items()},
+            "failures": {str(path): error for path, error in self.failures.items()},
+        }
+
+    def write(self, report_path: Path):
+        logger.info(f"Writing the fingerprint report to {report_path}")
+        report_path.write_text(json.dumps(self.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
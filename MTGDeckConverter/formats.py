@@ -0,0 +1,280 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Registry of the supported input and output deck formats.
+
+Each format is implemented in its own module. An input format module provides a function
+parse_deck(source) -> Deck, an output format module provides a function write_deck_file(deck, target).
+The source is either a Path or an iterable of text lines, like an open text stream. The target is either a Path or
+a writable text stream. The built-in formats use open_deck_source() and open_deck_target() to support both.
+Format modules are only imported when the format is actually used, so that batch runs do not pay for formats they
+never need.
+
+Third party packages can add formats by declaring entry points in the groups given by INPUT_FORMAT_ENTRY_POINT_GROUP
+and OUTPUT_FORMAT_ENTRY_POINT_GROUP. The entry point name is the format name, the value is the importable module
+path. An input format plugin module may additionally provide a function sniff(head: str) -> bool that is used for
+automatic format detection.
+"""
+
+import contextlib
+import functools
+import importlib
+import itertools
+from pathlib import Path
+import re
+from types import ModuleType
+import typing
+
+import MTGDeckConverter.logger
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+__all__ = [
+    "InputFormat",
+    "OutputFormat",
+    "AUTO_DETECT",
+    "input_formats",
+    "output_formats",
+    "load_parser",
+    "load_writer",
+    "detect_input_format",
+    "detect_stream_format",
+    "open_deck_source",
+    "open_deck_target",
+    "describe_deck_source",
+    "parse_deck",
+    "write_deck",
+]
+
+INPUT_FORMAT_ENTRY_POINT_GROUP = "MTGDeckConverter.input_formats"
+OUTPUT_FORMAT_ENTRY_POINT_GROUP = "MTGDeckConverter.output_formats"
+# Pseudo format name that requests automatic input format detection.
+AUTO_DETECT = "auto"
+# Number of bytes read from the start of a file to detect the input format.
+SNIFF_SIZE = 512
+
+Sniffer = typing.Callable[[str], bool]
+# A deck file or an iterable of text lines, like sys.stdin
+DeckSource = typing.Union[Path, typing.Iterable[str]]
+# A deck file or a writable text stream, like sys.stdout
+DeckTarget = typing.Union[Path, typing.TextIO]
+
+
+class InputFormat(typing.NamedTuple):
+    name: str
+    # Dotted path of the module implementing parse_deck(). Imported on first use.
+    module: str
+    description: str = ""
+    # Decides, if the given start of a file is in this format. If None, the format module is asked instead.
+    sniff: typing.Optional[Sniffer] = None
+
+
+class OutputFormat(typing.NamedTuple):
+    name: str
+    # Dotted path of the module implementing write_deck_file(). Imported on first use.
+    module: str
+    description: str = ""
+    file_extension: str = ""
+
+
+def _sniff_tapped_out_csv(head: str) -> bool:
+    header = head.lstrip("\ufeff").split("\n", 1)[0]
+    return {"Board", "Qty", "Name"}.issubset(column.strip() for column in header.split(","))
+
+
+_XMAGE_LINE_REG_EXP = re.compile(r"^(?:NAME:|(?:SB: )?[0-9]+ \[[^:\]]*:[^\]]*\] )", re.MULTILINE)
+
+
+def _sniff_xmage(head: str) -> bool:
+    return _XMAGE_LINE_REG_EXP.search(head.lstrip("\ufeff")) is not None
+
+
+_BUILTIN_INPUT_FORMATS = (
+    InputFormat(
+        "tappedout_csv", "MTGDeckConverter.input_parser.tapped_out_csv",
+        "CSV files exported from https://tappedout.net", _sniff_tapped_out_csv),
+    InputFormat(
+        "xmage", "MTGDeckConverter.input_parser.xmage",
+        "XMage deck lists (http://xmage.de/)", _sniff_xmage),
+)
+
+_BUILTIN_OUTPUT_FORMATS = (
+    OutputFormat(
+        "xmage", "MTGDeckConverter.output_writer.xmage",
+        "XMage deck lists (http://xmage.de/)", ".dck"),
+)
+
+
+def _iter_entry_points(group: str):
+    try:
+        from importlib import metadata
+    except ImportError:
+        # Python 3.7 does not have importlib.metadata
+        import pkg_resources
+        yield from ((ep.name, ep.module_name) for ep in pkg_resources.iter_entry_points(group))
+        return
+    all_entry_points = metadata.entry_points()
+    if hasattr(all_entry_points, "select"):
+        entry_points = all_entry_points.select(group=group)
+    else:
+        entry_points = all_entry_points.get(group, [])
+    # Only use the module part of the entry point value. Loading the entry point would import the plugin.
+    yield from ((ep.name, ep.value.partition(":")[0].strip()) for ep in entry_points)
+
+
+@functools.lru_cache(maxsize=None)
+def input_formats() -> typing.Dict[str, InputFormat]:
+    """Returns all known input formats, keyed by name. Built-in formats come first and take precedence."""
+    formats = {input_format.name: input_format for input_format in _BUILTIN_INPUT_FORMATS}
+    for name, module in _iter_entry_points(INPUT_FORMAT_ENTRY_POINT_GROUP):
+        if name in formats or name == AUTO_DETECT:
+            logger.warning(f'Ignoring input format plugin "{name}" ({module}), because the name is already taken.')
+        else:
+            logger.debug(f'Registered input format plugin "{name}" from module {module}')
+            formats[name] = InputFormat(name, module, f"Plugin from {module}")
+    return formats
+
+
+@functools.lru_cache(maxsize=None)
+def output_formats() -> typing.Dict[str, OutputFormat]:
+    """Returns all known output formats, keyed by name. Built-in formats come first and take precedence."""
+    formats = {output_format.name: output_format for output_format in _BUILTIN_OUTPUT_FORMATS}
+    for name, module in _iter_entry_points(OUTPUT_FORMAT_ENTRY_POINT_GROUP):
+        if name in formats:
+            logger.warning(f'Ignoring output format plugin "{name}" ({module}), because the name is already taken.')
+        else:
+            logger.debug(f'Registered output format plugin "{name}" from module {module}')
+            formats[name] = OutputFormat(name, module, f"Plugin from {module}")
+    return formats
+
+
+def _get_format(formats: typing.Dict[str, typing.Any], name: str, kind: str):
+    try:
+        return formats[name]
+    except KeyError:
+        error_msg = f'Unknown {kind} format "{name}". Known formats: {", ".join(formats)}'
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+
+def load_parser(name: str) -> ModuleType:
+    """Imports and returns the module implementing the named input format."""
+    return importlib.import_module(_get_format(input_formats(), name, "input").module)
+
+
+def load_writer(name: str) -> ModuleType:
+    """Imports and returns the module implementing the named output format."""
+    return importlib.import_module(_get_format(output_formats(), name, "output").module)
+
+
+def detect_input_format(deck_file_path: Path) -> str:
+    """
+    Determines the input format of the given deck file by inspecting the first SNIFF_SIZE bytes.
+    Built-in sniffers are tried first, so that plugin modules are only imported, if no built-in format matches.
+    :raises ValueError: If no known format matches the file content.
+    """
+    with deck_file_path.open("rb") as deck_file:
+        head = deck_file.read(SNIFF_SIZE).decode("utf-8", errors="ignore").replace("\r\n", "\n")
+    return _detect_format(head, f"file {deck_file_path}")
+
+
+def detect_stream_format(lines: typing.Iterable[str]) -> typing.Tuple[str, typing.Iterable[str]]:
+    """
+    Determines the input format of a deck given as an iterable of text lines, like an open text stream, by inspecting
+    the lines containing the first SNIFF_SIZE characters. Streams can not seek back, so this returns the detected
+    format and an iterable yielding all lines, including the inspected ones.
+    :raises ValueError: If no known format matches the content.
+    """
+    source_description = describe_deck_source(lines)
+    lines = iter(lines)
+    head_lines = []
+    head_size = 0
+    for line in lines:
+        head_lines.append(line)
+        head_size += len(line)
+        if head_size >= SNIFF_SIZE:
+            break
+    head = "".join(head_lines).replace("\r\n", "\n")
+    return _detect_format(head, source_description), itertools.chain(head_lines, lines)
+
+
+def _detect_format(head: str, source_description: str) -> str:
+    formats = input_formats().values()
+    for input_format in formats:
+        if input_format.sniff is not None and input_format.sniff(head):
+            logger.debug(f'Detected input format "{input_format.name}" for {source_description}')
+            return input_format.name
+    for input_format in formats:
+        if input_format.sniff is None:
+            plugin_sniff: typing.Optional[Sniffer] = getattr(load_parser(input_format.name), "sniff", None)
+            if plugin_sniff is not None and plugin_sniff(head):
+                logger.debug(f'Detected input format "{input_format.name}" for {source_description}')
+                return input_format.name
+    error_msg = f"Unable to detect the deck format of {source_description}"
+    logger.error(error_msg)
+    raise ValueError(error_msg)
+
+
+@contextlib.contextmanager
+def open_deck_source(source: DeckSource, newline: typing.Optional[str] = None) \
+        -> typing.Generator[typing.Iterable[str], None, None]:
+    """
+    Yields the lines of the given deck source. Paths are opened as UTF-8 encoded text files using the given newline
+    mode and closed afterwards. Other sources are used as-is and left open.
+    """
+    if isinstance(source, Path):
+        with source.open("r", encoding="utf-8", newline=newline) as deck_file:
+            yield deck_file
+    else:
+        yield source
+
+
+@contextlib.contextmanager
+def open_deck_target(target: DeckTarget) -> typing.Generator[typing.TextIO, None, None]:
+    """
+    Yields a writable text stream for the given deck target. Paths are opened as UTF-8 encoded text files and closed
+    afterwards. Streams are flushed, but left open.
+    """
+    if isinstance(target, Path):
+        with target.open("w", encoding="utf-8") as output_file:
+            yield output_file
+    else:
+        yield target
+        target.flush()
+
+
+def describe_deck_source(source: typing.Union[DeckSource, DeckTarget]) -> str:
+    """Returns a description of the deck source or target for log messages, like "file deck.csv" or "<stdin>"."""
+    if isinstance(source, Path):
+        return f"file {source}"
+    return str(getattr(source, "name", "text stream"))
+
+
+def parse_deck(source: DeckSource, input_format: str = AUTO_DETECT):
+    """
+    Parses the given deck file or iterable of text lines, using the given input format or automatic format detection.
+    """
+    if input_format == AUTO_DETECT:
+        if isinstance(source, Path):
+            input_format = detect_input_format(source)
+        else:
+            input_format, source = detect_stream_format(source)
+    return load_parser(input_format).parse_deck(source)
+
+
+def write_deck(deck, target: DeckTarget, output_format: str):
+    """Writes the given deck to the given file or text stream, using the named output format."""
+    load_writer(output_format).write_deck_file(deck, target)
@@ -16,9 +16,9 @@
 """This module implements a parser for tappedout.com CSV exported decks."""
 
 import csv
-from pathlib import Path
 import typing
 
+from MTGDeckConverter.formats import DeckSource, describe_deck_source, open_deck_source
 import MTGDeckConverter.model
 import MTGDeckConverter.logger
 
@@ -47,8 +47,8 @@ csv.register_dialect(_CSV_DIALECT_NAME, TappedOutDialect)
 csv_foil_indicators = {"foil", "pre"}
 
 
-def parse_deck(csv_file_path: Path) -> MTGDeckConverter.model.Deck:
-    logger.info(f"Parsing Tappedout.com CSV exported deck from location {csv_file_path}")
+def parse_deck(source: DeckSource) -> MTGDeckConverter.model.Deck:
+    logger.info(f"Parsing Tappedout.com CSV exported deck from {describe_deck_source(source)}")
     deck = MTGDeckConverter.model.Deck()
     # These are the four categories/boards supported by TappedOut.
     card_categories = {
@@ -57,7 +57,7 @@ def parse_deck(csv_file_path: Path) -> MTGDeckConverter.model.Deck:
         "maybe": deck.add_to_maybe_board,
         "acquire": deck.add_to_acquire_board,
     }
-    for line in _read_lines_from_csv(csv_file_path):
+    for line in _read_lines_from_csv(source):
         cards, is_commander = _parse_cards_from_line(line)
         for card in cards:
             # The Board column contains the category/board the card belongs to, so use it to look up the right setter.
@@ -65,8 +65,8 @@ def parse_deck(csv_file_path: Path) -> MTGDeckConverter.model.Deck:
     return deck
 
 
-def _read_lines_from_csv(csv_file_path: Path) -> typing.Generator[typing.Dict[str, str], None, None]:
-    with csv_file_path.open("r", encoding="utf-8", newline="") as csv_file:
+def _read_lines_from_csv(source: DeckSource) -> typing.Generator[typing.Dict[str, str], None, None]:
+    with open_deck_source(source, newline="") as csv_file:
         yield from csv.DictReader(csv_file, dialect=_CSV_DIALECT_NAME)
 
 
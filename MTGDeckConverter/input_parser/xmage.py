@@ -0,0 +1,87 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""This module implements a parser for XMage (http://xmage.de/) deck lists."""
+
+import dataclasses
+import re
+import typing
+
+from MTGDeckConverter.formats import DeckSource, describe_deck_source, open_deck_source
+import MTGDeckConverter.model
+import MTGDeckConverter.logger
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+_deck_name_prefix = "NAME:"
+# The manual card layout of the XMage deck editor. It can not be represented by the deck model, so it is skipped.
+_layout_prefix = "LAYOUT "
+_card_line_reg_exp = re.compile(
+    r"(?P<sideboard>SB: )?(?P<count>[0-9]+) \[(?P<set>[^:\]]*):(?P<number>[^\]]*)\] (?P<english_name>.+)"
+)
+
+
+def parse_deck(source: DeckSource) -> MTGDeckConverter.model.Deck:
+    logger.info(f"Parsing XMage deck list from {describe_deck_source(source)}")
+    deck = MTGDeckConverter.model.Deck()
+    for line in _read_lines(source):
+        if line.startswith(_deck_name_prefix):
+            deck.name = line[len(_deck_name_prefix):]
+            logger.debug(f'Found deck name "{deck.name}"')
+        elif not line or line.startswith(_layout_prefix):
+            continue
+        else:
+            cards, is_sideboard = _parse_cards_from_line(line)
+            add_card = deck.add_to_side_board if is_sideboard else deck.add_to_main_deck
+            for card in cards:
+                add_card(card)
+    return deck
+
+
+def restore_commanders(deck: MTGDeckConverter.model.Deck):
+    """
+    Restores the commanders of a Commander deck written by the XMage writer, which stores the commanders as the
+    sideboard. The sideboard cards are moved to the main deck and designated as commanders. Commanders are tracked
+    by object identity, so each copy becomes a separate card object.
+    """
+    for card in deck.side_board:
+        deck.add_to_main_deck(dataclasses.replace(card), is_commander=True)
+    deck.side_board.clear()
+
+
+def _read_lines(source: DeckSource) -> typing.Generator[str, None, None]:
+    with open_deck_source(source) as deck_file:
+        yield from (line.strip() for line in deck_file)
+
+
+def _parse_cards_from_line(line: str) -> typing.Tuple[typing.List[MTGDeckConverter.model.Card], bool]:
+    """
+    Parses the given deck list line into cards. If the count is > 1, it returns the same card multiple times.
+    """
+    match = _card_line_reg_exp.fullmatch(line)
+    if match is None:
+        error_msg = f'Unable to parse XMage deck list line: "{line}"'
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    card = MTGDeckConverter.model.Card(
+        english_name=match["english_name"],
+        # XMage uses upper case set abbreviations, the card database uses the lower case Scryfall codes.
+        set_abbreviation=match["set"].lower(),
+        collector_number=match["number"],
+    )
+    quantity = int(match["count"])
+    is_sideboard = match["sideboard"] is not None
+    logger.debug(f"Parsed deck list line. Found {quantity} * '{card.english_name}'. Is sideboard: {is_sideboard}")
+    return [card] * quantity, is_sideboard
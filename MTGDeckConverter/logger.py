@@ -32,7 +32,8 @@ def get_logger(full_module_path: str) -> logging.Logger:
 def configure_root_logger(args: Namespace):
     """Initialise logging system"""
     root_logger.setLevel(1)
-    handler = logging.StreamHandler(sys.stdout)
+    # Commands like "stream", "diff" or "index" write their results to the standard output, so log to standard error.
+    handler = logging.StreamHandler(sys.stderr)
     handler.setLevel(logging.DEBUG if args.verbose else logging.INFO)
     handler.setFormatter(logging.Formatter(LOG_FORMAT))
     root_logger.addHandler(handler)
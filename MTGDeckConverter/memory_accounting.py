@@ -0,0 +1,229 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Accounts the memory used by the stages of the conversion and population pipelines, using tracemalloc.
+
+The pipelines mark their stages using stage(). Unless accounting was started using start(), stage() does nothing, so
+the marks cost next to nothing in regular runs. While accounting, each stage records the peak of the traced memory
+while it ran and the memory it allocated, but did not free again. Stages are entered from a single thread. A stage
+entered while another stage runs suspends the outer stage, so that time and memory are attributed to the innermost
+stage. Memory allocated by one stage and freed by another counts as retained by the first and as negative retained
+memory of the second.
+
+tracemalloc only sees memory allocated by the Python memory allocator. Memory allocated by SQLite is not included.
+"""
+
+import contextlib
+import datetime
+import json
+from pathlib import Path
+import sys
+import time
+import tracemalloc
+import typing
+
+import MTGDeckConverter.logger
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+__all__ = [
+    "DOWNLOAD",
+    "DECODE",
+    "INSERT",
+    "PARSE",
+    "RESOLVE",
+    "WRITE",
+    "MemoryBudgetExceededError",
+    "MemoryAccountant",
+    "start",
+    "stop",
+    "stage",
+]
+
+# Stages of populating the card database
+DOWNLOAD = "download"
+DECODE = "decode"
+INSERT = "insert"
+# Stages of converting a deck
+PARSE = "parse"
+RESOLVE = "resolve"
+WRITE = "write"
+
+
+class MemoryBudgetExceededError(MemoryError):
+    """Raised, if the traced memory exceeds the memory budget. Aborts the running command."""
+    pass
+
+
+class _StageStatistics:
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.peak_bytes = 0
+        self.retained_bytes = 0
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "count": self.count,
+            "seconds": round(self.seconds, 6),
+            "peak_bytes": self.peak_bytes,
+            "retained_bytes": self.retained_bytes,
+        }
+
+
+class _RunningStage:
+
+    def __init__(self, statistics: _StageStatistics, current_bytes: int):
+        self.statistics = statistics
+        # Start of the time span, in which this stage is the innermost running stage
+        self.segment_start_time = time.perf_counter()
+        self.segment_start_bytes = current_bytes
+
+
+class MemoryAccountant:
+    """Collects the memory statistics of all stages. Use the module functions start(), stage() and stop()."""
+
+    # Number of allocation sites listed in the report
+    TOP_ALLOCATION_SITES = 10
+
+    def __init__(self, budget_bytes: typing.Optional[int] = None):
+        self.budget_bytes = budget_bytes
+        self.budget_exceeded = False
+        self.stages: typing.Dict[str, _StageStatistics] = {}
+        self._running_stages: typing.List[_RunningStage] = []
+        self._peak_bytes = 0
+        # The peak is only reset between stages on Python 3.9 and later. Otherwise, stage peaks are cumulative.
+        self._can_reset_peak = hasattr(tracemalloc, "reset_peak")
+        # Snapshot taken when the budget was exceeded, before the aborted command released any memory
+        self._abort_snapshot: typing.Optional[tracemalloc.Snapshot] = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        current_bytes = self._end_segment()
+        self._running_stages.append(
+            _RunningStage(self.stages.setdefault(name, _StageStatistics()), current_bytes))
+        try:
+            yield
+        finally:
+            current_bytes = self._end_segment()
+            self._running_stages.pop().statistics.count += 1
+            if self._running_stages:
+                # Resume the outer stage
+                self._running_stages[-1].segment_start_time = time.perf_counter()
+                self._running_stages[-1].segment_start_bytes = current_bytes
+        self.check_budget(name)
+
+    def _end_segment(self) -> int:
+        """
+        Attributes the time, the memory peak and the retained memory since the last stage transition to the innermost
+        running stage and returns the currently traced memory.
+        """
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        self._peak_bytes = max(self._peak_bytes, peak_bytes)
+        if self._running_stages:
+            running_stage = self._running_stages[-1]
+            statistics = running_stage.statistics
+            statistics.seconds += time.perf_counter() - running_stage.segment_start_time
+            statistics.peak_bytes = max(statistics.peak_bytes, peak_bytes)
+            statistics.retained_bytes += current_bytes - running_stage.segment_start_bytes
+        if self._can_reset_peak:
+            tracemalloc.reset_peak()
+        return current_bytes
+
+    def check_budget(self, stage_name: str = ""):
+        """:raises MemoryBudgetExceededError: If the traced memory exceeded the budget."""
+        if self.budget_bytes is None:
+            return
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        if max(peak_bytes, self._peak_bytes) <= self.budget_bytes:
+            return
+        self.budget_exceeded = True
+        self._abort_snapshot = tracemalloc.take_snapshot()
+        error_msg = f"The traced memory of {max(peak_bytes, self._peak_bytes) / 2**20:.1f} MiB exceeded the " \
+                    f"memory budget of {self.budget_bytes / 2**20:.1f} MiB" \
+                    f"{f' in stage {stage_name}' if stage_name else ''}."
+        logger.error(error_msg)
+        raise MemoryBudgetExceededError(error_msg)
+
+    def get_report(self) -> typing.Dict[str, typing.Any]:
+        """Returns the collected statistics and the top allocation sites, suitable for serialization as JSON."""
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        snapshot = self._abort_snapshot or tracemalloc.take_snapshot()
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        return {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "python_version": sys.version.split()[0],
+            "budget_bytes": self.budget_bytes,
+            "budget_exceeded": self.budget_exceeded,
+            "peak_bytes": max(peak_bytes, self._peak_bytes),
+            "retained_bytes": current_bytes,
+            "stage_peaks_are_cumulative": not self._can_reset_peak,
+            "stages": {name: statistics.to_dict() for name, statistics in self.stages.items()},
+            "top_allocation_sites": [
+                {
+                    "file": statistic.traceback[0].filename,
+                    "line": statistic.traceback[0].lineno,
+                    "size_bytes": statistic.size,
+                    "count": statistic.count,
+                }
+                for statistic in snapshot.statistics("lineno")[:self.TOP_ALLOCATION_SITES]
+            ],
+        }
+
+    def write(self, report: typing.Dict[str, typing.Any], report_path: Path):
+        logger.info(f"Writing the memory report to {report_path}")
+        report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+_accountant: typing.Optional[MemoryAccountant] = None
+_NO_STAGE = contextlib.nullcontext()
+
+
+def start(budget_bytes: typing.Optional[int] = None) -> MemoryAccountant:
+    """
+    Starts tracing memory allocations and returns the accountant collecting the statistics of all stages.
+    If a budget is given, the stage exceeding it raises MemoryBudgetExceededError.
+    """
+    global _accountant
+    logger.info(
+        "Starting the memory accounting"
+        f"{'' if budget_bytes is None else f' with a budget of {budget_bytes / 2**20:.1f} MiB'}. "
+        "Tracing memory allocations slows down the program."
+    )
+    tracemalloc.start()
+    _accountant = MemoryAccountant(budget_bytes)
+    return _accountant
+
+
+def stop():
+    """Stops tracing memory allocations. Get the report from the accountant before stopping."""
+    global _accountant
+    _accountant = None
+    tracemalloc.stop()
+
+
+def stage(name: str) -> typing.ContextManager:
+    """Marks the code run inside the returned context manager as the named pipeline stage."""
+    if _accountant is None:
+        return _NO_STAGE
+    return _accountant.stage(name)
@@ -13,11 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from dataclasses import dataclass
-import itertools
+from dataclasses import dataclass, asdict
 import typing
 
-from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.card_db.db import CardDatabase, ENGLISH
 import MTGDeckConverter.logger
 
 logger = MTGDeckConverter.logger.get_logger(__name__)
@@ -40,6 +39,21 @@ class Card:
 CardList = typing.List[Card]
 
 
+class UnresolvedCard(typing.NamedTuple):
+    """A card in a deck that could not be identified using the card database."""
+    board: str
+    quantity: int
+    card: Card
+    reason: str
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """Returns a JSON serializable representation."""
+        result = {"board": self.board, "quantity": self.quantity}
+        result.update(asdict(self.card))
+        result["reason"] = self.reason
+        return result
+
+
 class Deck:
     """
     An MTG deck. It consists of cards placed in a main deck and a side board.
@@ -82,21 +96,71 @@ class Deck:
             logger.info(f"Adding designated Commander card to the Command zone: {card}")
             self.commanders.append(card)
 
-    def fill_missing_information(self, card_db: CardDatabase):
-        all_cards = itertools.chain(self.main_deck, self.side_board, self.maybe_board, self.acquire_bord)
-        for card in all_cards:
-            self._fill_information_for_card(card, card_db)
+    def boards(self) -> typing.Dict[str, CardList]:
+        """Returns all card lists of this deck, keyed by the board name used by TappedOut."""
+        return {
+            "main": self.main_deck,
+            "side": self.side_board,
+            "maybe": self.maybe_board,
+            "acquire": self.acquire_bord,
+        }
+
+    def fill_missing_information(
+            self, card_db: CardDatabase, collect_errors: bool = False) -> typing.List[UnresolvedCard]:
+        """
+        Looks up missing card information in the card database.
+        By default, the first card that can not be identified raises a ValueError. If collect_errors is True, all cards
+        are processed and every card that can not be identified is returned instead.
+        """
+        unresolved_cards = []
+        for board, cards in self.boards().items():
+            # Parsers add multiple copies of a card as references to the same object, so look up each object once.
+            quantities: typing.Dict[int, typing.List] = {}
+            for card in cards:
+                quantities.setdefault(id(card), [card, 0])[1] += 1
+            for card, quantity in quantities.values():
+                try:
+                    self._resolve_card(card, card_db)
+                except ValueError as e:
+                    if not collect_errors:
+                        raise
+                    unresolved_cards.append(UnresolvedCard(board, quantity, card, str(e)))
+                else:
+                    if collect_errors and not (card.english_name and card.set_abbreviation and card.collector_number):
+                        unresolved_cards.append(UnresolvedCard(
+                            board, quantity, card, "Not enough information to identify the card."))
+        if unresolved_cards:
+            logger.warning(f"Unable to identify {len(unresolved_cards)} cards.")
+        return unresolved_cards
+
+    @staticmethod
+    def _resolve_card(card: Card, card_db: CardDatabase):
+        try:
+            Deck._fill_information_for_card(card, card_db)
+        except ValueError:
+            language = (card.language or ENGLISH).lower()
+            if not card.english_name or language == ENGLISH:
+                raise
+            # Lists of non-English cards may contain the printed name instead of the English name.
+            card.english_name = card_db.get_english_name_for_printed_name(card.english_name, language)
+            Deck._fill_information_for_card(card, card_db)
 
     @staticmethod
     def _fill_information_for_card(card: Card, card_db: CardDatabase):
+        if card.set_abbreviation:
+            # Translates set codes used by other sources. None, if the set is not present in the database.
+            known_set_abbreviation = card_db.resolve_set_abbreviation(card.set_abbreviation)
+        else:
+            known_set_abbreviation = None
         if card.english_name:
             if (not card.set_abbreviation and not card.collector_number) \
-                    or (card.set_abbreviation and not card_db.is_set_abbreviation_known(card.set_abbreviation)):
+                    or (card.set_abbreviation and known_set_abbreviation is None):
                 # Both are unknown or the set is not present in the database. Do a guess based on the English name.
                 card.set_abbreviation, card.collector_number = card_db.get_card_set_and_number_for_name(
                     card.english_name
                 )
             elif not card.collector_number:
+                card.set_abbreviation = known_set_abbreviation
                 card.collector_number = card_db.get_collector_number_for_card_in_set(
                     card.english_name, card.set_abbreviation
                 )
@@ -104,10 +168,104 @@ class Deck:
                 card.set_abbreviation = card_db.get_card_set_for_card_with_collector_number(
                     card.english_name, card.collector_number
                 )
+            else:
+                card.set_abbreviation = known_set_abbreviation
         else:
             # The English name is missing.
             # The card can be identified, if both the set and the collector number are known.
             if card.set_abbreviation and card.collector_number:
+                card.set_abbreviation = known_set_abbreviation or card.set_abbreviation
                 card.english_name = card_db.get_english_name_for_card_in_card_set(
                     card.set_abbreviation, card.collector_number
                 )
+
+
+class CardIdentity(typing.NamedTuple):
+    """
+    Immutable identity of a card printing, as described by the fields of Card.
+    Use a CardInterner to obtain a single shared instance for each distinct identity.
+    """
+    english_name: str = None
+    set_abbreviation: str = None
+    collector_number: str = None
+    language: str = "EN"
+    foil: bool = False
+    condition: str = None
+
+    @staticmethod
+    def from_card(card: Card) -> "CardIdentity":
+        return CardIdentity(
+            card.english_name, card.set_abbreviation, card.collector_number,
+            card.language, card.foil, card.condition
+        )
+
+    def to_card(self) -> Card:
+        return Card(*self)
+
+
+class CardInterner:
+    """
+    Pool of shared CardIdentity instances. Decks holding cards obtained from the same interner share a single object
+    for each distinct card, instead of holding one copy per deck.
+    """
+    __slots__ = ("_pool",)
+
+    def __init__(self):
+        self._pool: typing.Dict[CardIdentity, CardIdentity] = {}
+
+    def __len__(self) -> int:
+        return len(self._pool)
+
+    def intern(self, card: typing.Union[Card, CardIdentity]) -> CardIdentity:
+        identity = card if isinstance(card, CardIdentity) else CardIdentity.from_card(card)
+        return self._pool.setdefault(identity, identity)
+
+    def clear(self):
+        self._pool.clear()
+
+
+class DeckEntry(typing.NamedTuple):
+    """Per-deck data of a card in a CompactDeck."""
+    board: str
+    card: CardIdentity
+    quantity: int
+    is_commander: bool
+
+
+class CompactDeck:
+    """
+    Memory efficient, immutable representation of a Deck, intended for keeping large numbers of decks in memory.
+    Cards are shared CardIdentity instances from a CardInterner, quantities and the board and commander
+    designations are stored in the DeckEntry tuples of each deck.
+    """
+    __slots__ = ("name", "entries")
+
+    def __init__(self, name: str, entries: typing.Tuple[DeckEntry, ...]):
+        self.name = name
+        self.entries = entries
+
+    @staticmethod
+    def from_deck(deck: Deck, interner: CardInterner) -> "CompactDeck":
+        commander_ids = {id(card) for card in deck.commanders}
+        entries = []
+        for board, cards in deck.boards().items():
+            # Multiple copies of a card are references to the same object. Count them by identity.
+            quantities: typing.Dict[int, typing.List] = {}
+            for card in cards:
+                quantities.setdefault(id(card), [card, 0])[1] += 1
+            entries += (
+                DeckEntry(board, interner.intern(card), quantity, id(card) in commander_ids)
+                for card, quantity in quantities.values()
+            )
+        return CompactDeck(deck.name, tuple(entries))
+
+    def to_deck(self) -> Deck:
+        """Creates a regular, mutable Deck, for example to pass it to an output writer."""
+        deck = Deck(self.name)
+        boards = deck.boards()
+        for entry in self.entries:
+            card = entry.card.to_card()
+            boards[entry.board] += [card] * entry.quantity
+            if entry.is_commander:
+                deck.commanders += [card] * entry.quantity
+        return deck
@@ -13,9 +13,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from pathlib import Path
+from collections import Counter
+import typing
 
-from MTGDeckConverter.model import Deck
+from MTGDeckConverter.formats import DeckTarget, describe_deck_source, open_deck_target
+from MTGDeckConverter.model import Card, CardList, Deck
 import MTGDeckConverter.logger
 
 logger = MTGDeckConverter.logger.get_logger(__name__)
@@ -25,9 +27,12 @@ _deck_name_format_line = "NAME:{deck_name}\n"
 _main_deck_format_line = "{count} [{set}:{number}] {english_name}\n"
 _sideboard_format_line = "SB: {count} [{set}:{number}] {english_name}\n"
 
+# Identifies a single printing in an XMage deck list: (upper case set abbreviation, collector number, English name).
+PrintingKey = typing.Tuple[str, str, str]
 
-def write_deck_file(deck: Deck, output_path: Path):
-    logger.info(f"Start writing deck {f'{deck.name} ' if deck.name else ''}to file {output_path}.")
+
+def write_deck_file(deck: Deck, target: DeckTarget):
+    logger.info(f"Start writing deck {f'{deck.name} ' if deck.name else ''}to {describe_deck_source(target)}.")
     if deck.side_board and deck.commanders:
         logger.warning(
             "Writing a Commander deck with non-empty sideboard. As of December 2019, this is unsupported by XMage. "
@@ -38,64 +43,60 @@ def write_deck_file(deck: Deck, output_path: Path):
     else:
         main_deck_lines, sideboard_deck_lines = _format_non_commander_deck(deck)
 
-    _write_deck_file(deck, output_path, main_deck_lines, sideboard_deck_lines)
+    _write_deck_file(deck, target, main_deck_lines, sideboard_deck_lines)
 
 
-def _format_commander_deck(deck):
+def _format_commander_deck(deck: Deck) -> typing.Tuple[typing.List[str], typing.List[str]]:
     logger.debug("Found a Commander deck.")
-    logger.debug("Placing all non-commander cards from the main board into the main board.")
-    main_deck_lines = (
-        _main_deck_format_line.format(
-            count=1,
-            set=card.set_abbreviation.upper(),
-            number=card.collector_number,
-            english_name=card.english_name)
-        for card in deck.main_deck
-        if card not in deck.commanders
-    )
-    logger.debug("Placing all commander cards from the main board into the sideboard.")
-    sideboard_deck_lines = (
-        _sideboard_format_line.format(
-            count=1,
-            set=card.set_abbreviation.upper(),
-            number=card.collector_number,
-            english_name=card.english_name)
-        for card in deck.main_deck
-        if card in deck.commanders
-    )
-    return main_deck_lines, sideboard_deck_lines
-
-
-def _format_non_commander_deck(deck):
+    # Commanders are tracked by object identity. Comparing by value would use the field-by-field dataclass __eq__,
+    # which is slow for large decks and also moves regular copies of a card printing that is also a commander
+    # into the sideboard.
+    commander_ids = {id(card) for card in deck.commanders}
+    main_deck_counts: typing.Counter[PrintingKey] = Counter()
+    sideboard_counts: typing.Counter[PrintingKey] = Counter()
+    logger.debug("Placing all non-commander cards from the main board into the main board "
+                 "and all commander cards from the main board into the sideboard.")
+    for card in deck.main_deck:
+        target = sideboard_counts if id(card) in commander_ids else main_deck_counts
+        target[_printing_key(card)] += 1
+    return _format_lines(_main_deck_format_line, main_deck_counts), \
+        _format_lines(_sideboard_format_line, sideboard_counts)
+
+
+def _format_non_commander_deck(deck: Deck) -> typing.Tuple[typing.List[str], typing.List[str]]:
     logger.debug("Found a non-Commander deck.")
-    main_deck_lines = (
-        _main_deck_format_line.format(
-            count=1,
-            set=card.set_abbreviation.upper(),
-            number=card.collector_number,
-            english_name=card.english_name)
-        for card in deck.main_deck
-    )
-    sideboard_deck_lines = (
-        _sideboard_format_line.format(
-            count=1,
-            set=card.set_abbreviation.upper(),
-            number=card.collector_number,
-            english_name=card.english_name)
-        for card in deck.side_board
-    )
-    return main_deck_lines, sideboard_deck_lines
-
-
-def _write_deck_file(deck, output_path, main_deck_lines, sideboard_deck_lines):
-    logger.debug("Opened output file.")
-    with output_path.open("w", encoding="utf-8") as output_file:
-        if deck.name:
-            # Only write the name, if it is known.
-            logger.debug("The deck has an associated name. Writing the name header.")
-            output_file.write(_deck_name_format_line.format(deck_name=deck.name))
-        logger.debug("Writing the main deck list.")
-        output_file.writelines(main_deck_lines)
-        logger.debug("Writing the sideboard list.")
-        output_file.writelines(sideboard_deck_lines)
-        # Writing the LAYOUT section below the sideboard is currently not implemented.
+    return _format_lines(_main_deck_format_line, _count_printings(deck.main_deck)), \
+        _format_lines(_sideboard_format_line, _count_printings(deck.side_board))
+
+
+def _printing_key(card: Card) -> PrintingKey:
+    return card.set_abbreviation.upper(), card.collector_number, card.english_name
+
+
+def _count_printings(cards: CardList) -> typing.Counter[PrintingKey]:
+    """Aggregates identical printings. The Counter keeps the order in which each printing was first seen."""
+    return Counter(map(_printing_key, cards))
+
+
+def _format_lines(format_line: str, counts: typing.Counter[PrintingKey]) -> typing.List[str]:
+    return [
+        format_line.format(count=count, set=set_abbreviation, number=number, english_name=english_name)
+        for (set_abbreviation, number, english_name), count in counts.items()
+    ]
+
+
+def _write_deck_file(deck: Deck, target: DeckTarget, main_deck_lines: typing.List[str],
+                     sideboard_deck_lines: typing.List[str]):
+    parts = []
+    if deck.name:
+        # Only write the name, if it is known.
+        logger.debug("The deck has an associated name. Writing the name header.")
+        parts.append(_deck_name_format_line.format(deck_name=deck.name))
+    logger.debug("Writing the main deck list.")
+    parts += main_deck_lines
+    logger.debug("Writing the sideboard list.")
+    parts += sideboard_deck_lines
+    # Writing the LAYOUT section below the sideboard is currently not implemented.
+    with open_deck_target(target) as output_file:
+        logger.debug("Opened output file.")
+        output_file.write("".join(parts))
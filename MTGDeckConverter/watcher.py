@@ -0,0 +1,143 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Watches a directory and converts deck files, when they are created or changed.
+The directory is polled, so this works on all platforms and on network shares.
+"""
+
+import fnmatch
+import hashlib
+import os
+from pathlib import Path
+import time
+import typing
+
+from MTGDeckConverter.cache import ConversionCache
+from MTGDeckConverter.card_db.db import CardDatabase
+import MTGDeckConverter.conversion
+import MTGDeckConverter.formats
+import MTGDeckConverter.logger
+
+logger = MTGDeckConverter.logger.get_logger(__name__)
+
+__all__ = [
+    "DirectoryWatcher",
+]
+
+
+class _FileState(typing.NamedTuple):
+    mtime_ns: int
+    size: int
+
+
+class DirectoryWatcher:
+    """
+    Polls a directory for new or changed deck files and converts them. A file is converted after it did not change
+    for the debounce time, so that bursts of writes to the same file result in a single conversion.
+    Files with an unchanged content hash are not converted again, even if the modification time changed.
+
+    The same card database is used for all conversions during the lifetime of the watcher. If the database file is
+    replaced, for example by the refresh command, the watcher reopens it.
+    """
+
+    def __init__(
+            self, card_db: CardDatabase, directory: Path, output_formats: typing.List[str],
+            output_dir: typing.Optional[Path] = None,
+            input_format: str = MTGDeckConverter.formats.AUTO_DETECT,
+            pattern: str = "*",
+            poll_interval: float = 1.0,
+            debounce: float = 2.0,
+            cache: typing.Optional[ConversionCache] = None):
+        self.card_db = card_db
+        self.directory = directory
+        self.output_formats = output_formats
+        self.output_dir = output_dir
+        MTGDeckConverter.conversion.create_output_dir(output_dir)
+        self.input_format = input_format
+        self.pattern = pattern
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.cache = cache
+        # Last observed state of each watched file
+        self._file_states: typing.Dict[Path, _FileState] = {}
+        # Files with changes not yet converted, mapped to the time of the last observed change
+        self._pending_changes: typing.Dict[Path, float] = {}
+        # Content hashes of the last converted version of each file
+        self._converted_hashes: typing.Dict[Path, bytes] = {}
+        # Files written by the watcher itself. These are never treated as input files.
+        self._written_outputs: typing.Set[Path] = set()
+
+    def run(self):
+        """Watches the directory until interrupted."""
+        logger.info(
+            f'Watching directory {self.directory} for deck files matching "{self.pattern}". '
+            f"Converting to formats {', '.join(self.output_formats)}.")
+        try:
+            while True:
+                self.poll()
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            logger.info("Stopped watching.")
+
+    def poll(self):
+        """Scans the directory once and converts all files whose changes are older than the debounce time."""
+        self.card_db.reopen_if_replaced()
+        now = time.monotonic()
+        current_states = self._scan()
+        for path, state in current_states.items():
+            if self._file_states.get(path) != state:
+                self._pending_changes[path] = now
+        for path in self._file_states.keys() - current_states.keys():
+            logger.debug(f"File {path} was removed.")
+            self._pending_changes.pop(path, None)
+            self._converted_hashes.pop(path, None)
+        self._file_states = current_states
+        for path, changed_at in list(self._pending_changes.items()):
+            if now - changed_at >= self.debounce:
+                del self._pending_changes[path]
+                self._convert_if_changed(path)
+
+    def _scan(self) -> typing.Dict[Path, _FileState]:
+        result = {}
+        with os.scandir(str(self.directory)) as entries:
+            for entry in entries:
+                path = self.directory / entry.name
+                if entry.is_file() and fnmatch.fnmatch(entry.name, self.pattern) \
+                        and path not in self._written_outputs:
+                    stat = entry.stat()
+                    result[path] = _FileState(stat.st_mtime_ns, stat.st_size)
+        return result
+
+    def _convert_if_changed(self, input_path: Path):
+        try:
+            input_data = input_path.read_bytes()
+        except FileNotFoundError:
+            return
+        content_hash = hashlib.sha256(input_data).digest()
+        if self._converted_hashes.get(input_path) == content_hash:
+            logger.debug(f"Content of {input_path} did not change. Skipping.")
+            return
+        # Remember the hash even if the conversion fails. A broken file is only retried after it was changed.
+        self._converted_hashes[input_path] = content_hash
+        try:
+            output_paths = MTGDeckConverter.conversion.get_output_paths(
+                input_path, self.output_formats, self.output_dir)
+            self._written_outputs.update(output_paths.values())
+            # Convert the hashed content. The file may already have changed again.
+            MTGDeckConverter.conversion.convert_deck_file_to_formats(
+                self.card_db, input_path, output_paths, self.input_format, self.cache, input_data)
+        except (OSError, ValueError) as e:
+            logger.error(f"Converting {input_path} failed: {e}")
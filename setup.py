@@ -28,6 +28,9 @@ setup(
     include_package_data=True,  # Required to ship the database schema file and patches.
     # add required packages to install_requires list
     install_requires=["requests"],
+    extras_require={
+        "analytics": ["numpy"],
+    },
     setup_requires=["pytest-runner"],
     tests_require=["pytest", "pyhamcrest", "pyfakefs"],
     test_suite="pytest",
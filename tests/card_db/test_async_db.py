@@ -0,0 +1,151 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import threading
+import time
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.async_db import AsyncCardDatabase
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.model import Card, Deck
+
+
+def _run(card_db: CardDatabase, coroutine_function):
+    """Runs the coroutine function with an AsyncCardDatabase opened on the database of the card_db fixture."""
+    async def run():
+        async_db = AsyncCardDatabase(card_db.database_path, max_workers=2)
+        try:
+            return await coroutine_function(async_db)
+        finally:
+            await async_db.close()
+    return asyncio.run(run())
+
+
+def test_lookups_return_the_results_of_the_card_database(card_db: CardDatabase):
+    async def lookup(async_db: AsyncCardDatabase):
+        return await asyncio.gather(
+            async_db.get_english_name_for_card_in_card_set("m20", "2"),
+            async_db.get_collector_number_for_card_in_set("Sol Ring", "eld"),
+            async_db.resolve_set_abbreviation("ELD"),
+            async_db.get_data_version(),
+        )
+    assert_that(_run(card_db, lookup), contains_exactly("Counterspell", 1, "eld", card_db.get_data_version()))
+
+
+def test_lookup_errors_are_raised(card_db: CardDatabase):
+    async def lookup(async_db: AsyncCardDatabase):
+        try:
+            await async_db.get_card_set_and_number_for_name("Unknown Card")
+        except ValueError as e:
+            return e
+    assert_that(_run(card_db, lookup), is_(instance_of(ValueError)))
+
+
+def test_concurrent_identical_lookups_are_coalesced(card_db: CardDatabase, monkeypatch):
+    called_with = []
+    lock = threading.Lock()
+    lookup_name = CardDatabase.get_english_name_for_card_in_card_set
+
+    def slow_lookup(self, *args):
+        with lock:
+            called_with.append(args)
+        time.sleep(0.1)
+        return lookup_name(self, *args)
+    monkeypatch.setattr(CardDatabase, "get_english_name_for_card_in_card_set", slow_lookup)
+
+    async def lookup(async_db: AsyncCardDatabase):
+        return await asyncio.gather(
+            *[async_db.get_english_name_for_card_in_card_set("m20", "1") for _ in range(5)],
+            async_db.get_english_name_for_card_in_card_set("m20", "2"),
+        )
+    assert_that(_run(card_db, lookup), contains_exactly(*["Lightning Bolt"] * 5, "Counterspell"))
+    assert_that(called_with, contains_inanyorder(("m20", "1"), ("m20", "2")))
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_lookup(card_db: CardDatabase, monkeypatch):
+    lookup_name = CardDatabase.get_english_name_for_card_in_card_set
+    monkeypatch.setattr(
+        CardDatabase, "get_english_name_for_card_in_card_set",
+        lambda self, *args: time.sleep(0.1) or lookup_name(self, *args))
+
+    async def lookup(async_db: AsyncCardDatabase):
+        cancelled = asyncio.ensure_future(async_db.get_english_name_for_card_in_card_set("m20", "1"))
+        remaining = asyncio.ensure_future(async_db.get_english_name_for_card_in_card_set("m20", "1"))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        return await remaining
+    assert_that(_run(card_db, lookup), is_(equal_to("Lightning Bolt")))
+
+
+def test_batch_lookup_returns_errors_in_place(card_db: CardDatabase):
+    async def lookup(async_db: AsyncCardDatabase):
+        return await async_db.batch_lookup(
+            "get_english_name_for_card_in_card_set", [("m20", "1"), ("m20", "999"), ("eld", "1")])
+    assert_that(_run(card_db, lookup), contains_exactly("Lightning Bolt", instance_of(ValueError), "Sol Ring"))
+
+
+def test_batch_lookup_rejects_methods_other_than_lookups(card_db: CardDatabase):
+    async def lookup(async_db: AsyncCardDatabase):
+        for method_name in ("populate_database", "create_snapshot", "close", "_close_db", "db"):
+            with pytest.raises(ValueError, match="Unknown lookup method"):
+                await async_db.batch_lookup(method_name, [()])
+        return await async_db.get_data_version()
+    # The connections are still usable
+    assert_that(_run(card_db, lookup), is_(equal_to(card_db.get_data_version())))
+
+
+def test_close_does_not_block_the_event_loop(card_db: CardDatabase, monkeypatch):
+    lookup_started = threading.Event()
+    original_lookup = CardDatabase.get_data_version
+
+    def slow_lookup(self):
+        lookup_started.set()
+        time.sleep(0.2)
+        return original_lookup(self)
+    monkeypatch.setattr(CardDatabase, "get_data_version", slow_lookup)
+
+    async def close_while_looking_up():
+        async_db = AsyncCardDatabase(card_db.database_path, max_workers=1)
+        lookup = asyncio.ensure_future(async_db.get_data_version())
+        await asyncio.get_running_loop().run_in_executor(None, lookup_started.wait)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+        ticker = asyncio.ensure_future(tick())
+        await async_db.close()
+        ticker.cancel()
+        # The running lookup finished before the connections were closed
+        return await lookup, ticks
+    data_version, ticks = asyncio.run(close_while_looking_up())
+    assert_that(data_version, is_(equal_to(card_db.get_data_version())))
+    assert_that(ticks, is_(greater_than(5)))
+
+
+def test_fill_missing_information(card_db: CardDatabase):
+    deck = Deck()
+    deck.add_to_main_deck(Card("Sol Ring"))
+    deck.add_to_main_deck(Card("Unknown Card"))
+
+    async def resolve(async_db: AsyncCardDatabase):
+        return await async_db.fill_missing_information(deck)
+    assert_that(_run(card_db, resolve), contains_exactly(has_properties(card=deck.main_deck[1])))
+    assert_that(deck.main_deck[0], has_properties(set_abbreviation="eld", collector_number=1))
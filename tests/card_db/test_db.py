@@ -0,0 +1,171 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import json
+from pathlib import Path
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase, IngestionProfile, _iter_json_array
+from MTGDeckConverter.model import Card, Deck
+
+from tests.conftest import create_card_data, create_scryfall_card, write_card_data
+
+ELEMENTS = [
+    {"name": "Lightning Bolt", "collector_number": "1"},
+    {"name": "Ach! Hans, Run!", "text": "\"[brackets], {braces}\" and escaped \\ characters"},
+    {"nested": [{"a": []}, {"b": {}}], "number": 1.5e3, "null": None, "unicode": "Éclair ☃"},
+]
+
+
+def _decode(text: str, chunk_size: int = 2**20):
+    return list(_iter_json_array(io.StringIO(text), chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16, 64, 2**20])
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+def test_iter_json_array_decodes_all_elements_across_chunk_boundaries(chunk_size: int, separators):
+    text = json.dumps(ELEMENTS, separators=separators, ensure_ascii=False)
+    assert_that(_decode(text, chunk_size), is_(equal_to(ELEMENTS)))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 2**20])
+def test_iter_json_array_skips_white_space_and_byte_order_mark(chunk_size: int):
+    text = "\ufeff \r\n[\r\n  " + ",\r\n  ".join(map(json.dumps, ELEMENTS)) + "\r\n]\r\n"
+    assert_that(_decode(text, chunk_size), is_(equal_to(ELEMENTS)))
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] ", "[\n]\n"])
+def test_iter_json_array_decodes_empty_array(text: str):
+    assert_that(_decode(text, 1), is_(empty()))
+
+
+@pytest.mark.parametrize("text", ["", "{}", '{"object": []}', "null"])
+def test_iter_json_array_raises_value_error_for_other_content(text: str):
+    assert_that(calling(_decode).with_args(text), raises(ValueError, "not a JSON array"))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 2**20])
+@pytest.mark.parametrize("truncate", [1, 10, -30, -2, -1])
+def test_iter_json_array_raises_value_error_for_truncated_input(chunk_size: int, truncate: int):
+    text = json.dumps(ELEMENTS)
+    # A truncated input has to fail, instead of silently returning the elements read so far.
+    assert_that(calling(_decode).with_args(text[:truncate], chunk_size), raises(ValueError))
+
+
+def test_iter_json_array_is_lazy():
+    elements = _iter_json_array(io.StringIO(json.dumps(ELEMENTS) + "trailing garbage"), 8)
+    assert_that(next(elements), is_(equal_to(ELEMENTS[0])))
+
+
+def test_population_inserts_printings_in_batches(tmp_path: Path, card_data_path: Path, monkeypatch):
+    monkeypatch.setattr(CardDatabase, "POPULATION_BATCH_SIZE", 2)
+    card_db = CardDatabase(tmp_path/"batched.sqlite3")
+    statistics = card_db.populate_database(card_data_path)
+    assert_that(statistics.ingested_cards, is_(equal_to(len(create_card_data()))))
+    assert_that(
+        card_db.db.execute("SELECT count(*) FROM Printing").fetchone()[0], is_(equal_to(len(create_card_data()))))
+    card_db.close()
+
+
+def test_failed_population_leaves_the_database_empty(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(CardDatabase, "POPULATION_BATCH_SIZE", 2)
+    card_data_path = tmp_path/"truncated.json"
+    card_data_path.write_text(json.dumps(create_card_data())[:-50], encoding="utf-8")
+    card_db = CardDatabase(tmp_path/"cards.sqlite3")
+    assert_that(calling(card_db.populate_database).with_args(card_data_path), raises(ValueError))
+    assert_that(card_db.is_database_populated(), is_(False))
+    assert_that(card_db.get_data_version(), is_(none()))
+    card_db.close()
+
+
+def test_printings_are_stored_in_all_languages(card_db: CardDatabase):
+    assert_that(
+        [tuple(row) for row in card_db.db.execute(
+            "SELECT Language, Printed_Name FROM Printing WHERE Language != 'en' ORDER BY Printed_Name")],
+        contains_exactly(("fr", "Contresort"), ("fr", "Foudre")))
+
+
+def test_language_filter(tmp_path: Path, card_data_path: Path):
+    card_db = CardDatabase(tmp_path/"english.sqlite3")
+    statistics = card_db.populate_database(card_data_path, IngestionProfile(languages=frozenset({"en"})))
+    assert_that(statistics.excluded_cards, is_(equal_to({"languages": 2})))
+    assert_that(IngestionProfile(languages=frozenset({"fr", "de"})).describe(), is_(equal_to("languages=de+fr")))
+    card_db.close()
+
+
+def test_lookups_prefer_the_english_printing(card_db: CardDatabase):
+    english_scryfall_id = create_scryfall_card("Lightning Bolt", "eld", "5")["id"]
+    assert_that(card_db.get_scryfall_id_for_printing("ELD", "5"), is_(equal_to(english_scryfall_id)))
+    printing_id, _ = card_db.get_printing_and_card_id("eld", "5")
+    assert_that(
+        card_db.db.execute("SELECT Language FROM Printing WHERE Printing_ID = ?", (printing_id,)).fetchone()[0],
+        is_(equal_to("en")))
+    # Each printing is listed once, although it is stored in two languages
+    assert_that(
+        card_db.db.execute(
+            "SELECT count(*) FROM Printings_View WHERE Abbreviation = 'eld' AND Collector_Number = 5").fetchone()[0],
+        is_(equal_to(1)))
+
+
+def test_lookups_find_cards_only_printed_in_other_languages(card_db: CardDatabase):
+    assert_that(card_db.get_collector_number_for_card_in_set("Counterspell", "4bb"), is_(equal_to(208)))
+    assert_that(card_db.get_english_name_for_card_in_card_set("4bb", "208"), is_(equal_to("Counterspell")))
+    assert_that(card_db.get_card_set_for_card_with_collector_number("Counterspell", "208"), is_(equal_to("4bb")))
+    assert_that(
+        card_db.get_scryfall_id_for_printing("4bb", "208"),
+        is_(equal_to(create_scryfall_card("Counterspell", "4bb", "208", "fr")["id"])))
+
+
+def test_lookups_prefer_the_first_stored_printing_without_english_printing(tmp_path: Path):
+    card_data_path = write_card_data(tmp_path/"card_data.json", [
+        create_scryfall_card("Counterspell", "4bb", "208", "fr", "Contresort"),
+        create_scryfall_card("Counterspell", "4bb", "208", "de", "Gegenzauber"),
+    ])
+    card_db = CardDatabase(tmp_path/"cards.sqlite3")
+    card_db.populate_database(card_data_path)
+    assert_that(
+        card_db.db.execute("SELECT count(*) FROM Printings_View").fetchone()[0], is_(equal_to(1)))
+    assert_that(
+        card_db.get_scryfall_id_for_printing("4bb", "208"),
+        is_(equal_to(create_scryfall_card("Counterspell", "4bb", "208", "fr")["id"])))
+    card_db.close()
+
+
+def test_printed_name_lookup(card_db: CardDatabase):
+    assert_that(card_db.get_english_name_for_printed_name("Foudre", "FR"), is_(equal_to("Lightning Bolt")))
+    assert_that(
+        calling(card_db.get_english_name_for_printed_name).with_args("Foudre", "de"), raises(ValueError, "Foudre"))
+
+
+def test_printed_name_of_multi_faced_cards(tmp_path: Path):
+    card = create_scryfall_card("Fire // Ice", "m20", "10", "fr")
+    card["card_faces"] = [{"printed_name": "Feu"}, {"printed_name": "Glace"}]
+    card_db = CardDatabase(tmp_path/"cards.sqlite3")
+    card_db.populate_database(write_card_data(tmp_path/"card_data.json", [card]))
+    assert_that(card_db.get_english_name_for_printed_name("Feu // Glace", "fr"), is_(equal_to("Fire // Ice")))
+    card_db.close()
+
+
+def test_deck_resolution_uses_printed_names_of_non_english_cards(card_db: CardDatabase):
+    deck = Deck()
+    deck.add_to_main_deck(Card("Foudre", language="FR"))
+    deck.add_to_main_deck(Card("Foudre"))
+    unresolved_cards = deck.fill_missing_information(card_db, collect_errors=True)
+    assert_that(deck.main_deck[0], has_properties(english_name="Lightning Bolt", set_abbreviation=not_none()))
+    # English cards are not looked up by their printed names
+    assert_that(unresolved_cards, contains_exactly(has_properties(card=deck.main_deck[1])))
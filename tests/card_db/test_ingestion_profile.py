@@ -0,0 +1,86 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from pathlib import Path
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase, INGESTION_PROFILES, INGESTION_PROFILE_KEY, IngestionProfile
+
+from tests.conftest import create_scryfall_card, write_card_data
+
+SLIM = INGESTION_PROFILES["slim"]
+
+
+@pytest.mark.parametrize("card, expected", [
+    (create_scryfall_card("Lightning Bolt", "m20", "1"), None),
+    (create_scryfall_card("Lightning Bolt", "m20", "1", digital=True), "paper_only"),
+    (create_scryfall_card("Lightning Bolt", "m20", "1", games=["arena", "mtgo"]), "paper_only"),
+    (create_scryfall_card("Goblin", "teld", "1"), "exclude_tokens"),
+    (create_scryfall_card("Monarch", "m20", "3", layout="emblem"), "exclude_tokens"),
+    (create_scryfall_card("Lightning Bolt", "m20", "4", layout="art_series"), "exclude_art_cards"),
+    (create_scryfall_card("Lightning Bolt", "m20", "5", oversized=True), "exclude_oversized"),
+])
+def test_slim_profile_exclusion_reason(card: dict, expected: str):
+    assert_that(SLIM.get_exclusion_reason(card), is_(equal_to(expected)))
+    assert_that(IngestionProfile().get_exclusion_reason(card), is_(none()))
+
+
+@pytest.mark.parametrize("profile, expected", [
+    (IngestionProfile(), "full"),
+    (IngestionProfile(exclude_tokens=True), "exclude_tokens"),
+    (SLIM, "paper_only,exclude_tokens,exclude_art_cards,exclude_oversized"),
+])
+def test_describe(profile: IngestionProfile, expected: str):
+    assert_that(profile.describe(), is_(equal_to(expected)))
+
+
+def test_populate_database_skips_excluded_cards(tmp_path: Path):
+    card_data_path = write_card_data(tmp_path/"card_data.json", [
+        create_scryfall_card("Lightning Bolt", "m20", "1"),
+        create_scryfall_card("Counterspell", "m20", "2", digital=True),
+        create_scryfall_card("Goblin", "teld", "1"),
+        create_scryfall_card("Sol Ring", "eld", "1", oversized=True),
+        create_scryfall_card("Island", "eld", "254"),
+    ])
+    card_db = CardDatabase(tmp_path/"cards.sqlite3")
+    statistics = card_db.populate_database(card_data_path, SLIM)
+    assert_that(statistics, has_properties(
+        total_cards=5, ingested_cards=2, excluded_cards={"paper_only": 1, "exclude_tokens": 1, "exclude_oversized": 1}))
+    assert_that(card_db.get_metadata(INGESTION_PROFILE_KEY), is_(equal_to(SLIM.describe())))
+    assert_that(
+        card_db.db.execute("SELECT count(*) FROM Printing").fetchone()[0], is_(equal_to(2)))
+    assert_that(calling(card_db.get_card_set_and_number_for_name).with_args("Goblin"), raises(ValueError))
+    # Populating a populated database does nothing
+    assert_that(card_db.populate_database(card_data_path), is_(none()))
+    card_db.close()
+
+
+def test_populate_command_combines_profile_and_filter_options(tmp_path: Path, run_command):
+    database_path = tmp_path/"slim.sqlite3"
+    card_data_path = write_card_data(tmp_path/"card_data.json", [
+        create_scryfall_card("Lightning Bolt", "m20", "1"),
+        create_scryfall_card("Goblin", "teld", "1"),
+        create_scryfall_card("Counterspell", "m20", "2", digital=True),
+    ])
+    # The given --database option replaces the one of the card_db fixture
+    assert_that(run_command(
+        "--database", str(database_path), "populate", "--data-file", str(card_data_path), "--exclude-tokens"),
+        is_(equal_to(0)))
+    card_db = CardDatabase(database_path)
+    assert_that(card_db.get_metadata(INGESTION_PROFILE_KEY), is_(equal_to("exclude_tokens")))
+    assert_that(card_db.db.execute("SELECT count(*) FROM Printing").fetchone()[0], is_(equal_to(2)))
+    card_db.close()
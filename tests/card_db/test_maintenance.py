@@ -0,0 +1,133 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from pathlib import Path
+import sqlite3
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.card_db.maintenance import analyze, benchmark_lookups, get_object_sizes, maintain_database, \
+    rebuild_with_page_size, vacuum_into, ObjectSize
+
+LOOKUPS = ("set_and_number_for_name", "number_for_name_in_set", "set_for_name_and_number", "name_for_printing")
+
+
+class _ConnectionWithoutDbstat:
+    """Wraps a database connection and behaves like SQLite compiled without the dbstat virtual table."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._connection = connection
+
+    def execute(self, sql: str, *args):
+        if "dbstat" in sql:
+            raise sqlite3.OperationalError("no such table: dbstat")
+        return self._connection.execute(sql, *args)
+
+    def __getattr__(self, name: str):
+        return getattr(self._connection, name)
+
+
+def test_object_sizes_cover_all_tables_and_indexes(card_db: CardDatabase):
+    object_sizes = get_object_sizes(card_db)
+    names = [object_size.name for object_size in object_sizes]
+    assert_that(names, has_items("Printing", "Card", "Card_Set"))
+    assert_that(object_sizes, has_item(has_properties(type="index")))
+    sizes = [object_size.size for object_size in object_sizes]
+    assert_that(sizes, is_(equal_to(sorted(sizes, reverse=True))))
+
+
+def test_object_sizes_are_estimated_without_dbstat(card_db: CardDatabase):
+    card_db.db = _ConnectionWithoutDbstat(card_db.db)
+    object_sizes = get_object_sizes(card_db)
+    assert_that(object_sizes, only_contains(has_properties(estimated=True)))
+    printing_size = next(object_size for object_size in object_sizes if object_size.name == "Printing")
+    assert_that(printing_size, is_(instance_of(ObjectSize)))
+    assert_that(printing_size.size, is_(greater_than(0)))
+
+
+def test_analyze_gathers_query_planner_statistics(card_db: CardDatabase):
+    analyze(card_db)
+    assert_that(card_db.db.execute("SELECT count(*) FROM sqlite_stat1").fetchone()[0], is_(greater_than(0)))
+
+
+@pytest.mark.parametrize("page_size", [1024, 8192])
+def test_rebuild_with_page_size_keeps_the_journal_mode(card_db: CardDatabase, page_size: int):
+    rebuild_with_page_size(card_db, page_size)
+    assert_that(card_db.db.execute("PRAGMA page_size").fetchone()[0], is_(equal_to(page_size)))
+    assert_that(card_db.db.execute("PRAGMA journal_mode").fetchone()[0], is_(equal_to("wal")))
+    assert_that(card_db.get_card_set_and_number_for_name("Sol Ring"), is_(equal_to(("eld", 1))))
+
+
+@pytest.mark.parametrize("page_size", [0, 256, 1000, 2**17])
+def test_rebuild_with_invalid_page_size_raises_value_error(card_db: CardDatabase, page_size: int):
+    assert_that(calling(rebuild_with_page_size).with_args(card_db, page_size), raises(ValueError, "Invalid page size"))
+
+
+def test_vacuum_into_writes_a_usable_copy(tmp_path: Path, card_db: CardDatabase):
+    target_path = tmp_path/"copy.sqlite3"
+    vacuum_into(card_db, target_path)
+    copy = CardDatabase(target_path)
+    assert_that(copy.get_data_version(), is_(equal_to(card_db.get_data_version())))
+    copy.close()
+    assert_that(calling(vacuum_into).with_args(card_db, target_path), raises(FileExistsError))
+
+
+def test_benchmark_lookups_measures_all_lookups(card_db: CardDatabase):
+    latencies = benchmark_lookups(card_db, sample_size=5)
+    assert_that(latencies, has_entries({lookup: greater_than(0) for lookup in LOOKUPS}))
+
+
+def test_benchmark_lookups_on_an_empty_database(tmp_path: Path):
+    card_db = CardDatabase(tmp_path/"empty.sqlite3")
+    assert_that(benchmark_lookups(card_db), is_(empty()))
+    card_db.close()
+
+
+def test_maintain_database(tmp_path: Path, card_db: CardDatabase):
+    target_path = tmp_path/"copy.sqlite3"
+    report = maintain_database(card_db, 2048, target_path, benchmark_sample_size=5)
+    assert_that(report.page_size, is_(equal_to(2048)))
+    assert_that(report.lookup_latency_before, has_length(len(LOOKUPS)))
+    assert_that(report.lookup_latency_after, has_length(len(LOOKUPS)))
+    assert_that(report.object_sizes, is_not(empty()))
+    assert_that(target_path.exists(), is_(True))
+
+
+def test_maintain_database_skips_the_benchmark(card_db: CardDatabase):
+    report = maintain_database(card_db, benchmark_sample_size=0)
+    assert_that(report.lookup_latency_before, is_(empty()))
+    assert_that(report.lookup_latency_after, is_(empty()))
+
+
+def test_maintain_database_rejects_empty_and_immutable_databases(tmp_path: Path, card_db: CardDatabase):
+    empty_card_db = CardDatabase(tmp_path/"empty.sqlite3")
+    assert_that(calling(maintain_database).with_args(empty_card_db), raises(ValueError, "empty"))
+    empty_card_db.close()
+    snapshot_path = tmp_path/"snapshot.sqlite3"
+    card_db.create_snapshot(snapshot_path)
+    snapshot = CardDatabase(snapshot_path, immutable=True)
+    assert_that(calling(maintain_database).with_args(snapshot), raises(ValueError, "immutable"))
+    snapshot.close()
+
+
+def test_maintain_command(tmp_path: Path, run_command):
+    target_path = tmp_path/"copy.sqlite3"
+    # Changing the page size requires exclusive access, but the card_db fixture keeps the database open.
+    assert_that(
+        run_command("maintain", "--vacuum-into", str(target_path), "--benchmark-size", "5"), is_(equal_to(0)))
+    assert_that(target_path.exists(), is_(True))
+    assert_that(run_command("maintain", "--page-size", "1000"), is_(equal_to(1)))
@@ -0,0 +1,118 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from pathlib import Path
+import stat
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.card_db.refresh import refresh_database
+
+from tests.conftest import create_card_data, create_scryfall_card, write_card_data
+
+
+@pytest.fixture
+def refreshed_data_path(tmp_path: Path) -> Path:
+    """Card data containing an additional printing, compared to the card_db fixture."""
+    return write_card_data(
+        tmp_path/"refreshed.json", create_card_data() + [create_scryfall_card("Sol Ring", "m20", "300")])
+
+
+def _get_refresh_files(database_path: Path):
+    """Returns the leftover files of refreshes, excluding the live database and its journal files."""
+    return [path for path in database_path.parent.iterdir() if ".refresh" in path.name]
+
+
+def test_refresh_replaces_the_database_file(card_db: CardDatabase, refreshed_data_path: Path):
+    database_path = card_db.database_path
+    old_inode = database_path.stat().st_ino
+    statistics = refresh_database(database_path, refreshed_data_path)
+    assert_that(statistics.ingested_cards, is_(equal_to(len(create_card_data()) + 1)))
+    assert_that(database_path.stat().st_ino, is_not(equal_to(old_inode)))
+    assert_that(_get_refresh_files(database_path), is_(empty()))
+    new_card_db = CardDatabase(database_path)
+    assert_that(new_card_db.get_card_set_for_card_with_collector_number("Sol Ring", "300"), is_(equal_to("m20")))
+    assert_that(new_card_db.db.execute("PRAGMA journal_mode").fetchone()[0], is_(equal_to("delete")))
+    new_card_db.close()
+
+
+def test_open_database_keeps_reading_the_old_file_until_reopened(card_db: CardDatabase, refreshed_data_path: Path):
+    refresh_database(card_db.database_path, refreshed_data_path)
+    assert_that(
+        calling(card_db.get_card_set_for_card_with_collector_number).with_args("Sol Ring", "300"), raises(ValueError))
+    assert_that(card_db.reopen_if_replaced(), is_(True))
+    assert_that(card_db.get_card_set_for_card_with_collector_number("Sol Ring", "300"), is_(equal_to("m20")))
+    assert_that(card_db.reopen_if_replaced(), is_(False))
+
+
+def test_refresh_creates_a_missing_database(tmp_path: Path, card_data_path: Path):
+    database_path = tmp_path/"new"/"cards.sqlite3"
+    refresh_database(database_path, card_data_path)
+    assert_that(stat.S_IMODE(database_path.stat().st_mode), is_(equal_to(0o666 & ~_get_umask())))
+    card_db = CardDatabase(database_path)
+    assert_that(card_db.is_database_populated(), is_(True))
+    card_db.close()
+
+
+def _get_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def test_refresh_keeps_the_file_mode(card_db: CardDatabase, refreshed_data_path: Path):
+    os.chmod(str(card_db.database_path), 0o640)
+    refresh_database(card_db.database_path, refreshed_data_path)
+    assert_that(stat.S_IMODE(card_db.database_path.stat().st_mode), is_(equal_to(0o640)))
+
+
+def _assert_refresh_fails_and_keeps_the_live_database(card_db: CardDatabase, card_data_path: Path, **kwargs):
+    database_path = card_db.database_path
+    content = database_path.read_bytes()
+    assert_that(calling(refresh_database).with_args(database_path, card_data_path, **kwargs), raises(ValueError))
+    assert_that(database_path.read_bytes(), is_(equal_to(content)))
+    assert_that(_get_refresh_files(database_path), is_(empty()))
+    assert_that(card_db.reopen_if_replaced(), is_(False))
+
+
+def test_truncated_card_data_is_rejected(tmp_path: Path, card_db: CardDatabase):
+    card_data_path = tmp_path/"truncated.json"
+    card_data_path.write_text(write_card_data(tmp_path/"full.json", create_card_data()).read_text()[:-100])
+    _assert_refresh_fails_and_keeps_the_live_database(card_db, card_data_path)
+
+
+def test_card_data_with_too_few_rows_is_rejected(tmp_path: Path, card_db: CardDatabase):
+    card_data_path = write_card_data(tmp_path/"small.json", create_card_data()[:2])
+    _assert_refresh_fails_and_keeps_the_live_database(card_db, card_data_path)
+    # The check can be disabled
+    refresh_database(card_db.database_path, card_data_path, min_row_count_ratio=0)
+    assert_that(card_db.reopen_if_replaced(), is_(True))
+
+
+def test_empty_card_data_is_rejected(tmp_path: Path, card_db: CardDatabase):
+    card_data_path = write_card_data(tmp_path/"empty.json", [])
+    _assert_refresh_fails_and_keeps_the_live_database(card_db, card_data_path, min_row_count_ratio=0)
+
+
+def test_refresh_command(card_db: CardDatabase, refreshed_data_path: Path, tmp_path: Path, run_command):
+    assert_that(run_command("refresh", "--data-file", str(refreshed_data_path)), is_(equal_to(0)))
+    assert_that(card_db.reopen_if_replaced(), is_(True))
+    small_data_path = write_card_data(tmp_path/"small.json", create_card_data()[:2])
+    assert_that(run_command("refresh", "--data-file", str(small_data_path)), is_(equal_to(1)))
+    assert_that(
+        run_command("refresh", "--data-file", str(small_data_path), "--min-row-ratio", "0"), is_(equal_to(0)))
@@ -0,0 +1,73 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.model import Card, Deck
+
+
+@pytest.fixture
+def card_db_with_alias(card_db: CardDatabase) -> CardDatabase:
+    card_db.db.execute("INSERT INTO Set_Abbreviation_Alias (Alias, Abbreviation) VALUES ('core20', 'm20')")
+    card_db.db.commit()
+    return card_db
+
+
+@pytest.mark.parametrize("set_code, expected", [
+    ("m20", "m20"),
+    ("M20", "m20"),
+    ("core20", "m20"),
+    ("CORE20", "m20"),
+    ("unknown", None),
+    # Alias of a set not present in the database
+    ("1e", None),
+])
+def test_resolve_set_abbreviation(card_db_with_alias: CardDatabase, set_code: str, expected: str):
+    assert_that(card_db_with_alias.resolve_set_abbreviation(set_code), is_(equal_to(expected)))
+
+
+def test_deck_resolution_translates_aliases_and_ignores_unknown_sets(card_db_with_alias: CardDatabase):
+    deck = Deck()
+    deck.add_to_main_deck(Card("Lightning Bolt", "CORE20"))
+    # Unknown set codes fall back to a lookup by name
+    deck.add_to_main_deck(Card("Counterspell", "PROMO"))
+    deck.fill_missing_information(card_db_with_alias)
+    assert_that(deck.main_deck, contains_exactly(
+        has_properties(set_abbreviation="m20", collector_number=1),
+        has_properties(english_name="Counterspell", set_abbreviation=any_of("m20", "4bb")),
+    ))
+
+
+def test_set_codes_are_looked_up_once(card_db_with_alias: CardDatabase, monkeypatch):
+    looked_up_codes = []
+    is_set_abbreviation_known = card_db_with_alias.is_set_abbreviation_known
+    monkeypatch.setattr(
+        card_db_with_alias, "is_set_abbreviation_known",
+        lambda code: looked_up_codes.append(code) or is_set_abbreviation_known(code))
+    for _ in range(3):
+        card_db_with_alias.resolve_set_abbreviation("core20")
+        card_db_with_alias.resolve_set_abbreviation("M20")
+        card_db_with_alias.resolve_set_abbreviation("unknown")
+    assert_that(looked_up_codes, contains_exactly("m20", "unknown"))
+
+
+def test_population_clears_the_cached_set_codes(tmp_path, card_data_path):
+    card_db = CardDatabase(tmp_path/"empty.sqlite3")
+    assert_that(card_db.resolve_set_abbreviation("m20"), is_(none()))
+    card_db.populate_database(card_data_path)
+    assert_that(card_db.resolve_set_abbreviation("m20"), is_(equal_to("m20")))
+    card_db.close()
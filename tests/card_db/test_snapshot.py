@@ -0,0 +1,76 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from pathlib import Path
+import sqlite3
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.conversion import open_card_database
+
+
+@pytest.fixture
+def snapshot_path(tmp_path: Path, card_db: CardDatabase) -> Path:
+    snapshot_path = tmp_path/"snapshot.sqlite3"
+    card_db.create_snapshot(snapshot_path)
+    return snapshot_path
+
+
+def test_snapshot_is_analyzed_and_does_not_use_the_write_ahead_log(snapshot_path: Path):
+    connection = sqlite3.connect(str(snapshot_path))
+    try:
+        assert_that(connection.execute("PRAGMA journal_mode").fetchone()[0], is_(equal_to("delete")))
+        assert_that(connection.execute("SELECT count(*) FROM sqlite_stat1").fetchone()[0], is_(greater_than(0)))
+    finally:
+        connection.close()
+
+
+def test_snapshot_contains_the_card_data(snapshot_path: Path, card_db: CardDatabase):
+    snapshot = open_card_database(snapshot_path, immutable=True)
+    assert_that(snapshot.immutable, is_(True))
+    assert_that(snapshot.get_data_version(), is_(equal_to(card_db.get_data_version())))
+    assert_that(snapshot.get_english_name_for_card_in_card_set("m20", "1"), is_(equal_to("Lightning Bolt")))
+    assert_that(snapshot.resolve_set_abbreviation("ELD"), is_(equal_to("eld")))
+    snapshot.close()
+
+
+def test_immutable_database_is_never_written(snapshot_path: Path, card_data_path: Path):
+    content = snapshot_path.read_bytes()
+    snapshot = CardDatabase(snapshot_path, immutable=True)
+    assert_that(calling(snapshot.populate_database).with_args(card_data_path), raises(RuntimeError))
+    assert_that(calling(snapshot.db.execute).with_args("DELETE FROM Printing"), raises(sqlite3.OperationalError))
+    snapshot.close()
+    assert_that(snapshot_path.read_bytes(), is_(equal_to(content)))
+
+
+def test_snapshot_target_must_not_exist(snapshot_path: Path, card_db: CardDatabase):
+    assert_that(calling(card_db.create_snapshot).with_args(snapshot_path), raises(FileExistsError))
+
+
+def test_snapshot_of_empty_database_raises_value_error(tmp_path: Path):
+    card_db = CardDatabase(tmp_path/"empty.sqlite3")
+    assert_that(calling(card_db.create_snapshot).with_args(tmp_path/"snapshot.sqlite3"), raises(ValueError))
+    assert_that((tmp_path/"snapshot.sqlite3").exists(), is_(False))
+    card_db.close()
+
+
+def test_snapshot_command(tmp_path: Path, run_command):
+    snapshot_path = tmp_path/"snapshot.sqlite3"
+    assert_that(run_command("snapshot", str(snapshot_path)), is_(equal_to(0)))
+    snapshot = CardDatabase(snapshot_path, immutable=True)
+    assert_that(snapshot.is_database_populated(), is_(True))
+    snapshot.close()
@@ -0,0 +1,120 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from pathlib import Path
+import sqlite3
+
+from hamcrest import *
+
+from MTGDeckConverter.card_db.db import CardDatabase, ENGLISH
+from MTGDeckConverter.card_db.updater import update_database_schema
+
+# Schema of version 0.0.4, the oldest version with migration patches
+SCHEMA_0_0_4 = Path(__file__).parent/"data"/"database_schema_0.0.4.sql"
+
+
+def _create_database_0_0_4(database_path: Path, populate: bool = True):
+    connection = sqlite3.connect(str(database_path))
+    connection.executescript(SCHEMA_0_0_4.read_text(encoding="utf-8"))
+    if populate:
+        connection.executescript("""
+            INSERT INTO Card_Set (Set_ID, English_Name, Abbreviation, Release_date) VALUES
+              (1, 'Core Set 2020', 'm20', '2019-07-12');
+            INSERT INTO Card (Card_ID, English_Name, Card_Type, Scryfall_Oracle_ID) VALUES
+              (1, 'Lightning Bolt', 'Instant', '4457ed35-7c10-48c8-9776-456485fdf070');
+            INSERT INTO Printing (Printing_ID, Card_ID, Set_ID, Collector_Number, Rarity_ID, Scryfall_Card_ID) VALUES
+              (1, 1, 1, 1, 2, '77c6fa74-5543-42ac-9ead-0e890b188e99');
+        """)
+    connection.commit()
+    connection.close()
+
+
+def _open_and_update(database_path: Path) -> CardDatabase:
+    card_db = CardDatabase(database_path, do_validate_schema=False)
+    update_database_schema(card_db)
+    return card_db
+
+
+def test_migration_from_0_0_4_keeps_the_card_data(tmp_path: Path):
+    database_path = tmp_path/"cards.sqlite3"
+    _create_database_0_0_4(database_path)
+    card_db = _open_and_update(database_path)
+    assert_that(card_db.get_current_schema_version(), is_(equal_to(card_db.COMPATIBLE_SCHEMA_VERSIONS.inclusive_min)))
+    assert_that(card_db.get_card_set_and_number_for_name("Lightning Bolt"), is_(equal_to(("m20", 1))))
+    assert_that(card_db.get_english_name_for_card_in_card_set("M20", "1"), is_(equal_to("Lightning Bolt")))
+    assert_that(
+        card_db.get_scryfall_id_for_printing("m20", "1"), is_(equal_to("77c6fa74-5543-42ac-9ead-0e890b188e99")))
+    # Existing printings are English printings
+    assert_that([row[0] for row in card_db.db.execute("SELECT Language FROM Printing")], contains_exactly(ENGLISH))
+    assert_that(card_db.resolve_set_abbreviation("M20"), is_(equal_to("m20")))
+    card_db.close()
+
+
+def test_migration_from_0_0_4_stamps_a_data_version_on_populated_databases(tmp_path: Path):
+    _create_database_0_0_4(tmp_path/"populated.sqlite3")
+    _create_database_0_0_4(tmp_path/"empty.sqlite3", populate=False)
+    populated_card_db = _open_and_update(tmp_path/"populated.sqlite3")
+    empty_card_db = _open_and_update(tmp_path/"empty.sqlite3")
+    assert_that(populated_card_db.get_data_version(), matches_regexp(r"^[0-9a-f]{32}$"))
+    assert_that(empty_card_db.get_data_version(), is_(none()))
+    populated_card_db.close()
+    empty_card_db.close()
+
+
+def test_migrated_schema_matches_the_new_schema(tmp_path: Path):
+    _create_database_0_0_4(tmp_path/"migrated.sqlite3", populate=False)
+    migrated_card_db = _open_and_update(tmp_path/"migrated.sqlite3")
+    new_card_db = CardDatabase(tmp_path/"new.sqlite3")
+
+    def get_schema(card_db: CardDatabase):
+        """
+        Returns the columns of all tables and views and the indexed columns of all indexes. Columns added by a
+        migration are appended to the table, so table columns are compared regardless of their position.
+        """
+        schema = {}
+        for row in card_db.db.execute("SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"):
+            if row["type"] == "index":
+                schema[row["name"]] = [
+                    column["name"] for column in card_db.db.execute(f'PRAGMA index_info("{row["name"]}")')]
+            else:
+                schema[row["name"]] = sorted(
+                    (column["name"], column["type"], column["notnull"], column["dflt_value"], column["pk"])
+                    for column in card_db.db.execute(f'PRAGMA table_info("{row["name"]}")')
+                )
+        return schema
+    assert_that(get_schema(migrated_card_db), is_(equal_to(get_schema(new_card_db))))
+    view_definitions = "SELECT name, sql FROM sqlite_master WHERE type = 'view' ORDER BY name"
+    assert_that(
+        [tuple(row) for row in migrated_card_db.db.execute(view_definitions)],
+        is_(equal_to([tuple(row) for row in new_card_db.db.execute(view_definitions)])))
+    assert_that(
+        migrated_card_db.db.execute("SELECT count(*) FROM Set_Abbreviation_Alias").fetchone(),
+        is_(equal_to(new_card_db.db.execute("SELECT count(*) FROM Set_Abbreviation_Alias").fetchone())))
+    migrated_card_db.close()
+    new_card_db.close()
+
+
+def test_update_of_current_schema_applies_no_patches(card_db: CardDatabase):
+    version = card_db.get_current_schema_version()
+    update_database_schema(card_db)
+    assert_that(card_db.get_current_schema_version(), is_(equal_to(version)))
+
+
+def test_newer_schema_version_raises_connection_aborted_error(tmp_path: Path):
+    card_db = CardDatabase(tmp_path/"cards.sqlite3")
+    card_db.db.execute(f"PRAGMA user_version({card_db.COMPATIBLE_SCHEMA_VERSIONS.exclusive_max})")
+    card_db.db.commit()
+    card_db.close()
+    assert_that(calling(CardDatabase).with_args(tmp_path/"cards.sqlite3"), raises(ConnectionAbortedError))
@@ -0,0 +1,111 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from pathlib import Path
+import sys
+import typing
+import uuid
+
+import pytest
+
+from MTGDeckConverter.argument_parser import parse_args
+from MTGDeckConverter.card_db.db import CardDatabase
+import MTGDeckConverter.constants
+import MTGDeckConverter.MTGDeckConverter
+
+_SETS = {
+    "eld": ("Throne of Eldraine", "2019-10-04", "expansion"),
+    "m20": ("Core Set 2020", "2019-07-12", "core"),
+    "teld": ("Throne of Eldraine Tokens", "2019-10-04", "token"),
+    "4bb": ("Fourth Edition Foreign Black Border", "1995-04-01", "core"),
+}
+
+
+def create_scryfall_card(
+        name: str, set_abbreviation: str, collector_number: str, language: str = "en",
+        printed_name: typing.Optional[str] = None, **fields) -> typing.Dict[str, typing.Any]:
+    """Returns a minimal Scryfall card object, as contained in the bulk data files."""
+    set_name, release_date, set_type = _SETS[set_abbreviation]
+    card = {
+        "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{set_abbreviation}/{collector_number}/{language}")),
+        "oracle_id": str(uuid.uuid5(uuid.NAMESPACE_URL, name)),
+        "name": name,
+        "lang": language,
+        "type_line": "Token Creature — Goblin" if set_type == "token" else "Instant",
+        "rarity": "common",
+        "set": set_abbreviation,
+        "set_name": set_name,
+        "set_type": set_type,
+        "released_at": release_date,
+        "collector_number": collector_number,
+        "layout": "token" if set_type == "token" else "normal",
+        "digital": False,
+        "games": ["paper"],
+        "oversized": False,
+    }
+    if printed_name is not None:
+        card["printed_name"] = printed_name
+    card.update(fields)
+    return card
+
+
+def create_card_data() -> typing.List[typing.Dict[str, typing.Any]]:
+    return [
+        create_scryfall_card("Lightning Bolt", "m20", "1"),
+        create_scryfall_card("Counterspell", "m20", "2"),
+        create_scryfall_card("Island", "m20", "264"),
+        create_scryfall_card("Sol Ring", "eld", "1"),
+        create_scryfall_card("Llanowar Elves", "eld", "2"),
+        create_scryfall_card("Command Tower", "eld", "3"),
+        create_scryfall_card("Ach! Hans, Run!", "eld", "4"),
+        create_scryfall_card("Island", "eld", "254"),
+        create_scryfall_card("Lightning Bolt", "eld", "5", "fr", "Foudre"),
+        create_scryfall_card("Lightning Bolt", "eld", "5"),
+        # Only printed in French
+        create_scryfall_card("Counterspell", "4bb", "208", "fr", "Contresort"),
+        create_scryfall_card("Goblin", "teld", "1"),
+    ]
+
+
+def write_card_data(path: Path, cards: typing.List[typing.Dict[str, typing.Any]]) -> Path:
+    path.write_text(json.dumps(cards), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def card_data_path(tmp_path: Path) -> Path:
+    """A Scryfall bulk data file containing the cards returned by create_card_data()."""
+    return write_card_data(tmp_path/"card_data.json", create_card_data())
+
+
+@pytest.fixture
+def card_db(tmp_path: Path, card_data_path: Path) -> typing.Generator[CardDatabase, None, None]:
+    """A card database populated with the cards returned by create_card_data()."""
+    card_db = CardDatabase(tmp_path/"cards.sqlite3")
+    card_db.populate_database(card_data_path)
+    yield card_db
+    card_db.close()
+
+
+@pytest.fixture
+def run_command(monkeypatch, card_db: CardDatabase) -> typing.Callable[..., int]:
+    """Runs the command given by the command line arguments using the card_db fixture and returns the exit code."""
+    def run(*arguments: str) -> int:
+        monkeypatch.setattr(
+            sys, "argv", [MTGDeckConverter.constants.PROGRAMNAME, "--database", str(card_db.database_path), *arguments])
+        args = parse_args()
+        return MTGDeckConverter.MTGDeckConverter._COMMANDS[args.command](args)
+    return run
@@ -0,0 +1,91 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import io
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.input_parser.xmage import parse_deck
+from MTGDeckConverter.model import Card
+
+
+def _parse(content: str):
+    return parse_deck(io.StringIO(content))
+
+
+def test_parses_main_deck_and_sideboard():
+    deck = _parse(
+        "2 [M20:1] Lightning Bolt\n"
+        "SB: 1 [ELD:254] Island\n"
+    )
+    assert_that(deck.main_deck, contains_exactly(*[Card("Lightning Bolt", "m20", "1")] * 2))
+    assert_that(deck.side_board, contains_exactly(Card("Island", "eld", "254")))
+    assert_that(deck.commanders, is_(empty()))
+
+
+def test_copies_of_a_card_share_a_single_object():
+    deck = _parse("3 [M20:1] Lightning Bolt\n")
+    assert_that(deck.main_deck, has_length(3))
+    assert_that(deck.main_deck[1], is_(same_instance(deck.main_deck[0])))
+    assert_that(deck.main_deck[2], is_(same_instance(deck.main_deck[0])))
+
+
+def test_parses_the_deck_name():
+    deck = _parse("NAME:Burn\n1 [M20:1] Lightning Bolt\n")
+    assert_that(deck.name, is_(equal_to("Burn")))
+
+
+@pytest.mark.parametrize("line", [
+    "",
+    "   ",
+    "LAYOUT MAIN:(1,1)(NONE,false,50)|([M20:1])",
+    "LAYOUT SIDEBOARD:(1,1)(NONE,false,50)|([ELD:254])",
+])
+def test_skips_empty_and_layout_lines(line: str):
+    deck = _parse(f"1 [M20:1] Lightning Bolt\n{line}\n")
+    assert_that(deck.main_deck, has_length(1))
+    assert_that(deck.side_board, is_(empty()))
+
+
+def test_keeps_card_names_containing_brackets_and_commas():
+    deck = _parse('1 [UNH:6] "Ach! Hans, Run!"\n1 [PLST:A] Card [With] Brackets\n')
+    assert_that(deck.main_deck, contains_exactly(
+        Card('"Ach! Hans, Run!"', "unh", "6"), Card("Card [With] Brackets", "plst", "A")))
+
+
+def test_accepts_windows_line_endings():
+    deck = _parse("NAME:Burn\r\n1 [M20:1] Lightning Bolt\r\n")
+    assert_that(deck.name, is_(equal_to("Burn")))
+    assert_that(deck.main_deck, contains_exactly(Card("Lightning Bolt", "m20", "1")))
+
+
+@pytest.mark.parametrize("line", [
+    "Lightning Bolt",
+    "1 Lightning Bolt",
+    "x [M20:1] Lightning Bolt",
+    "1 [M20:1]",
+    "SB 1 [M20:1] Lightning Bolt",
+])
+def test_invalid_line_raises_value_error(line: str):
+    assert_that(calling(_parse).with_args(f"{line}\n"), raises(ValueError))
+
+
+def test_parses_path(tmp_path):
+    deck_path = tmp_path/"deck.dck"
+    deck_path.write_text("NAME:Burn\n4 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    deck = parse_deck(deck_path)
+    assert_that(deck.name, is_(equal_to("Burn")))
+    assert_that(deck.main_deck, has_length(4))
@@ -0,0 +1,109 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import io
+
+from hamcrest import *
+
+from MTGDeckConverter.model import Card, Deck
+from MTGDeckConverter.output_writer.xmage import write_deck_file
+
+
+def _write(deck: Deck) -> str:
+    output = io.StringIO()
+    write_deck_file(deck, output)
+    return output.getvalue()
+
+
+def _card(english_name: str, set_abbreviation: str = "eld", collector_number: str = "1") -> Card:
+    return Card(english_name, set_abbreviation, collector_number)
+
+
+def test_identical_printings_are_aggregated_in_order_of_first_appearance():
+    deck = Deck()
+    island = _card("Island", "eld", "254")
+    for card in (island, _card("Lightning Bolt", "m20", "1"), island, _card("Island", "eld", "254")):
+        deck.add_to_main_deck(card)
+    deck.add_to_side_board(_card("Counterspell", "m20", "2"))
+    assert_that(_write(deck), is_(equal_to(
+        "3 [ELD:254] Island\n"
+        "1 [M20:1] Lightning Bolt\n"
+        "SB: 1 [M20:2] Counterspell\n"
+    )))
+
+
+def test_different_printings_of_a_card_are_written_separately():
+    deck = Deck()
+    deck.add_to_main_deck(_card("Island", "eld", "254"))
+    deck.add_to_main_deck(_card("Island", "eld", "255"))
+    deck.add_to_main_deck(_card("Island", "m20", "254"))
+    assert_that(_write(deck).splitlines(), contains_exactly(
+        "1 [ELD:254] Island", "1 [ELD:255] Island", "1 [M20:254] Island"))
+
+
+def test_commander_is_written_to_the_sideboard():
+    deck = Deck()
+    deck.add_to_main_deck(_card("Sol Ring"))
+    deck.add_to_main_deck(_card("Command Tower", "eld", "2"), is_commander=True)
+    assert_that(_write(deck), is_(equal_to(
+        "1 [ELD:1] Sol Ring\n"
+        "SB: 1 [ELD:2] Command Tower\n"
+    )))
+
+
+def test_regular_copy_of_the_commander_printing_stays_in_the_main_deck():
+    deck = Deck()
+    deck.add_to_main_deck(_card("Llanowar Elves"), is_commander=True)
+    deck.add_to_main_deck(_card("Llanowar Elves"))
+    assert_that(_write(deck), is_(equal_to(
+        "1 [ELD:1] Llanowar Elves\n"
+        "SB: 1 [ELD:1] Llanowar Elves\n"
+    )))
+
+
+def test_commander_deck_drops_the_sideboard():
+    deck = Deck()
+    deck.add_to_main_deck(_card("Llanowar Elves"), is_commander=True)
+    deck.add_to_side_board(_card("Island", "eld", "254"))
+    assert_that(_write(deck), is_(equal_to("SB: 1 [ELD:1] Llanowar Elves\n")))
+
+
+def test_empty_sideboard_writes_no_sideboard_lines():
+    deck = Deck()
+    deck.add_to_main_deck(_card("Sol Ring"))
+    assert_that(_write(deck), is_(equal_to("1 [ELD:1] Sol Ring\n")))
+
+
+def test_empty_deck_writes_an_empty_file():
+    assert_that(_write(Deck()), is_(equal_to("")))
+
+
+def test_named_deck_starts_with_the_name_header():
+    deck = Deck("Burn")
+    deck.add_to_main_deck(_card("Lightning Bolt"))
+    deck.add_to_side_board(_card("Counterspell", "eld", "2"))
+    assert_that(_write(deck), is_(equal_to(
+        "NAME:Burn\n"
+        "1 [ELD:1] Lightning Bolt\n"
+        "SB: 1 [ELD:2] Counterspell\n"
+    )))
+
+
+def test_writes_to_path(tmp_path):
+    deck = Deck("Burn")
+    deck.add_to_main_deck(_card("Lightning Bolt"))
+    output_path = tmp_path/"deck.dck"
+    write_deck_file(deck, output_path)
+    assert_that(output_path.read_text(encoding="utf-8"), is_(equal_to("NAME:Burn\n1 [ELD:1] Lightning Bolt\n")))
@@ -0,0 +1,104 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from pathlib import Path
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.model import Card, Deck
+
+numpy = pytest.importorskip("numpy")
+from MTGDeckConverter.analytics import CardDataArrays, DeckCorpus, EncodedDeck
+
+
+@pytest.fixture
+def card_data(card_db: CardDatabase) -> CardDataArrays:
+    return CardDataArrays(card_db)
+
+
+def _create_deck(main_deck, side_board=()) -> Deck:
+    deck = Deck()
+    for card, quantity in main_deck:
+        deck.main_deck += [card] * quantity
+    for card, quantity in side_board:
+        deck.side_board += [card] * quantity
+    return deck
+
+
+@pytest.fixture
+def corpus(card_data: CardDataArrays) -> DeckCorpus:
+    corpus = DeckCorpus(card_data)
+    corpus.add_deck(_create_deck(
+        [
+            (Card("Lightning Bolt", "m20", "1"), 4), (Card("Island", "m20", "264"), 20),
+            (Card("Sol Ring", "eld", "1"), 1),
+        ],
+        [(Card("Counterspell", "m20", "2"), 3)],
+    ))
+    corpus.add_deck(_create_deck(
+        [
+            (Card("Lightning Bolt", "m20", "1"), 2), (Card("Counterspell", "m20", "2"), 4),
+            (Card("Goblin", "teld", "1"), 1),
+        ]
+    ))
+    return corpus
+
+
+def test_encoded_deck_merges_identical_printings_and_skips_unknown_ones(card_data: CardDataArrays):
+    bolt = Card("Lightning Bolt", "m20", "1")
+    deck = _create_deck([(bolt, 2), (Card("Lightning Bolt", "M20", "1"), 1), (Card("Unknown Card", "xxx", "1"), 1)])
+    deck.side_board.append(bolt)
+    encoded_deck = EncodedDeck.from_deck(deck, card_data)
+    bolt_id = card_data.get_printing_id(bolt)
+    assert_that(encoded_deck.printing_ids.tolist(), contains_exactly(bolt_id, bolt_id))
+    assert_that(encoded_deck.quantities.tolist(), contains_exactly(3, 1))
+    assert_that(encoded_deck.boards.tolist(), contains_exactly(0, 1))
+
+
+def test_printings_are_exported_once_per_set_and_collector_number(card_data: CardDataArrays, card_db: CardDatabase):
+    # The English printing is preferred over the French one, the French only printing is still included.
+    english_id, _ = card_db.get_printing_and_card_id("eld", "5")
+    assert_that(card_data.get_printing_id(Card("Lightning Bolt", "eld", "5")), is_(equal_to(english_id)))
+    assert_that(card_data.get_printing_id(Card("Counterspell", "4bb", "208")), is_(not_none()))
+    assert_that(card_data.get_printing_id(Card("Unknown Card")), is_(none()))
+
+
+def test_card_type_distribution(corpus: DeckCorpus):
+    assert_that(corpus.card_type_distribution(), is_(equal_to({"Instant": 31, "Token Creature": 1})))
+    assert_that(corpus.card_type_distribution(("side",)), is_(equal_to({"Instant": 3})))
+
+
+def test_rarity_mix(corpus: DeckCorpus):
+    assert_that(corpus.rarity_mix(("main", "side")), is_(equal_to({"Common": 15, "Land": 20})))
+
+
+def test_most_played_cards_per_set(corpus: DeckCorpus):
+    assert_that(corpus.most_played_cards_per_set(top=2), is_(equal_to({
+        "m20": [("Island", 20), ("Lightning Bolt", 6)],
+        "eld": [("Sol Ring", 1)],
+        "teld": [("Goblin", 1)],
+    })))
+
+
+def test_save_and_load(tmp_path: Path, corpus: DeckCorpus, card_data: CardDataArrays):
+    corpus_path = tmp_path/"corpus.npz"
+    corpus.save(corpus_path)
+    loaded_corpus = DeckCorpus.load(corpus_path, card_data)
+    assert_that(loaded_corpus.deck_count, is_(equal_to(2)))
+    assert_that(loaded_corpus.rarity_mix(), is_(equal_to(corpus.rarity_mix())))
+    loaded_corpus.add_deck(_create_deck([(Card("Sol Ring", "eld", "1"), 1)]))
+    assert_that(loaded_corpus.most_played_cards_per_set()["eld"], is_(equal_to([("Sol Ring", 2)])))
@@ -0,0 +1,122 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from pathlib import Path
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.cache import ConversionCache
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.conversion import convert_deck_file_to_formats
+
+
+def _set_last_use(cache: ConversionCache, key: str, timestamp: int):
+    os.utime(str(cache.cache_dir/(key + ".cached")), (timestamp, timestamp))
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> ConversionCache:
+    return ConversionCache(tmp_path/"cache", max_size=100)
+
+
+@pytest.mark.parametrize("changed_part", range(4))
+def test_key_depends_on_all_parts(changed_part: int):
+    parts = [b"deck", "xmage", "xmage", "version"]
+    key = ConversionCache.get_key(*parts)
+    parts[changed_part] = b"other" if changed_part == 0 else "other"
+    assert_that(ConversionCache.get_key(*parts), is_not(equal_to(key)))
+
+
+def test_key_parts_are_separated():
+    assert_that(
+        ConversionCache.get_key(b"deck", "ab", "c", "version"),
+        is_not(equal_to(ConversionCache.get_key(b"deck", "a", "bc", "version"))))
+
+
+def test_get_returns_stored_data(cache: ConversionCache):
+    assert_that(cache.get("key"), is_(none()))
+    cache.put("key", b"data")
+    assert_that(cache.get("key"), is_(equal_to(b"data")))
+
+
+def test_put_replaces_existing_entry(cache: ConversionCache):
+    cache.put("key", b"0" * 40)
+    cache.put("key", b"1" * 30)
+    assert_that(cache.get("key"), is_(equal_to(b"1" * 30)))
+    assert_that(cache.current_size, is_(equal_to(30)))
+
+
+def test_size_is_restored_when_reopened(cache: ConversionCache):
+    cache.put("a", b"0" * 40)
+    cache.put("b", b"0" * 20)
+    assert_that(ConversionCache(cache.cache_dir, 100).current_size, is_(equal_to(60)))
+
+
+def test_eviction_deletes_least_recently_used_entries(cache: ConversionCache):
+    for timestamp, key in enumerate("abc", start=1000):
+        cache.put(key, b"0" * 40)
+        _set_last_use(cache, key, timestamp)
+    # Storing c exceeded the maximum size, so a as the oldest entry was evicted.
+    assert_that(cache.get("a"), is_(none()))
+    assert_that(cache.current_size, is_(equal_to(80)))
+    # Reading b marks it as recently used, so storing d evicts c instead.
+    assert_that(cache.get("b"), is_(not_none()))
+    cache.put("d", b"0" * 40)
+    assert_that(cache.get("c"), is_(none()))
+    assert_that(cache.get("b"), is_(not_none()))
+    assert_that(cache.get("d"), is_(not_none()))
+    assert_that(cache.current_size, is_(equal_to(80)))
+
+
+def test_entry_larger_than_the_maximum_size_is_evicted(cache: ConversionCache):
+    cache.put("key", b"0" * 101)
+    assert_that(cache.get("key"), is_(none()))
+    assert_that(cache.current_size, is_(equal_to(0)))
+
+
+def test_conversion_uses_cached_result(tmp_path: Path, card_db: CardDatabase, cache: ConversionCache):
+    cache.max_size = ConversionCache.DEFAULT_MAX_SIZE
+    input_path = tmp_path/"deck.dck"
+    input_path.write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    output_path = tmp_path/"converted.dck"
+    convert_deck_file_to_formats(card_db, input_path, {"xmage": output_path}, cache=cache)
+    assert_that(output_path.read_text(encoding="utf-8"), is_(equal_to("1 [M20:1] Lightning Bolt\n")))
+    key = ConversionCache.get_key(input_path.read_bytes(), "auto", "xmage", card_db.get_data_version())
+    cache.put(key, b"cached result")
+    convert_deck_file_to_formats(card_db, input_path, {"xmage": output_path}, cache=cache)
+    assert_that(output_path.read_bytes(), is_(equal_to(b"cached result")))
+
+
+def test_conversion_parses_the_given_input_data(tmp_path: Path, card_db: CardDatabase, cache: ConversionCache):
+    cache.max_size = ConversionCache.DEFAULT_MAX_SIZE
+    input_path = tmp_path/"deck.dck"
+    input_path.write_text("1 [M20:2] Counterspell\n", encoding="utf-8")
+    input_data = b"1 [M20:1] Lightning Bolt\n"
+    output_path = tmp_path/"converted.dck"
+    convert_deck_file_to_formats(card_db, input_path, {"xmage": output_path}, cache=cache, input_data=input_data)
+    expected = b"1 [M20:1] Lightning Bolt\n"
+    assert_that(output_path.read_bytes(), is_(equal_to(expected)))
+    key = ConversionCache.get_key(input_data, "auto", "xmage", card_db.get_data_version())
+    assert_that(cache.get(key), is_(equal_to(expected)))
+
+
+def test_conversion_skips_cache_without_data_version(tmp_path: Path, card_db: CardDatabase, cache: ConversionCache):
+    card_db.db.execute("DELETE FROM Database_Metadata")
+    input_path = tmp_path/"deck.dck"
+    input_path.write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    convert_deck_file_to_formats(card_db, input_path, {"xmage": tmp_path/"converted.dck"}, cache=cache)
+    assert_that(list(cache.cache_dir.iterdir()), is_(empty()))
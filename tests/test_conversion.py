@@ -0,0 +1,125 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from pathlib import Path
+import sys
+import types
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+import MTGDeckConverter.conversion
+from MTGDeckConverter.conversion import convert_deck_file_to_formats, get_output_paths
+import MTGDeckConverter.formats
+from MTGDeckConverter.formats import open_deck_target, output_formats
+
+
+def _write_card_names(deck, target):
+    with open_deck_target(target) as output_file:
+        output_file.write("".join(f"{card.english_name}\n" for card in deck.main_deck))
+
+
+def _fail(deck, target):
+    raise ValueError("Writer failed")
+
+
+@pytest.fixture
+def output_plugins(monkeypatch):
+    """Registers the output format plugins "names", writing the card names, and "broken", which always fails."""
+    plugins = {"names": _write_card_names, "broken": _fail}
+    for name, write_deck_file in plugins.items():
+        module = types.ModuleType(f"mtg_deck_converter_test_{name}")
+        module.write_deck_file = write_deck_file
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+    monkeypatch.setattr(
+        MTGDeckConverter.formats, "_iter_entry_points",
+        lambda group: iter([(name, f"mtg_deck_converter_test_{name}") for name in plugins])
+        if group == MTGDeckConverter.formats.OUTPUT_FORMAT_ENTRY_POINT_GROUP else iter([])
+    )
+    output_formats.cache_clear()
+    yield
+    output_formats.cache_clear()
+
+
+@pytest.fixture
+def deck_path(tmp_path: Path) -> Path:
+    deck_path = tmp_path/"deck.csv"
+    deck_path.write_text(
+        "Board,Qty,Name,Printing,Foil,Alter,Signed,Condition,Language,Commander\r\n"
+        "main,2,Lightning Bolt,M20,,,,,,False\r\n", encoding="utf-8")
+    return deck_path
+
+
+def test_output_paths_are_next_to_the_input_by_default(tmp_path: Path):
+    assert_that(get_output_paths(tmp_path/"deck.csv", ["xmage"]), is_(equal_to({"xmage": tmp_path/"deck.dck"})))
+    output_dir = tmp_path/"out"
+    assert_that(
+        get_output_paths(tmp_path/"deck.csv", ["xmage"], output_dir), is_(equal_to({"xmage": output_dir/"deck.dck"})))
+
+
+def test_output_overwriting_the_input_is_skipped(tmp_path: Path):
+    assert_that(get_output_paths(tmp_path/"deck.dck", ["xmage"]), is_(empty()))
+
+
+def test_output_formats_writing_the_same_file_raise_value_error(tmp_path: Path, output_plugins):
+    assert_that(
+        calling(get_output_paths).with_args(tmp_path/"deck.csv", ["names", "broken"]),
+        raises(ValueError, "same file"))
+
+
+def test_deck_is_parsed_once_for_all_formats(tmp_path: Path, card_db: CardDatabase, deck_path: Path, output_plugins,
+                                             monkeypatch):
+    parsed_sources = []
+    parse_deck = MTGDeckConverter.formats.parse_deck
+    monkeypatch.setattr(
+        MTGDeckConverter.formats, "parse_deck",
+        lambda source, *args: parsed_sources.append(source) or parse_deck(source, *args))
+    output_paths = {"xmage": tmp_path/"deck.dck", "names": tmp_path/"deck.txt"}
+    convert_deck_file_to_formats(card_db, deck_path, output_paths)
+    assert_that(parsed_sources, has_length(1))
+    assert_that(output_paths["xmage"].read_text(encoding="utf-8"), is_(equal_to("2 [M20:1] Lightning Bolt\n")))
+    assert_that(output_paths["names"].read_text(encoding="utf-8"), is_(equal_to("Lightning Bolt\nLightning Bolt\n")))
+
+
+def test_writer_errors_are_raised(tmp_path: Path, card_db: CardDatabase, deck_path: Path, output_plugins):
+    output_paths = {"xmage": tmp_path/"deck.dck", "broken": tmp_path/"deck.txt"}
+    assert_that(
+        calling(convert_deck_file_to_formats).with_args(card_db, deck_path, output_paths),
+        raises(ValueError, "Writer failed"))
+    # The other writers still finish
+    assert_that(output_paths["xmage"].exists(), is_(True))
+
+
+def test_convert_command_writes_all_formats(tmp_path: Path, deck_path: Path, output_plugins, run_command):
+    output_dir = tmp_path/"out"
+    output_dir.mkdir()
+    exit_code = run_command(
+        "convert", "-o", "xmage", "-o", "names", "--output-dir", str(output_dir), str(deck_path))
+    assert_that(exit_code, is_(equal_to(0)))
+    assert_that(sorted(path.name for path in output_dir.iterdir()), contains_exactly("deck", "deck.dck"))
+
+
+def test_convert_command_creates_the_output_directory(tmp_path: Path, deck_path: Path, run_command):
+    output_dir = tmp_path/"out"/"xmage"
+    assert_that(run_command("convert", "--output-dir", str(output_dir), str(deck_path)), is_(equal_to(0)))
+    assert_that((output_dir/"deck.dck").read_text(encoding="utf-8"), is_(equal_to("2 [M20:1] Lightning Bolt\n")))
+
+
+def test_convert_command_fails_if_the_output_directory_can_not_be_created(
+        tmp_path: Path, deck_path: Path, run_command):
+    output_dir = tmp_path/"out"
+    output_dir.write_text("Not a directory", encoding="utf-8")
+    assert_that(run_command("convert", "--output-dir", str(output_dir), str(deck_path)), is_(equal_to(1)))
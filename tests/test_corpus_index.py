@@ -0,0 +1,140 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from pathlib import Path
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase, DATA_VERSION_KEY
+from MTGDeckConverter.corpus_index import CorpusIndex, IndexUpdateStatistics
+
+BURN = "2 [M20:1] Lightning Bolt\n1 [ELD:1] Sol Ring\nSB: 1 [M20:2] Counterspell\n"
+CONTROL = "4 [M20:2] Counterspell\n1 [ELD:5] Lightning Bolt\n20 [M20:264] Island\n"
+RAMP = "1 [ELD:1] Sol Ring\n1 [ELD:2] Llanowar Elves\n1 [XXX:1] Unknown Card\n"
+
+
+@pytest.fixture
+def deck_dir(tmp_path: Path) -> Path:
+    deck_dir = tmp_path/"decks"
+    deck_dir.mkdir()
+    (deck_dir/"burn.dck").write_text(BURN, encoding="utf-8")
+    (deck_dir/"control.dck").write_text(CONTROL, encoding="utf-8")
+    (deck_dir/"ramp.dck").write_text(RAMP, encoding="utf-8")
+    return deck_dir.resolve()
+
+
+@pytest.fixture
+def index(tmp_path: Path, card_db: CardDatabase) -> CorpusIndex:
+    index = CorpusIndex(tmp_path/"index"/"corpus.sqlite3", card_db)
+    yield index
+    index.close()
+
+
+def test_update_indexes_all_deck_files(index: CorpusIndex, deck_dir: Path):
+    statistics = index.update_directory(deck_dir, "*.dck")
+    assert_that(statistics, is_(equal_to(IndexUpdateStatistics(3, 0, 0, 0, 0))))
+    assert_that(index.get_deck_count(), is_(equal_to(3)))
+    assert_that(
+        index.db.execute("SELECT Unresolved_Card_Count FROM Indexed_Deck WHERE Path LIKE '%ramp.dck'").fetchone()[0],
+        is_(equal_to(1)))
+
+
+def test_find_decks_containing_matches_any_printing(index: CorpusIndex, deck_dir: Path):
+    index.update_directory(deck_dir)
+    assert_that(
+        index.find_decks_containing(["Lightning Bolt"]),
+        contains_exactly(deck_dir/"burn.dck", deck_dir/"control.dck"))
+    assert_that(index.find_decks_containing(["Lightning Bolt", "Sol Ring"]), contains_exactly(deck_dir/"burn.dck"))
+    assert_that(index.find_decks_containing(["Counterspell"], ["side"]), contains_exactly(deck_dir/"burn.dck"))
+    assert_that(index.find_decks_containing([]), is_(empty()))
+
+
+def test_find_decks_containing_raises_for_unknown_card_names(index: CorpusIndex, deck_dir: Path):
+    index.update_directory(deck_dir)
+    assert_that(calling(index.find_decks_containing).with_args(["Unknown Card"]), raises(ValueError))
+
+
+def test_find_co_occurring_cards(index: CorpusIndex, deck_dir: Path):
+    index.update_directory(deck_dir)
+    co_occurring_cards = index.find_co_occurring_cards("Lightning Bolt")
+    # Ties are ordered by the internal Card_ID
+    assert_that(co_occurring_cards[0], is_(equal_to(("Counterspell", 2))))
+    assert_that(co_occurring_cards, contains_inanyorder(("Counterspell", 2), ("Sol Ring", 1), ("Island", 1)))
+    assert_that(index.find_co_occurring_cards("Lightning Bolt", top=1), contains_exactly(("Counterspell", 2)))
+    assert_that(index.find_co_occurring_cards("Sol Ring", boards=["main"]), contains_inanyorder(
+        ("Lightning Bolt", 1), ("Llanowar Elves", 1)))
+
+
+def test_update_only_reads_new_and_changed_files(index: CorpusIndex, deck_dir: Path):
+    index.update_directory(deck_dir)
+    (deck_dir/"burn.dck").write_text(BURN + "1 [M20:264] Island\n", encoding="utf-8")
+    (deck_dir/"control.dck").unlink()
+    (deck_dir/"tempo.dck").write_text(BURN, encoding="utf-8")
+    statistics = index.update_directory(deck_dir)
+    assert_that(statistics, is_(equal_to(IndexUpdateStatistics(1, 1, 1, 1, 0))))
+    assert_that(index.find_decks_containing(["Island"]), contains_exactly(deck_dir/"burn.dck"))
+    assert_that(index.update_directory(deck_dir), is_(equal_to(IndexUpdateStatistics(0, 0, 0, 3, 0))))
+
+
+def test_touched_file_with_unchanged_content_is_not_indexed_again(index: CorpusIndex, deck_dir: Path):
+    index.update_directory(deck_dir)
+    stat = (deck_dir/"burn.dck").stat()
+    os.utime(deck_dir/"burn.dck", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert_that(index.update_directory(deck_dir), is_(equal_to(IndexUpdateStatistics(0, 0, 0, 3, 0))))
+
+
+def test_unreadable_file_is_removed_from_the_index(index: CorpusIndex, deck_dir: Path):
+    index.update_directory(deck_dir)
+    (deck_dir/"burn.dck").write_bytes(b"\xff\xfe\x00broken")
+    statistics = index.update_directory(deck_dir, input_format="xmage")
+    assert_that(statistics.failed, is_(equal_to(1)))
+    assert_that(index.get_deck_count(), is_(equal_to(2)))
+
+
+def test_update_keeps_decks_of_other_directories(index: CorpusIndex, deck_dir: Path, tmp_path: Path):
+    other_dir = tmp_path/"other"
+    other_dir.mkdir()
+    (other_dir/"burn.dck").write_text(BURN, encoding="utf-8")
+    index.update_directory(deck_dir)
+    index.update_directory(other_dir)
+    assert_that(index.get_deck_count(), is_(equal_to(4)))
+
+
+def test_changed_card_data_clears_the_index(tmp_path: Path, card_db: CardDatabase, deck_dir: Path):
+    index_path = tmp_path/"corpus.sqlite3"
+    index = CorpusIndex(index_path, card_db)
+    index.update_directory(deck_dir)
+    index.close()
+    card_db.db.execute("UPDATE Database_Metadata SET Value = 'changed' WHERE Key = ?", (DATA_VERSION_KEY,))
+    index = CorpusIndex(index_path, card_db)
+    assert_that(index.get_deck_count(), is_(equal_to(0)))
+    index.close()
+
+
+def test_index_command(tmp_path: Path, deck_dir: Path, run_command, capsys):
+    index_path = tmp_path/"corpus.sqlite3"
+    assert_that(run_command("index", "--index-file", str(index_path), "update", str(deck_dir)), is_(equal_to(0)))
+    capsys.readouterr()
+    assert_that(run_command("index", "--index-file", str(index_path), "contains", "Sol Ring"), is_(equal_to(0)))
+    assert_that(capsys.readouterr().out.splitlines(), contains_exactly(
+        str(deck_dir/"burn.dck"), str(deck_dir/"ramp.dck")))
+    assert_that(
+        run_command("index", "--index-file", str(index_path), "co-occurring", "--top", "1", "Sol Ring"),
+        is_(equal_to(0)))
+    assert_that(capsys.readouterr().out.splitlines(), contains_exactly(matches_regexp(r"^1 ")))
+    assert_that(
+        run_command("index", "--index-file", str(index_path), "contains", "Unknown Card"), is_(equal_to(1)))
@@ -0,0 +1,195 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from collections import Counter
+import io
+from pathlib import Path
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.deck_diff import PrintingKey, count_printings, diff_decks
+from MTGDeckConverter.input_parser.xmage import parse_deck
+from MTGDeckConverter.model import Card, Deck
+
+BOLT = PrintingKey("Lightning Bolt", "m20", "1")
+ISLAND = PrintingKey("Island", "eld", "254")
+ELVES = PrintingKey("Llanowar Elves", "eld", "2")
+
+
+def _create_deck(main_deck=(), side_board=(), commanders=()) -> Deck:
+    deck = Deck()
+    for key in main_deck:
+        deck.add_to_main_deck(key.to_card())
+    for key in side_board:
+        deck.add_to_side_board(key.to_card())
+    for key in commanders:
+        deck.add_to_main_deck(key.to_card(), is_commander=True)
+    return deck
+
+
+def test_printing_key_normalizes_set_and_collector_number():
+    assert_that(PrintingKey.from_card(Card("Lightning Bolt", "M20", 1)), is_(equal_to(BOLT)))
+    assert_that(PrintingKey.from_card(Card("Lightning Bolt", "", "")), is_(equal_to(("Lightning Bolt", None, None))))
+
+
+def test_count_printings_includes_commanders():
+    counts = count_printings(_create_deck([BOLT, BOLT, ISLAND], [ISLAND], [ELVES]))
+    assert_that(counts, has_entries(
+        main=Counter({BOLT: 2, ISLAND: 1, ELVES: 1}), side=Counter({ISLAND: 1}), commanders=Counter({ELVES: 1})))
+
+
+def test_identical_decks_in_different_order_have_an_empty_diff():
+    deck_diff = diff_decks(_create_deck([BOLT, ISLAND, BOLT]), _create_deck([ISLAND, BOLT, BOLT]))
+    assert_that(deck_diff.is_empty(), is_(True))
+    assert_that(deck_diff.format_lines(), is_(empty()))
+
+
+def test_diff_lists_changes_per_board():
+    deck_diff = diff_decks(
+        _create_deck([BOLT, BOLT, ISLAND], [ISLAND]),
+        _create_deck([BOLT, ISLAND, ISLAND], [], [ELVES]),
+    )
+    assert_that(deck_diff.is_empty(), is_(False))
+    assert_that(deck_diff.format_lines(), contains_inanyorder(
+        "-1 main [M20:1] Lightning Bolt",
+        "-1 side [ELD:254] Island",
+        "+1 main [ELD:254] Island",
+        "+1 main [ELD:2] Llanowar Elves",
+        "+1 commanders [ELD:2] Llanowar Elves",
+    ))
+
+
+def test_resolve_cancels_changes_referring_to_the_same_printing(card_db: CardDatabase):
+    deck_diff = diff_decks(
+        _create_deck([PrintingKey("Sol Ring", None, None), BOLT]),
+        _create_deck([PrintingKey("Sol Ring", "ELD", None), BOLT, BOLT]),
+    )
+    assert_that(deck_diff.format_lines(), has_length(3))
+    assert_that(deck_diff.resolve(card_db).format_lines(), contains_exactly("+1 main [M20:1] Lightning Bolt"))
+
+
+def test_resolve_only_looks_up_changed_cards(card_db: CardDatabase):
+    unknown_card = PrintingKey("Unknown Card", None, None)
+    deck_diff = diff_decks(_create_deck([unknown_card]), _create_deck([unknown_card, BOLT]))
+    assert_that(deck_diff.resolve(card_db).format_lines(), contains_exactly("+1 main [M20:1] Lightning Bolt"))
+    deck_diff = diff_decks(_create_deck([BOLT]), _create_deck([BOLT, unknown_card]))
+    assert_that(calling(deck_diff.resolve).with_args(card_db), raises(ValueError, "Unknown Card"))
+
+
+def test_apply_produces_the_new_deck_version():
+    old_deck = _create_deck([BOLT, BOLT, ISLAND], [ISLAND])
+    new_deck = _create_deck([BOLT, ISLAND, ISLAND, ELVES], [], [ELVES])
+    target_deck = _create_deck([BOLT, BOLT, ISLAND], [ISLAND])
+    diff_decks(old_deck, new_deck).apply(target_deck)
+    assert_that(count_printings(target_deck), is_(equal_to(count_printings(new_deck))))
+    # The commander references a card in the main deck, so writers can tell it apart from regular copies.
+    assert_that(target_deck.commanders, has_length(1))
+    assert_that(any(card is target_deck.commanders[0] for card in target_deck.main_deck), is_(True))
+
+
+def test_apply_raises_value_error_for_cards_missing_from_the_target_deck():
+    deck_diff = diff_decks(_create_deck([BOLT, ISLAND]), _create_deck([ISLAND]))
+    target_deck = _create_deck([ISLAND])
+    assert_that(calling(deck_diff.apply).with_args(target_deck), raises(ValueError, "Lightning Bolt"))
+
+
+def test_apply_raises_value_error_for_commanders_missing_from_the_target_deck():
+    deck_diff = diff_decks(_create_deck([BOLT]), _create_deck([BOLT, ELVES], [], [ELVES]))
+    target_deck = _create_deck([BOLT])
+    deck_diff.added["main"].clear()
+    assert_that(calling(deck_diff.apply).with_args(target_deck), raises(ValueError, "Llanowar Elves"))
+
+
+def test_apply_splits_added_commanders_off_shared_copies():
+    target_deck = parse_deck(io.StringIO("3 [ELD:2] Llanowar Elves\n"))
+    diff_decks(_create_deck([ELVES] * 3), _create_deck([ELVES] * 2, [], [ELVES])).apply(target_deck)
+    commander, = target_deck.commanders
+    assert_that([card is commander for card in target_deck.main_deck], contains_inanyorder(True, False, False))
+
+
+def test_apply_keeps_commanders_when_removing_regular_copies():
+    commander = ELVES.to_card()
+    target_deck = _create_deck([ELVES, ELVES])
+    target_deck.add_to_main_deck(commander, is_commander=True)
+    diff_decks(_create_deck([ELVES] * 2, [], [ELVES]), _create_deck([], [], [ELVES])).apply(target_deck)
+    assert_that(target_deck.main_deck, contains_exactly(same_instance(commander)))
+    assert_that(target_deck.commanders, contains_exactly(same_instance(commander)))
+
+
+def test_apply_to_a_converted_deck(card_db: CardDatabase):
+    old_deck = _create_deck([PrintingKey("Sol Ring", None, None), BOLT])
+    new_deck = _create_deck([BOLT, BOLT, PrintingKey("Island", "eld", None)])
+    converted_deck = parse_deck(io.StringIO("1 [ELD:1] Sol Ring\n1 [M20:1] Lightning Bolt\n"))
+    diff_decks(old_deck, new_deck).resolve(card_db).apply(converted_deck)
+    assert_that(count_printings(converted_deck)["main"], is_(equal_to(Counter({BOLT: 2, ISLAND: 1}))))
+
+
+def test_diff_command_patches_a_converted_deck(tmp_path: Path, run_command, capsys):
+    old_deck_path = tmp_path/"old.dck"
+    old_deck_path.write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    new_deck_path = tmp_path/"new.dck"
+    new_deck_path.write_text("2 [M20:1] Lightning Bolt\nSB: 1 [ELD:254] Island\n", encoding="utf-8")
+    assert_that(run_command("diff", str(old_deck_path), str(new_deck_path)), is_(equal_to(0)))
+    assert_that(capsys.readouterr().out.splitlines(), contains_inanyorder(
+        "+1 main [M20:1] Lightning Bolt", "+1 side [ELD:254] Island"))
+    patch_path = tmp_path/"converted.dck"
+    patch_path.write_text("NAME:Burn\n1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    assert_that(
+        run_command("diff", str(old_deck_path), str(new_deck_path), "--patch", str(patch_path)), is_(equal_to(0)))
+    assert_that(patch_path.read_text(encoding="utf-8"), is_(equal_to(
+        "NAME:Burn\n2 [M20:1] Lightning Bolt\nSB: 1 [ELD:254] Island\n")))
+
+
+def _write_tapped_out_csv(path: Path, *rows: str) -> Path:
+    path.write_text(
+        "Board,Qty,Name,Printing,Foil,Alter,Signed,Condition,Language,Commander\r\n" + "".join(
+            f"{row}\r\n" for row in rows), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("old_rows, new_rows", [
+    # Removes the commander designation
+    (["main,1,Sol Ring,ELD,,,,,,True", "main,2,Sol Ring,ELD,,,,,,False"], ["main,3,Sol Ring,ELD,,,,,,False"]),
+    # Designates one of the regular copies as the commander
+    (["main,3,Sol Ring,ELD,,,,,,False"], ["main,1,Sol Ring,ELD,,,,,,True", "main,2,Sol Ring,ELD,,,,,,False"]),
+    # Keeps the commander
+    (
+        ["main,1,Sol Ring,ELD,,,,,,True", "main,2,Sol Ring,ELD,,,,,,False"],
+        ["main,1,Sol Ring,ELD,,,,,,True", "main,1,Sol Ring,ELD,,,,,,False", "main,2,Island,ELD,,,,,,False"],
+    ),
+])
+def test_patched_commander_deck_equals_a_fresh_conversion(tmp_path: Path, run_command, old_rows, new_rows):
+    rows = ["main,1,Lightning Bolt,M20,,,,,,False"]
+    old_deck_path = _write_tapped_out_csv(tmp_path/"old.csv", *rows, *old_rows)
+    new_deck_path = _write_tapped_out_csv(tmp_path/"new.csv", *rows, *new_rows)
+    assert_that(run_command("convert", str(old_deck_path), str(new_deck_path)), is_(equal_to(0)))
+    patch_path = tmp_path/"old.dck"
+    assert_that(
+        run_command("diff", str(old_deck_path), str(new_deck_path), "--patch", str(patch_path)), is_(equal_to(0)))
+    assert_that(patch_path.read_bytes(), is_(equal_to((tmp_path/"new.dck").read_bytes())))
+
+
+def test_diff_command_fails_for_changes_that_can_not_be_applied(tmp_path: Path, run_command):
+    old_deck_path = tmp_path/"old.dck"
+    old_deck_path.write_text("2 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    new_deck_path = tmp_path/"new.dck"
+    new_deck_path.write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    patch_path = tmp_path/"converted.dck"
+    patch_path.write_text("1 [ELD:1] Sol Ring\n", encoding="utf-8")
+    assert_that(
+        run_command("diff", str(old_deck_path), str(new_deck_path), "--patch", str(patch_path)), is_(equal_to(1)))
+    assert_that(patch_path.read_text(encoding="utf-8"), is_(equal_to("1 [ELD:1] Sol Ring\n")))
@@ -0,0 +1,123 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from pathlib import Path
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.conversion import UnresolvedCardsError
+from MTGDeckConverter.fingerprint import DeckFingerprinter, FingerprintGroups
+from MTGDeckConverter.model import Card, Deck
+
+from tests.conftest import create_scryfall_card
+
+BOLT = Card("Lightning Bolt", "m20", "1")
+ISLAND = Card("Island", "eld", "254")
+
+
+def _create_deck(main_deck=(), side_board=(), commanders=()) -> Deck:
+    deck = Deck()
+    for card in main_deck:
+        deck.add_to_main_deck(card)
+    for card in side_board:
+        deck.add_to_side_board(card)
+    for card in commanders:
+        deck.add_to_main_deck(card, is_commander=True)
+    return deck
+
+
+@pytest.fixture
+def fingerprinter(card_db: CardDatabase) -> DeckFingerprinter:
+    return DeckFingerprinter(card_db)
+
+
+def test_canonical_lines_use_sorted_scryfall_ids(fingerprinter: DeckFingerprinter):
+    lines = fingerprinter.get_canonical_lines(_create_deck([BOLT, ISLAND, BOLT], [ISLAND]))
+    bolt_id = create_scryfall_card("Lightning Bolt", "m20", "1")["id"]
+    island_id = create_scryfall_card("Island", "eld", "254")["id"]
+    assert_that(lines, contains_exactly(*sorted([f"main 2 {bolt_id}", f"main 1 {island_id}", f"side 1 {island_id}"])))
+
+
+def test_reordered_and_renotated_decks_have_the_same_fingerprint(fingerprinter: DeckFingerprinter):
+    deck = _create_deck([BOLT, BOLT, ISLAND], [ISLAND])
+    reordered_deck = _create_deck([ISLAND, Card("Lightning Bolt", "M20", 1), BOLT], [ISLAND])
+    assert_that(fingerprinter.fingerprint(reordered_deck), is_(equal_to(fingerprinter.fingerprint(deck))))
+
+
+def test_set_code_aliases_have_the_same_fingerprint(card_db: CardDatabase, fingerprinter: DeckFingerprinter):
+    card_db.db.execute("INSERT INTO Set_Abbreviation_Alias (Alias, Abbreviation) VALUES ('core20', 'm20')")
+    assert_that(
+        fingerprinter.fingerprint(_create_deck([Card("Lightning Bolt", "core20", "1")])),
+        is_(equal_to(fingerprinter.fingerprint(_create_deck([BOLT])))))
+
+
+@pytest.mark.parametrize("other_deck", [
+    _create_deck([BOLT, ISLAND]),
+    _create_deck([BOLT, BOLT], [ISLAND, ISLAND]),
+    _create_deck([BOLT, BOLT], [], [ISLAND]),
+    _create_deck([Card("Lightning Bolt", "eld", "5"), BOLT], [ISLAND]),
+])
+def test_different_decks_have_different_fingerprints(fingerprinter: DeckFingerprinter, other_deck: Deck):
+    deck = _create_deck([BOLT, BOLT], [ISLAND])
+    assert_that(fingerprinter.fingerprint(other_deck), is_not(equal_to(fingerprinter.fingerprint(deck))))
+
+
+def test_unknown_printing_raises_value_error(fingerprinter: DeckFingerprinter):
+    assert_that(
+        calling(fingerprinter.fingerprint).with_args(_create_deck([Card("Lightning Bolt", "m20", "999")])),
+        raises(ValueError))
+
+
+def test_fingerprint_deck_file_raises_for_unresolved_cards(tmp_path: Path, fingerprinter: DeckFingerprinter):
+    deck_path = tmp_path/"deck.dck"
+    deck_path.write_text("1 [M20:1] Lightning Bolt\n1 [XXX:1] Unknown Card\n", encoding="utf-8")
+    assert_that(calling(fingerprinter.fingerprint_deck_file).with_args(deck_path), raises(UnresolvedCardsError))
+
+
+def _write_decks(deck_dir: Path) -> Path:
+    deck_dir.mkdir()
+    (deck_dir/"deck.dck").write_text("2 [M20:1] Lightning Bolt\nSB: 1 [ELD:254] Island\n", encoding="utf-8")
+    (deck_dir/"copy.dck").write_text(
+        "SB: 1 [ELD:254] Island\n1 [M20:1] Lightning Bolt\n1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    (deck_dir/"other.dck").write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    (deck_dir/"broken.dck").write_text("1 [XXX:1] Unknown Card\n", encoding="utf-8")
+    return deck_dir
+
+
+def test_groups_identical_deck_files(tmp_path: Path, fingerprinter: DeckFingerprinter):
+    deck_dir = _write_decks(tmp_path/"decks")
+    groups = FingerprintGroups()
+    groups.add_deck_files(fingerprinter, iter(sorted(deck_dir.iterdir())))
+    assert_that(
+        groups.duplicates().values(), contains_exactly(contains_exactly(deck_dir/"copy.dck", deck_dir/"deck.dck")))
+    assert_that(groups.failures, has_key(deck_dir/"broken.dck"))
+    report = groups.to_dict()
+    assert_that(report, has_entries(deck_count=3, distinct_deck_count=2))
+    assert_that(report["failures"], has_key(str(deck_dir/"broken.dck")))
+
+
+def test_fingerprint_command(tmp_path: Path, run_command, capsys):
+    deck_dir = _write_decks(tmp_path/"decks")
+    report_path = tmp_path/"report.json"
+    exit_code = run_command("fingerprint", "--pattern", "*.dck", "--report", str(report_path), str(deck_dir))
+    # The broken deck fails the command
+    assert_that(exit_code, is_(equal_to(1)))
+    assert_that(capsys.readouterr().out.splitlines(), contains_inanyorder(
+        has_length(64), f"  {deck_dir/'copy.dck'}", f"  {deck_dir/'deck.dck'}"))
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert_that(report, has_entries(deck_count=3, distinct_deck_count=2, failures=has_length(1)))
@@ -0,0 +1,140 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import io
+from pathlib import Path
+import sys
+import types
+
+from hamcrest import *
+import pytest
+
+import MTGDeckConverter.formats
+from MTGDeckConverter.formats import AUTO_DETECT, SNIFF_SIZE, detect_input_format, detect_stream_format, \
+    input_formats, load_parser, load_writer, output_formats, parse_deck
+
+TAPPED_OUT_CSV = (
+    "Board,Qty,Name,Printing,Foil,Alter,Signed,Condition,Language,Commander\r\n"
+    "main,1,Lightning Bolt,M20,,,,,,False\r\n"
+)
+XMAGE = "NAME:Burn\n4 [M20:1] Lightning Bolt\n"
+
+
+@pytest.fixture
+def clean_registry():
+    """Clears the cached format registry before and after the test, so that patched entry points take effect."""
+    input_formats.cache_clear()
+    output_formats.cache_clear()
+    yield
+    input_formats.cache_clear()
+    output_formats.cache_clear()
+
+
+@pytest.fixture
+def plugin(monkeypatch, clean_registry) -> types.ModuleType:
+    """Registers an input format plugin named "plugin", recognizing decks starting with "PLUGIN"."""
+    module = types.ModuleType("mtg_deck_converter_test_plugin")
+    module.sniff = lambda head: head.startswith("PLUGIN")
+    module.parse_deck = lambda source: "parsed by plugin"
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+    monkeypatch.setattr(
+        MTGDeckConverter.formats, "_iter_entry_points",
+        lambda group: iter([("plugin", module.__name__), ("xmage", module.__name__)])
+        if group == MTGDeckConverter.formats.INPUT_FORMAT_ENTRY_POINT_GROUP else iter([])
+    )
+    return module
+
+
+@pytest.mark.parametrize("head, expected", [
+    (TAPPED_OUT_CSV, "tappedout_csv"),
+    ("\ufeff" + TAPPED_OUT_CSV, "tappedout_csv"),
+    ("Board, Qty, Name\n", "tappedout_csv"),
+    (XMAGE, "xmage"),
+    ("\ufeff" + XMAGE, "xmage"),
+    ("SB: 1 [ELD:254] Island\n", "xmage"),
+    ("NAME:Empty deck\n", "xmage"),
+])
+def test_detect_input_format(tmp_path: Path, head: str, expected: str):
+    deck_path = tmp_path/"deck"
+    deck_path.write_text(head, encoding="utf-8")
+    assert_that(detect_input_format(deck_path), is_(equal_to(expected)))
+
+
+@pytest.mark.parametrize("head", [
+    "",
+    "Lightning Bolt\n",
+    "Qty,Name\n",
+    "4 Lightning Bolt\n",
+])
+def test_detect_input_format_raises_value_error_for_unknown_content(tmp_path: Path, head: str):
+    deck_path = tmp_path/"deck"
+    deck_path.write_text(head, encoding="utf-8")
+    assert_that(calling(detect_input_format).with_args(deck_path), raises(ValueError))
+
+
+def test_detect_input_format_only_inspects_the_start_of_the_file(tmp_path: Path):
+    deck_path = tmp_path/"deck"
+    deck_path.write_text("x" * SNIFF_SIZE + "\n" + XMAGE, encoding="utf-8")
+    assert_that(calling(detect_input_format).with_args(deck_path), raises(ValueError))
+
+
+def test_detect_stream_format_returns_all_lines():
+    lines = [f"{count} [M20:{count}] Card {count}\n" for count in range(1, 200)]
+    detected_format, all_lines = detect_stream_format(io.StringIO("".join(lines)))
+    assert_that(detected_format, is_(equal_to("xmage")))
+    assert_that(list(all_lines), is_(equal_to(lines)))
+
+
+def test_parse_deck_detects_the_format_of_streams():
+    deck = parse_deck(io.StringIO(TAPPED_OUT_CSV))
+    assert_that(deck.main_deck, has_length(1))
+    assert_that(deck.main_deck[0].english_name, is_(equal_to("Lightning Bolt")))
+
+
+def test_parse_deck_uses_the_given_format(tmp_path: Path):
+    deck_path = tmp_path/"deck.dck"
+    deck_path.write_text(XMAGE, encoding="utf-8")
+    assert_that(parse_deck(deck_path, "xmage").name, is_(equal_to("Burn")))
+
+
+@pytest.mark.parametrize("loader", [load_parser, load_writer])
+def test_unknown_format_raises_value_error(loader):
+    assert_that(calling(loader).with_args("unknown"), raises(ValueError, "Unknown"))
+
+
+def test_auto_detect_is_not_an_output_format():
+    assert_that(output_formats(), not_(has_key(AUTO_DETECT)))
+    assert_that(output_formats()["xmage"].file_extension, is_(equal_to(".dck")))
+
+
+def test_plugin_is_registered_after_the_built_in_formats(plugin: types.ModuleType):
+    assert_that(list(input_formats()), contains_exactly("tappedout_csv", "xmage", "plugin"))
+    # Plugins can not replace built-in formats
+    assert_that(input_formats()["xmage"].module, is_(equal_to("MTGDeckConverter.input_parser.xmage")))
+    assert_that(load_parser("plugin"), is_(same_instance(plugin)))
+
+
+def test_plugin_sniffer_is_used_for_detection(plugin: types.ModuleType):
+    assert_that(parse_deck(io.StringIO("PLUGIN deck\n")), is_(equal_to("parsed by plugin")))
+
+
+def test_plugin_module_is_not_imported_if_a_built_in_format_matches(plugin: types.ModuleType, monkeypatch):
+    imported = []
+    original_load_parser = MTGDeckConverter.formats.load_parser
+    monkeypatch.setattr(
+        MTGDeckConverter.formats, "load_parser", lambda name: imported.append(name) or original_load_parser(name))
+    detected_format, _ = detect_stream_format(io.StringIO(XMAGE))
+    assert_that(detected_format, is_(equal_to("xmage")))
+    assert_that(imported, is_(empty()))
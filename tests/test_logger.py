@@ -0,0 +1,47 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import sys
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.argument_parser import parse_args
+import MTGDeckConverter.constants
+import MTGDeckConverter.logger
+
+
+@pytest.mark.parametrize("arguments", [
+    ["convert", "deck.csv"],
+    ["stream"],
+    ["diff", "old.csv", "new.csv"],
+    ["fingerprint", "decks"],
+    ["index", "contains", "Sol Ring"],
+])
+def test_log_messages_are_written_to_the_standard_error_output(capsys, monkeypatch, arguments):
+    monkeypatch.setattr(sys, "argv", [MTGDeckConverter.constants.PROGRAMNAME, *arguments])
+    args = parse_args()
+    handlers = list(MTGDeckConverter.logger.root_logger.handlers)
+    MTGDeckConverter.logger.configure_root_logger(args)
+    try:
+        MTGDeckConverter.logger.get_logger("MTGDeckConverter.test").info("Log message")
+    finally:
+        for handler in set(MTGDeckConverter.logger.root_logger.handlers) - set(handlers):
+            MTGDeckConverter.logger.root_logger.removeHandler(handler)
+        MTGDeckConverter.logger.root_logger.setLevel(logging.NOTSET)
+    captured = capsys.readouterr()
+    assert_that(captured.out, is_(empty()))
+    assert_that(captured.err, contains_string("Log message"))
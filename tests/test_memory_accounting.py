@@ -0,0 +1,141 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from pathlib import Path
+import sys
+import tracemalloc
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.argument_parser import parse_args
+import MTGDeckConverter.constants
+import MTGDeckConverter.memory_accounting as memory_accounting
+from MTGDeckConverter.memory_accounting import MemoryAccountant, MemoryBudgetExceededError
+import MTGDeckConverter.MTGDeckConverter
+
+MIB = 2**20
+
+
+@pytest.fixture
+def accountant() -> MemoryAccountant:
+    accountant = memory_accounting.start()
+    yield accountant
+    memory_accounting.stop()
+
+
+def test_stage_does_nothing_without_accounting():
+    with memory_accounting.stage(memory_accounting.PARSE):
+        pass
+    assert_that(tracemalloc.is_tracing(), is_(False))
+    assert_that(memory_accounting.stage(memory_accounting.PARSE), is_(same_instance(memory_accounting._NO_STAGE)))
+
+
+def test_stages_record_count_and_retained_memory(accountant: MemoryAccountant):
+    retained = []
+    for _ in range(2):
+        with memory_accounting.stage(memory_accounting.PARSE):
+            retained.append(bytearray(MIB))
+    statistics = accountant.stages[memory_accounting.PARSE]
+    assert_that(statistics.count, is_(equal_to(2)))
+    assert_that(statistics.retained_bytes, is_(close_to(2 * MIB, MIB / 10)))
+    assert_that(statistics.peak_bytes, is_(greater_than_or_equal_to(MIB)))
+
+
+def test_nested_stages_attribute_memory_to_the_innermost_stage(accountant: MemoryAccountant):
+    with memory_accounting.stage(memory_accounting.INSERT):
+        outer = bytearray(MIB)
+        with memory_accounting.stage(memory_accounting.DECODE):
+            inner = bytearray(2 * MIB)
+        outer_after_inner = bytearray(MIB)
+    stages = accountant.stages
+    assert_that(stages[memory_accounting.DECODE].retained_bytes, is_(close_to(2 * MIB, MIB / 10)))
+    assert_that(stages[memory_accounting.INSERT].retained_bytes, is_(close_to(2 * MIB, MIB / 10)))
+    del outer, inner, outer_after_inner
+
+
+def test_memory_freed_by_another_stage_is_negative_retained_memory(accountant: MemoryAccountant):
+    with memory_accounting.stage(memory_accounting.DOWNLOAD):
+        data = bytearray(MIB)
+    with memory_accounting.stage(memory_accounting.DECODE):
+        del data
+    assert_that(accountant.stages[memory_accounting.DOWNLOAD].retained_bytes, is_(close_to(MIB, MIB / 10)))
+    assert_that(accountant.stages[memory_accounting.DECODE].retained_bytes, is_(close_to(-MIB, MIB / 10)))
+
+
+def test_exceeded_budget_raises_memory_budget_exceeded_error():
+    accountant = memory_accounting.start(MIB)
+    try:
+        with pytest.raises(MemoryBudgetExceededError, match="stage write"):
+            with memory_accounting.stage(memory_accounting.WRITE):
+                data = bytearray(2 * MIB)
+                del data
+        assert_that(accountant.budget_exceeded, is_(True))
+        assert_that(accountant.get_report(), has_entries(budget_bytes=MIB, budget_exceeded=True))
+    finally:
+        memory_accounting.stop()
+
+
+def test_report(tmp_path: Path, accountant: MemoryAccountant):
+    with memory_accounting.stage(memory_accounting.RESOLVE):
+        data = [str(number) for number in range(10000)]
+    report = accountant.get_report()
+    assert_that(report, has_entries(
+        budget_bytes=None, budget_exceeded=False, peak_bytes=greater_than(0),
+        stages=has_entries({memory_accounting.RESOLVE: has_entries(count=1, peak_bytes=greater_than(0))}),
+        top_allocation_sites=only_contains(has_entries(file=is_not(memory_accounting.__file__))),
+    ))
+    assert_that(
+        report["top_allocation_sites"], has_length(less_than_or_equal_to(MemoryAccountant.TOP_ALLOCATION_SITES)))
+    report_path = tmp_path/"report.json"
+    accountant.write(report, report_path)
+    assert_that(json.loads(report_path.read_text(encoding="utf-8")), is_(equal_to(report)))
+    del data
+
+
+def _run_with_memory_accounting(monkeypatch, database_path: Path, *arguments: str) -> int:
+    monkeypatch.setattr(
+        sys, "argv", [MTGDeckConverter.constants.PROGRAMNAME, "--database", str(database_path), *arguments])
+    args = parse_args()
+    return MTGDeckConverter.MTGDeckConverter._run_with_memory_accounting(
+        MTGDeckConverter.MTGDeckConverter._COMMANDS[args.command], args)
+
+
+def test_memory_report_of_the_populate_command(tmp_path: Path, card_data_path: Path, monkeypatch):
+    report_path = tmp_path/"report.json"
+    exit_code = _run_with_memory_accounting(
+        monkeypatch, tmp_path/"cards.sqlite3", "--memory-report", str(report_path),
+        "populate", "--data-file", str(card_data_path))
+    assert_that(exit_code, is_(equal_to(0)))
+    assert_that(tracemalloc.is_tracing(), is_(False))
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert_that(report, has_entries(command="populate", budget_exceeded=False))
+    assert_that(
+        report["stages"],
+        has_entries({name: has_entries(count=greater_than(0)) for name in ("download", "decode", "insert")}))
+
+
+def test_memory_budget_aborts_the_command(tmp_path: Path, card_db, monkeypatch):
+    deck_path = tmp_path/"deck.dck"
+    deck_path.write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    report_path = tmp_path/"report.json"
+    exit_code = _run_with_memory_accounting(
+        monkeypatch, card_db.database_path, "--memory-report", str(report_path), "--memory-budget", "0",
+        "convert", "--output-dir", str(tmp_path/"out"), str(deck_path))
+    assert_that(exit_code, is_(equal_to(1)))
+    assert_that(tracemalloc.is_tracing(), is_(False))
+    assert_that(json.loads(report_path.read_text(encoding="utf-8")), has_entries(
+        command="convert", budget_bytes=0, budget_exceeded=True))
@@ -0,0 +1,159 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from pathlib import Path
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.conversion import ResolutionReport, UnresolvedCardsError, convert_deck_file_to_formats
+from MTGDeckConverter.model import Card, CardIdentity, CardInterner, CompactDeck, Deck, DeckEntry, UnresolvedCard
+
+
+def _deck_with_unknown_cards() -> Deck:
+    deck = Deck()
+    unknown = Card("Unknown Card")
+    for _ in range(3):
+        deck.add_to_main_deck(unknown)
+    deck.add_to_main_deck(Card("Lightning Bolt", "m20"))
+    deck.add_to_side_board(Card(set_abbreviation="m20", collector_number="999"))
+    deck.add_to_maybe_board(Card(set_abbreviation="m20"))
+    return deck
+
+
+def test_first_unknown_card_raises_value_error(card_db: CardDatabase):
+    assert_that(
+        calling(_deck_with_unknown_cards().fill_missing_information).with_args(card_db),
+        raises(ValueError, "Unknown Card"))
+
+
+def test_collect_errors_returns_all_unresolved_cards(card_db: CardDatabase):
+    deck = _deck_with_unknown_cards()
+    unresolved_cards = deck.fill_missing_information(card_db, collect_errors=True)
+    assert_that(unresolved_cards, contains_exactly(
+        has_properties(board="main", quantity=3, card=has_properties(english_name="Unknown Card")),
+        has_properties(board="side", quantity=1, reason=contains_string("999")),
+        has_properties(board="maybe", quantity=1, reason="Not enough information to identify the card."),
+    ))
+    # Known cards are resolved, regardless of the unresolved ones
+    assert_that(deck.main_deck[3], has_properties(set_abbreviation="m20", collector_number=1))
+
+
+def test_collect_errors_returns_empty_list_for_resolved_deck(card_db: CardDatabase):
+    deck = Deck()
+    deck.add_to_main_deck(Card("Lightning Bolt"))
+    assert_that(deck.fill_missing_information(card_db, collect_errors=True), is_(empty()))
+
+
+def test_unresolved_card_to_dict():
+    unresolved_card = UnresolvedCard("side", 2, Card("Unknown Card", "m20"), "Not found")
+    assert_that(unresolved_card.to_dict(), has_entries(
+        board="side", quantity=2, english_name="Unknown Card", set_abbreviation="m20", reason="Not found"))
+    json.dumps(unresolved_card.to_dict())
+
+
+def test_conversion_raises_unresolved_cards_error_and_writes_nothing(tmp_path: Path, card_db: CardDatabase):
+    input_path = tmp_path/"deck.dck"
+    input_path.write_text("1 [XXX:1] Unknown Card\n1 [M20:1] Lightning Bolt\n1 [XXX:2] Other Card\n", encoding="utf-8")
+    output_path = tmp_path/"converted.dck"
+    with pytest.raises(UnresolvedCardsError) as exception_info:
+        convert_deck_file_to_formats(card_db, input_path, {"xmage": output_path})
+    assert_that(exception_info.value.unresolved_cards, has_length(2))
+    assert_that(str(exception_info.value), all_of(contains_string("Unknown Card"), contains_string("Other Card")))
+    assert_that(output_path.exists(), is_(False))
+
+
+def test_resolution_report():
+    report = ResolutionReport()
+    report.add_failure(Path("a.dck"), UnresolvedCardsError(
+        "a.dck", [UnresolvedCard("main", 1, Card("Unknown Card"), "Not found")] * 2))
+    report.add_failure(Path("b.dck"), OSError("No such file"))
+    assert_that(report.to_dict(), has_entries(
+        failed_deck_count=2,
+        unresolved_card_count=2,
+        decks=contains_exactly(
+            has_entries(input_file="a.dck", unresolved_cards=has_length(2)),
+            all_of(has_entries(input_file="b.dck", error="No such file"), not_(has_key("unresolved_cards"))),
+        )
+    ))
+
+
+def test_convert_command_continues_after_failures_and_writes_report(tmp_path: Path, run_command):
+    broken_deck = tmp_path/"broken.dck"
+    broken_deck.write_text("1 [XXX:1] Unknown Card\n", encoding="utf-8")
+    deck = tmp_path/"deck.dck"
+    deck.write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    output_dir = tmp_path/"out"
+    output_dir.mkdir()
+    report_path = tmp_path/"report.json"
+    exit_code = run_command(
+        "convert", "--output-dir", str(output_dir), "--error-report", str(report_path), str(broken_deck), str(deck))
+    assert_that(exit_code, is_(equal_to(1)))
+    assert_that((output_dir/"deck.dck").exists(), is_(True))
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert_that(report, has_entries(failed_deck_count=1, decks=contains_exactly(
+        has_entries(input_file=str(broken_deck), unresolved_cards=contains_exactly(
+            has_entries(english_name="Unknown Card", board="main", quantity=1))))))
+
+
+def test_interner_returns_one_instance_per_identity():
+    interner = CardInterner()
+    first = interner.intern(Card("Lightning Bolt", "m20", "1"))
+    assert_that(interner.intern(Card("Lightning Bolt", "m20", "1")), is_(same_instance(first)))
+    assert_that(interner.intern(CardIdentity("Lightning Bolt", "m20", "1")), is_(same_instance(first)))
+    assert_that(interner.intern(Card("Lightning Bolt", "m20", "1", foil=True)), is_not(same_instance(first)))
+    assert_that(interner, has_length(2))
+    interner.clear()
+    assert_that(interner, has_length(0))
+
+
+def test_compact_decks_share_card_instances():
+    interner = CardInterner()
+    decks = []
+    for _ in range(2):
+        deck = Deck()
+        deck.add_to_main_deck(Card("Lightning Bolt", "m20", "1"))
+        decks.append(CompactDeck.from_deck(deck, interner))
+    assert_that(decks[1].entries[0].card, is_(same_instance(decks[0].entries[0].card)))
+
+
+def test_compact_deck_round_trip():
+    deck = Deck("Commander deck")
+    commander = Card("Llanowar Elves", "eld", "2")
+    bolt = Card("Lightning Bolt", "m20", "1")
+    deck.add_to_main_deck(commander, is_commander=True)
+    deck.main_deck += [bolt] * 3
+    deck.add_to_main_deck(Card("Llanowar Elves", "eld", "2"))
+    deck.add_to_side_board(Card("Island", "eld", "254"))
+    deck.add_to_acquire_board(Card("Sol Ring", "eld", "1"))
+    compact_deck = CompactDeck.from_deck(deck, CardInterner())
+    assert_that(compact_deck.entries, contains_exactly(
+        DeckEntry("main", CardIdentity.from_card(commander), 1, True),
+        DeckEntry("main", CardIdentity.from_card(bolt), 3, False),
+        DeckEntry("main", CardIdentity.from_card(commander), 1, False),
+        DeckEntry("side", CardIdentity("Island", "eld", "254"), 1, False),
+        DeckEntry("acquire", CardIdentity("Sol Ring", "eld", "1"), 1, False),
+    ))
+    restored_deck = compact_deck.to_deck()
+    assert_that(restored_deck.name, is_(equal_to("Commander deck")))
+    assert_that(restored_deck.main_deck, is_(equal_to(deck.main_deck)))
+    assert_that(restored_deck.side_board, is_(equal_to(deck.side_board)))
+    assert_that(restored_deck.acquire_bord, is_(equal_to(deck.acquire_bord)))
+    # Only the commander copy is in the command zone
+    assert_that(restored_deck.commanders, contains_exactly(commander))
+    assert_that(restored_deck.commanders[0], is_(same_instance(restored_deck.main_deck[0])))
+    assert_that(restored_deck.main_deck[4], is_not(same_instance(restored_deck.main_deck[0])))
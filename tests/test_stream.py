@@ -0,0 +1,85 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import sys
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.conversion import UnresolvedCardsError, convert_deck_stream
+from MTGDeckConverter.formats import AUTO_DETECT
+
+TAPPED_OUT_CSV = \
+    "Board,Qty,Name,Printing,Foil,Alter,Signed,Condition,Language,Commander\r\n" \
+    "main,2,Lightning Bolt,M20,,,,,,False\r\n" \
+    "side,1,\"Ach! Hans, Run!\",,,,,,,False\r\n"
+CONVERTED_DECK = "2 [M20:1] Lightning Bolt\nSB: 1 [ELD:4] Ach! Hans, Run!\n"
+
+
+@pytest.mark.parametrize("input_format", [AUTO_DETECT, "tappedout_csv"])
+def test_convert_deck_stream(card_db: CardDatabase, input_format: str):
+    output_stream = io.StringIO()
+    convert_deck_stream(card_db, io.StringIO(TAPPED_OUT_CSV, newline=""), output_stream, "xmage", input_format)
+    assert_that(output_stream.getvalue(), is_(equal_to(CONVERTED_DECK)))
+
+
+def test_convert_deck_stream_accepts_an_iterable_of_lines(card_db: CardDatabase):
+    output_stream = io.StringIO()
+    lines = (line for line in TAPPED_OUT_CSV.splitlines(keepends=True))
+    convert_deck_stream(card_db, lines, output_stream, "xmage")
+    assert_that(output_stream.getvalue(), is_(equal_to(CONVERTED_DECK)))
+
+
+def test_unresolved_cards_are_not_written(card_db: CardDatabase):
+    output_stream = io.StringIO()
+    assert_that(
+        calling(convert_deck_stream).with_args(
+            card_db, io.StringIO("1 [M20:1] Lightning Bolt\n1 [XXX:1] Unknown Card\n"), output_stream, "xmage"),
+        raises(UnresolvedCardsError, "Unknown Card"))
+    assert_that(output_stream.getvalue(), is_(empty()))
+
+
+def _run_stream_command(monkeypatch, run_command, input_text: str, *arguments: str):
+    """Runs the stream command with the given standard input. Returns the exit code and the standard output."""
+    stdout_buffer = io.BytesIO()
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(input_text.encode("utf-8")), encoding="ascii"))
+    monkeypatch.setattr(sys, "stdout", io.TextIOWrapper(stdout_buffer, encoding="ascii"))
+    exit_code = run_command("stream", *arguments)
+    sys.stdout.flush()
+    return exit_code, stdout_buffer.getvalue().decode("utf-8")
+
+
+def test_stream_command(monkeypatch, run_command):
+    # The standard streams are reconfigured to UTF-8, independent of the locale.
+    exit_code, output = _run_stream_command(
+        monkeypatch, run_command, "NAME:Éclair\n2 [M20:1] Lightning Bolt\n", "--output-format", "xmage")
+    assert_that(exit_code, is_(equal_to(0)))
+    assert_that(output, is_(equal_to("NAME:Éclair\n2 [M20:1] Lightning Bolt\n")))
+
+
+def test_stream_command_reads_tapped_out_csv(monkeypatch, run_command):
+    exit_code, output = _run_stream_command(
+        monkeypatch, run_command, TAPPED_OUT_CSV + "main,1,Foudre,,,,,,FR,False\r\n", "-i", "tappedout_csv")
+    assert_that(exit_code, is_(equal_to(0)))
+    # The French card is identified by its printed name and merged with the English printing
+    assert_that(output, is_(equal_to(CONVERTED_DECK.replace("2 [M20:1]", "3 [M20:1]"))))
+
+
+def test_stream_command_fails_for_unresolved_cards(monkeypatch, run_command):
+    exit_code, output = _run_stream_command(monkeypatch, run_command, "1 [XXX:1] Unknown Card\n")
+    assert_that(exit_code, is_(equal_to(1)))
+    assert_that(output, is_(empty()))
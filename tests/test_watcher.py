@@ -0,0 +1,147 @@
+# Copyright (C) 2019 Thomas Hess <thomas.hess@udo.edu>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from pathlib import Path
+import typing
+
+from hamcrest import *
+import pytest
+
+from MTGDeckConverter.card_db.db import CardDatabase
+from MTGDeckConverter.card_db.refresh import refresh_database
+import MTGDeckConverter.conversion
+import MTGDeckConverter.watcher
+from MTGDeckConverter.watcher import DirectoryWatcher
+
+from tests.conftest import create_card_data, create_scryfall_card, write_card_data
+
+
+@pytest.fixture
+def deck_dir(tmp_path: Path) -> Path:
+    deck_dir = tmp_path/"decks"
+    deck_dir.mkdir()
+    return deck_dir
+
+
+@pytest.fixture
+def converted_paths(monkeypatch) -> typing.List[Path]:
+    """Records the input paths of all conversions, while still converting the decks."""
+    converted = []
+    convert = MTGDeckConverter.conversion.convert_deck_file_to_formats
+
+    def convert_and_record(card_db, input_path, *args):
+        converted.append(input_path)
+        convert(card_db, input_path, *args)
+    monkeypatch.setattr(MTGDeckConverter.conversion, "convert_deck_file_to_formats", convert_and_record)
+    return converted
+
+
+def _touch(path: Path):
+    stat = path.stat()
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_converts_new_files_next_to_the_input(card_db: CardDatabase, deck_dir: Path, converted_paths):
+    watcher = DirectoryWatcher(card_db, deck_dir, ["xmage"], debounce=0)
+    deck_path = deck_dir/"deck.csv"
+    deck_path.write_text(
+        "Board,Qty,Name,Printing,Foil,Alter,Signed,Condition,Language,Commander\r\n"
+        "main,1,Lightning Bolt,M20,,,,,,False\r\n", encoding="utf-8")
+    watcher.poll()
+    assert_that((deck_dir/"deck.dck").read_text(encoding="utf-8"), is_(equal_to("1 [M20:1] Lightning Bolt\n")))
+    # The written output is not converted again, although it matches the pattern.
+    watcher.poll()
+    assert_that(converted_paths, contains_exactly(deck_path))
+
+
+def test_unchanged_content_is_not_converted_again(card_db: CardDatabase, deck_dir: Path, converted_paths):
+    output_dir = deck_dir.parent/"out"
+    output_dir.mkdir()
+    watcher = DirectoryWatcher(card_db, deck_dir, ["xmage"], output_dir, debounce=0)
+    deck_path = deck_dir/"deck.dck"
+    deck_path.write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    watcher.poll()
+    _touch(deck_path)
+    watcher.poll()
+    assert_that(converted_paths, contains_exactly(deck_path))
+    deck_path.write_text("2 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    _touch(deck_path)
+    watcher.poll()
+    assert_that(converted_paths, contains_exactly(deck_path, deck_path))
+    assert_that((output_dir/"deck.dck").read_text(encoding="utf-8"), is_(equal_to("2 [M20:1] Lightning Bolt\n")))
+
+
+def test_conversion_waits_for_the_debounce_time(
+        card_db: CardDatabase, deck_dir: Path, converted_paths, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(MTGDeckConverter.watcher.time, "monotonic", lambda: now[0])
+    watcher = DirectoryWatcher(card_db, deck_dir, ["xmage"], deck_dir.parent, debounce=2)
+    deck_path = deck_dir/"deck.dck"
+    deck_path.write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    watcher.poll()
+    now[0] += 1
+    deck_path.write_text("2 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    _touch(deck_path)
+    watcher.poll()
+    now[0] += 1.5
+    watcher.poll()
+    assert_that(converted_paths, is_(empty()))
+    now[0] += 0.5
+    watcher.poll()
+    assert_that(converted_paths, contains_exactly(deck_path))
+
+
+def test_only_files_matching_the_pattern_are_converted(card_db: CardDatabase, deck_dir: Path, converted_paths):
+    watcher = DirectoryWatcher(card_db, deck_dir, ["xmage"], deck_dir.parent, pattern="*.dck", debounce=0)
+    (deck_dir/"notes.txt").write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    (deck_dir/"deck.dck").write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    watcher.poll()
+    assert_that(converted_paths, contains_exactly(deck_dir/"deck.dck"))
+
+
+def test_broken_file_is_only_retried_after_it_changed(card_db: CardDatabase, deck_dir: Path, converted_paths):
+    watcher = DirectoryWatcher(card_db, deck_dir, ["xmage"], deck_dir.parent, debounce=0)
+    deck_path = deck_dir/"deck.dck"
+    deck_path.write_text("1 [XXX:1] Unknown Card\n", encoding="utf-8")
+    watcher.poll()
+    _touch(deck_path)
+    watcher.poll()
+    assert_that(converted_paths, contains_exactly(deck_path))
+    assert_that((deck_dir.parent/"deck.dck").exists(), is_(False))
+    deck_path.write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    _touch(deck_path)
+    watcher.poll()
+    assert_that(converted_paths, contains_exactly(deck_path, deck_path))
+    assert_that((deck_dir.parent/"deck.dck").exists(), is_(True))
+
+
+def test_refreshed_card_database_is_used(card_db: CardDatabase, deck_dir: Path, tmp_path: Path, converted_paths):
+    watcher = DirectoryWatcher(card_db, deck_dir, ["xmage"], deck_dir.parent, debounce=0)
+    refresh_database(card_db.database_path, write_card_data(
+        tmp_path/"refreshed.json", create_card_data() + [create_scryfall_card("Sol Ring", "m20", "300")]))
+    (deck_dir/"deck.csv").write_text(
+        "Board,Qty,Name,Printing,Foil,Alter,Signed,Condition,Language,Commander\r\n"
+        "main,1,Sol Ring,M20,,,,,,False\r\n", encoding="utf-8")
+    watcher.poll()
+    assert_that((deck_dir.parent/"deck.dck").read_text(encoding="utf-8"), is_(equal_to("1 [M20:300] Sol Ring\n")))
+
+
+def test_missing_output_directory_is_created(card_db: CardDatabase, deck_dir: Path, converted_paths):
+    output_dir = deck_dir.parent/"out"/"xmage"
+    watcher = DirectoryWatcher(card_db, deck_dir, ["xmage"], output_dir, debounce=0)
+    (deck_dir/"deck.dck").write_text("1 [M20:1] Lightning Bolt\n", encoding="utf-8")
+    watcher.poll()
+    assert_that((output_dir/"deck.dck").read_text(encoding="utf-8"), is_(equal_to("1 [M20:1] Lightning Bolt\n")))